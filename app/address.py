@@ -0,0 +1,93 @@
+"""
+Address Normalization
+
+Canonicalizes US street addresses so repeat and near-duplicate submissions
+("123 Main Street, Suite 4" / "123 MAIN ST.") map to the same cache key.
+"""
+import re
+
+# USPS street suffix and directional abbreviations
+STREET_ABBREVIATIONS = {
+    "street": "st",
+    "avenue": "ave",
+    "av": "ave",
+    "boulevard": "blvd",
+    "road": "rd",
+    "drive": "dr",
+    "lane": "ln",
+    "court": "ct",
+    "place": "pl",
+    "parkway": "pkwy",
+    "highway": "hwy",
+    "circle": "cir",
+    "terrace": "ter",
+    "square": "sq",
+    "trail": "trl",
+    "expressway": "expy",
+    "freeway": "fwy",
+    "plaza": "plz",
+    "center": "ctr",
+    "centre": "ctr",
+    "north": "n",
+    "south": "s",
+    "east": "e",
+    "west": "w",
+    "northeast": "ne",
+    "northwest": "nw",
+    "southeast": "se",
+    "southwest": "sw",
+    "mount": "mt",
+    "saint": "st",
+    "fort": "ft",
+}
+
+STATE_ABBREVIATIONS = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "florida": "fl", "georgia": "ga",
+    "hawaii": "hi", "idaho": "id", "illinois": "il", "indiana": "in", "iowa": "ia",
+    "kansas": "ks", "kentucky": "ky", "louisiana": "la", "maine": "me", "maryland": "md",
+    "massachusetts": "ma", "michigan": "mi", "minnesota": "mn", "mississippi": "ms",
+    "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny",
+    "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok",
+    "oregon": "or", "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc",
+    "south dakota": "sd", "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt",
+    "virginia": "va", "washington": "wa", "west virginia": "wv", "wisconsin": "wi",
+    "wyoming": "wy", "district of columbia": "dc",
+}
+
+# Secondary unit designators (suite/unit numbers don't change the jurisdiction).
+# A designator only counts when a unit number ("Ste 400", "Apt B", "Floor 3")
+# or "#" follows it, so "Ste Genevieve" and "Floor Ln" survive.
+_UNIT_PATTERN = re.compile(
+    r"(?:\b(?:suite|ste|unit|apt|apartment|bldg|building|room|rm|floor)\b\.?\s*(?:#\s*[a-z0-9-]+"
+    r"|[a-z0-9-]*\d[a-z0-9-]*|[a-z])|#\s*[a-z0-9-]+)\b"
+)
+_ZIP_PLUS_FOUR = re.compile(r"\b(\d{5})-\d{4}\b")
+# State names are only abbreviated in the state position: last, or just
+# before the ZIP ("500 Washington Ave" keeps its street name)
+_STATE_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(STATE_ABBREVIATIONS, key=len, reverse=True)) + r")(?=(?: \d{5})?$)"
+)
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonicalize an address for cache lookups.
+
+    Lowercases, drops suite/unit numbers and ZIP+4 extensions, strips
+    punctuation, abbreviates a trailing state name, and applies USPS street
+    and directional abbreviations.
+
+    Args:
+        address: Free-form US address
+
+    Returns:
+        Normalized address, e.g. "123 n main st miami fl 33101"
+    """
+    text = address.lower()
+    text = _ZIP_PLUS_FOUR.sub(r"\1", text)
+    text = _UNIT_PATTERN.sub(" ", text)
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    text = _STATE_PATTERN.sub(lambda match: STATE_ABBREVIATIONS[match.group(1)], " ".join(text.split()))
+    return " ".join(STREET_ABBREVIATIONS.get(word, word) for word in text.split())
@@ -1,7 +1,26 @@
+import asyncio
+import inspect
 import json
-from typing import Dict, Any, Type, Optional
-from pydantic import BaseModel
-from .clients import PerplexityClient, LLMClient
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Any, Iterable, List, Type, Optional, Tuple
+from pydantic import BaseModel, Field, create_model
+from .cache import ResearchCache, get_research_cache
+from .clients import (
+    PerplexityClient,
+    LLMClient,
+    AsyncPerplexityClient,
+    AsyncLLMClient,
+    MultiProviderLLMClient,
+    AsyncMultiProviderLLMClient,
+    ClientRegistry,
+    fallback_provider,
+    get_client_registry,
+    served_provider,
+)
+from .retry import RetryBudget
+from .telemetry import JobTelemetry, section_scope
 from .models import (
     CodeCheckForm,
     LocationInformation,
@@ -20,10 +39,111 @@ from .models import (
     ResearchedField
 )
 
+# Sections researched after the jurisdiction step, in CodeCheckForm order:
+# (display name used in the research query, section model, form field name)
+SECTIONS = [
+    ("Wall Signs", WallSigns, "wall_signs"),
+    ("Projecting Signs", ProjectingSigns, "projecting_signs"),
+    ("Freestanding Signs", FreestandingSigns, "freestanding_signs"),
+    ("Directionals / Regulatory / Parking Lot", DirectionalsRegulatory, "directionals_regulatory"),
+    ("Informational Signs", InformationalSigns, "informational_signs"),
+    ("Awnings", Awnings, "awnings"),
+    ("Undercanopy Signs", UndercanopySigns, "undercanopy_signs"),
+    ("Window Signs", WindowSigns, "window_signs"),
+    ("Temporary Signs", TemporarySigns, "temporary_signs"),
+    ("Approval Process", ApprovalProcess, "approval_process"),
+    ("Permit Requirements", PermitRequirements, "permit_requirements"),
+    ("Variance Procedures", VarianceProcedures, "variance_procedures"),
+]
+
+# Called with (form field name, section model) as soon as each section is researched
+SectionCallback = Callable[[str, BaseModel], Any]
+
+SECTIONS_BY_FIELD = {field_name: (name, model_cls) for name, model_cls, field_name in SECTIONS}
+FIELDS_BY_SECTION = {name: field_name for name, _, field_name in SECTIONS}
+
+# Related sections extracted together in a single LLM call when batch extraction is enabled
+SECTION_GROUPS = [
+    ("wall_signs", "projecting_signs", "awnings", "undercanopy_signs"),
+    ("freestanding_signs", "directionals_regulatory", "informational_signs"),
+    ("window_signs", "temporary_signs"),
+    ("approval_process", "permit_requirements", "variance_procedures"),
+]
+
+
+@lru_cache(maxsize=None)
+def composite_model(field_names: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Build (once) a Pydantic model whose fields are the given sections' models,
+    e.g. ("approval_process", "permit_requirements") -> model with both fields.
+    """
+    fields = {
+        field_name: (SECTIONS_BY_FIELD[field_name][1], Field(default_factory=SECTIONS_BY_FIELD[field_name][1]))
+        for field_name in field_names
+    }
+    name = "".join(SECTIONS_BY_FIELD[field_name][1].__name__ for field_name in field_names)
+    return create_model(name, **fields)
+
 class CodeCheckAgent:
-    def __init__(self, llm_provider: str = "openai"):
-        self.perplexity = PerplexityClient()
-        self.llm = LLMClient(provider=llm_provider)
+    def __init__(
+        self,
+        llm_provider: str = "openai",
+        max_concurrency: Optional[int] = None,
+        cache: Optional[ResearchCache] = None,
+        batch_extraction: Optional[bool] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        telemetry: Optional[JobTelemetry] = None,
+        clients: Optional[ClientRegistry] = None
+    ):
+        """
+        Args:
+            llm_provider: LLM provider used for extraction ('openai' or 'gemini')
+            max_concurrency: Maximum number of sections researched in parallel.
+                Defaults to the AGENT_MAX_CONCURRENCY environment variable, or 1
+                (sequential) when unset.
+            cache: Section result cache. Defaults to the process-wide cache
+                configured by RESEARCH_CACHE_BACKEND (disabled when unset).
+            batch_extraction: Extract each SECTION_GROUPS group in one LLM call
+                instead of one call per section. Defaults to the
+                AGENT_BATCH_EXTRACTION environment variable (off when unset).
+            retry_budget: Retries shared by every upstream call this agent
+                makes. Defaults to a fresh JOB_RETRY_BUDGET, i.e. one budget
+                per job.
+            telemetry: Collects latency/tokens/retries of this agent's
+                upstream calls per section. Defaults to a fresh JobTelemetry.
+            clients: Registry of the provider SDK clients this agent's clients
+                share with every other job. Defaults to the process-wide
+                registry.
+        """
+        self.llm_provider = llm_provider
+        self.retry_budget = retry_budget if retry_budget is not None else RetryBudget()
+        self.telemetry = telemetry if telemetry is not None else JobTelemetry()
+        self.clients = clients if clients is not None else get_client_registry()
+        self.perplexity = PerplexityClient(retry_budget=self.retry_budget, telemetry=self.telemetry)
+        self.llm = LLMClient(provider=llm_provider, retry_budget=self.retry_budget, telemetry=self.telemetry, registry=self.clients)
+        # Hedge slow calls and fail over to the other provider when it's configured
+        self.fallback_provider = fallback_provider(llm_provider)
+        if self.fallback_provider:
+            self.llm = MultiProviderLLMClient([
+                self.llm,
+                LLMClient(provider=self.fallback_provider, retry_budget=self.retry_budget, telemetry=self.telemetry, registry=self.clients)
+            ])
+        # Async clients are created on first use by arun()
+        self._async_perplexity: Optional[AsyncPerplexityClient] = None
+        self._async_llm: Optional[AsyncLLMClient] = None
+        # Form field name -> LLM provider that extracted it, for the latest run
+        self.section_providers: Dict[str, str] = {}
+        self.cache = cache if cache is not None else get_research_cache()
+
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("AGENT_MAX_CONCURRENCY", "1"))
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+
+        if batch_extraction is None:
+            batch_extraction = os.getenv("AGENT_BATCH_EXTRACTION", "false").lower() in ("1", "true", "yes")
+        self.batch_extraction = batch_extraction
 
     def _resolve_citations(self, content: str, citations: list) -> str:
         """
@@ -34,27 +154,45 @@ class CodeCheckAgent:
             citation_text += f"[{i}]: {url}\n"
         return content + citation_text
 
-    def research_jurisdiction(self, address: str) -> LocationInformation:
-        """
-        Step 1: Identify Jurisdiction and Zoning.
-        """
-        query = f"What is the official municipality, zoning jurisdiction, and specific zoning designation for the address: {address}? Also provide the URL for the municipal code or zoning ordinance."
-        result = self.perplexity.search(query)
-        full_content = self._resolve_citations(result["content"], result["citations"])
+    @property
+    def async_perplexity(self) -> AsyncPerplexityClient:
+        if self._async_perplexity is None:
+            self._async_perplexity = AsyncPerplexityClient(api_key=self.perplexity.api_key, retry_budget=self.retry_budget, telemetry=self.telemetry)
+        return self._async_perplexity
+
+    @property
+    def async_llm(self) -> AsyncLLMClient:
+        if self._async_llm is None:
+            self._async_llm = AsyncLLMClient(provider=self.llm_provider, api_key=self.llm.api_key, retry_budget=self.retry_budget, telemetry=self.telemetry, registry=self.clients)
+            if self.fallback_provider:
+                self._async_llm = AsyncMultiProviderLLMClient([
+                    self._async_llm,
+                    AsyncLLMClient(provider=self.fallback_provider, retry_budget=self.retry_budget, telemetry=self.telemetry, registry=self.clients)
+                ])
+        return self._async_llm
+
+    def _record_provider(self, *field_names: str) -> None:
+        # Call right after extract_data(), in the same thread/task
+        provider = served_provider()
+        if provider:
+            for field_name in field_names:
+                self.section_providers[field_name] = provider
+
+    @staticmethod
+    def _jurisdiction_query(address: str) -> str:
+        return f"What is the official municipality, zoning jurisdiction, and specific zoning designation for the address: {address}? Also provide the URL for the municipal code or zoning ordinance."
 
-        system_instructions = (
+    @staticmethod
+    def _jurisdiction_instructions() -> str:
+        return (
             "Extract the location details. identify the 'Jurisdiction' (City/County name) "
             "and 'Zoning' (specific code like 'C-1' or 'Residential'). "
             "For 'municipal_website', find the link to the code/ordinance. "
             "For every field, find the specific source URL from the provided Citations list."
         )
 
-        return self.llm.extract_data(full_content, LocationInformation, system_instructions)
-
-    def research_section(self, section_name: str, model: Type[BaseModel], address: str, jurisdiction_info: LocationInformation) -> BaseModel:
-        """
-        Generic step to research a specific section of the code.
-        """
+    @staticmethod
+    def _section_query(section_name: str, address: str, jurisdiction_info: LocationInformation) -> str:
         jurisdiction = jurisdiction_info.jurisdiction.value or "the local municipality"
         zoning = jurisdiction_info.zoning.value or ""
 
@@ -65,48 +203,376 @@ class CodeCheckAgent:
         elif section_name == "Freestanding Signs":
             query += "Include details on allowed freestanding/pylon signs, setbacks, max area, height, quantity, and multi-tenant rules."
 
-        result = self.perplexity.search(query)
-        if not result["content"]:
-            return model()
+        return query
 
-        full_content = self._resolve_citations(result["content"], result["citations"])
-
-        system_instructions = (
+    @staticmethod
+    def _section_instructions(section_name: str) -> str:
+        return (
             f"You are researching {section_name}. Extract the specific regulations. "
             "For every field, you MUST provide the 'source_url' from the citation list that supports your answer. "
             "If a field is not explicitly mentioned in the text, leave it null/empty."
         )
 
-        return self.llm.extract_data(full_content, model, system_instructions)
+    @staticmethod
+    def _group_instructions(section_names: list) -> str:
+        return (
+            f"You are researching these sections: {', '.join(section_names)}. "
+            "The text below is split into one block per section, each with its own citation list. "
+            "Fill each section's fields only from its own block. "
+            "For every field, you MUST provide the 'source_url' from the citation list that supports your answer. "
+            "If a field is not explicitly mentioned in the text, leave it null/empty."
+        )
+
+    @staticmethod
+    def _group_content(blocks: list) -> str:
+        return "\n\n".join(f"=== {name} ===\n{content}" for name, content in blocks)
+
+    def research_jurisdiction(self, address: str) -> LocationInformation:
+        """
+        Step 1: Identify Jurisdiction and Zoning.
+        Served from the research cache for repeat or near-duplicate addresses.
+        """
+        if self.cache:
+            cached = self.cache.get_location(address)
+            if cached is not None:
+                return cached
+
+        result = self.perplexity.search(self._jurisdiction_query(address))
+        full_content = self._resolve_citations(result["content"], result["citations"])
+
+        location_info = self.llm.extract_data(full_content, LocationInformation, self._jurisdiction_instructions())
+        self._record_provider("location_information")
+        if self.cache:
+            self.cache.set_location(address, location_info)
+        return location_info
+
+    def research_section(self, section_name: str, model: Type[BaseModel], address: str, jurisdiction_info: LocationInformation) -> BaseModel:
+        """
+        Generic step to research a specific section of the code.
+        Served from the research cache when this jurisdiction/zoning was researched before.
+        """
+        if self.cache:
+            cached = self.cache.get_section(jurisdiction_info, section_name, model)
+            if cached is not None:
+                return cached
+
+        result = self.perplexity.search(self._section_query(section_name, address, jurisdiction_info))
+        if not result["content"]:
+            return model()
+
+        full_content = self._resolve_citations(result["content"], result["citations"])
+
+        section_data = self.llm.extract_data(full_content, model, self._section_instructions(section_name))
+        self._record_provider(FIELDS_BY_SECTION.get(section_name, section_name))
+        if self.cache:
+            self.cache.set_section(jurisdiction_info, section_name, model, section_data)
+        return section_data
+
+    async def aresearch_jurisdiction(self, address: str) -> LocationInformation:
+        """
+        Async variant of research_jurisdiction().
+        """
+        if self.cache:
+            cached = await asyncio.to_thread(self.cache.get_location, address)
+            if cached is not None:
+                return cached
+
+        result = await self.async_perplexity.search(self._jurisdiction_query(address))
+        full_content = self._resolve_citations(result["content"], result["citations"])
+
+        location_info = await self.async_llm.extract_data(full_content, LocationInformation, self._jurisdiction_instructions())
+        self._record_provider("location_information")
+        if self.cache:
+            await asyncio.to_thread(self.cache.set_location, address, location_info)
+        return location_info
+
+    async def aresearch_section(self, section_name: str, model: Type[BaseModel], address: str, jurisdiction_info: LocationInformation) -> BaseModel:
+        """
+        Async variant of research_section().
+        """
+        if self.cache:
+            # Cache backends may do disk or network I/O
+            cached = await asyncio.to_thread(self.cache.get_section, jurisdiction_info, section_name, model)
+            if cached is not None:
+                return cached
+
+        result = await self.async_perplexity.search(self._section_query(section_name, address, jurisdiction_info))
+        if not result["content"]:
+            return model()
+
+        full_content = self._resolve_citations(result["content"], result["citations"])
+
+        section_data = await self.async_llm.extract_data(full_content, model, self._section_instructions(section_name))
+        self._record_provider(FIELDS_BY_SECTION.get(section_name, section_name))
+        if self.cache:
+            await asyncio.to_thread(self.cache.set_section, jurisdiction_info, section_name, model, section_data)
+        return section_data
+
+    def research_section_group(self, field_names: Tuple[str, ...], address: str, jurisdiction_info: LocationInformation) -> Dict[str, BaseModel]:
+        """
+        Research several sections with one Perplexity search each but a single
+        LLM extraction against a composite schema.
+
+        Returns:
+            Dict of form field name -> section model
+        """
+        results: Dict[str, BaseModel] = {}
+        pending = []
+        for field_name in field_names:
+            name, model_cls = SECTIONS_BY_FIELD[field_name]
+            if self.cache:
+                cached = self.cache.get_section(jurisdiction_info, name, model_cls)
+                if cached is not None:
+                    results[field_name] = cached
+                    continue
+
+            with section_scope(field_name):
+                result = self.perplexity.search(self._section_query(name, address, jurisdiction_info))
+            if not result["content"]:
+                results[field_name] = model_cls()
+                continue
+            pending.append((field_name, name, self._resolve_citations(result["content"], result["citations"])))
+
+        if len(pending) == 1:
+            field_name, name, content = pending[0]
+            pending_data = {field_name: self.llm.extract_data(content, SECTIONS_BY_FIELD[field_name][1], self._section_instructions(name))}
+        elif pending:
+            composite = composite_model(tuple(field_name for field_name, _, _ in pending))
+            extracted = self.llm.extract_data(
+                self._group_content([(name, content) for _, name, content in pending]),
+                composite,
+                self._group_instructions([name for _, name, _ in pending])
+            )
+            pending_data = {field_name: getattr(extracted, field_name) for field_name, _, _ in pending}
+        else:
+            pending_data = {}
+        self._record_provider(*pending_data)
+
+        for field_name, section_data in pending_data.items():
+            name, model_cls = SECTIONS_BY_FIELD[field_name]
+            if self.cache:
+                self.cache.set_section(jurisdiction_info, name, model_cls, section_data)
+            results[field_name] = section_data
+
+        return results
+
+    def _research_unit(self, unit, address: str, location_info: LocationInformation, on_section: Optional[SectionCallback] = None) -> Dict[str, BaseModel]:
+        # A unit is a SECTION_GROUPS entry in batch mode, otherwise one SECTIONS entry
+        with self.telemetry.section(self._unit_label(unit)):
+            if self.batch_extraction:
+                results = self.research_section_group(unit, address, location_info)
+            else:
+                name, model_cls, field_name = unit
+                results = {field_name: self.research_section(name, model_cls, address, location_info)}
+
+        if on_section:
+            for field_name, section_data in results.items():
+                on_section(field_name, section_data)
+        return results
+
+    def _unit_label(self, unit) -> str:
+        # Telemetry key: the field name, or "a+b+c" for a section group
+        return "+".join(unit) if self.batch_extraction else unit[2]
+
+    def _units(self, field_names: Optional[Iterable[str]] = None) -> List:
+        """
+        Work units for research_sections(): SECTIONS entries, or SECTION_GROUPS
+        in batch extraction mode, restricted to field_names when given.
+        """
+        wanted = set(field_names) if field_names is not None else set(SECTIONS_BY_FIELD)
+        if self.batch_extraction:
+            groups = [tuple(field_name for field_name in group if field_name in wanted) for group in SECTION_GROUPS]
+            return [group for group in groups if group]
+        return [section for section in SECTIONS if section[2] in wanted]
+
+    def research_sections(
+        self,
+        address: str,
+        location_info: LocationInformation,
+        on_section: Optional[SectionCallback] = None,
+        field_names: Optional[Iterable[str]] = None
+    ) -> Dict[str, BaseModel]:
+        """
+        Research all sections for an address, fanning out up to max_concurrency
+        sections (or section groups, in batch extraction mode) at a time.
+        Each section only depends on the shared location info.
+
+        Args:
+            on_section: Optional callback invoked with (field name, section model)
+                as each section completes. In concurrent mode it runs on worker
+                threads, in completion order.
+            field_names: Only research these form fields (default: all sections)
+
+        Returns:
+            Dict of form field name -> section model, in SECTIONS order
+        """
+        units = self._units(field_names)
+        if not units:
+            return {}
+
+        def research(unit):
+            return self._research_unit(unit, address, location_info, on_section)
+
+        if self.max_concurrency == 1:
+            results = [research(unit) for unit in units]
+        else:
+            workers = min(self.max_concurrency, len(units))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="section") as executor:
+                results = list(executor.map(research, units))
 
-    def run(self, address: str) -> CodeCheckForm:
+        merged = {field_name: data for result in results for field_name, data in result.items()}
+        return {field_name: merged[field_name] for _, _, field_name in SECTIONS if field_name in merged}
+
+    def run(
+        self,
+        address: str,
+        on_section: Optional[SectionCallback] = None,
+        location_info: Optional[LocationInformation] = None,
+        field_names: Optional[Iterable[str]] = None
+    ) -> CodeCheckForm:
         """
         Main orchestration method.
+
+        Args:
+            address: US address to research
+            on_section: Optional callback invoked with (field name, section model)
+                for location_information and then each section as soon as it is
+                researched, so callers can persist progress before run() returns.
+            location_info: Previously researched location (e.g. when resuming a
+                job); skips the jurisdiction step and is not reported again.
+            field_names: Only research these sections (default: all). Sections
+                not researched keep their empty defaults in the returned form.
+
+        Afterwards section_providers maps each extracted field to the LLM
+        provider that served it (cached sections are not listed).
         """
+        self.section_providers = {}
+
         # 1. Location & Jurisdiction
-        location_info = self.research_jurisdiction(address)
+        if location_info is None:
+            with self.telemetry.section("location_information"):
+                location_info = self.research_jurisdiction(address)
+            if on_section:
+                on_section("location_information", location_info)
+
+        form = CodeCheckForm()
+        form.location_information = location_info
+
+        # 2. Research each section (concurrently when max_concurrency > 1)
+        for field_name, section_data in self.research_sections(address, location_info, on_section, field_names).items():
+            setattr(form, field_name, section_data)
+
+        return form
+
+    async def aresearch_section_group(self, field_names: Tuple[str, ...], address: str, jurisdiction_info: LocationInformation) -> Dict[str, BaseModel]:
+        """
+        Async variant of research_section_group(); the group's searches run concurrently.
+        """
+        async def search(field_name):
+            name, model_cls = SECTIONS_BY_FIELD[field_name]
+            if self.cache:
+                cached = await asyncio.to_thread(self.cache.get_section, jurisdiction_info, name, model_cls)
+                if cached is not None:
+                    return cached
+            with section_scope(field_name):
+                result = await self.async_perplexity.search(self._section_query(name, address, jurisdiction_info))
+            if not result["content"]:
+                return model_cls()
+            return self._resolve_citations(result["content"], result["citations"])
+
+        searched = await asyncio.gather(*(search(field_name) for field_name in field_names))
+
+        results: Dict[str, BaseModel] = {}
+        pending = []
+        for field_name, outcome in zip(field_names, searched):
+            if isinstance(outcome, BaseModel):
+                results[field_name] = outcome
+            else:
+                pending.append((field_name, SECTIONS_BY_FIELD[field_name][0], outcome))
+
+        if len(pending) == 1:
+            field_name, name, content = pending[0]
+            pending_data = {field_name: await self.async_llm.extract_data(content, SECTIONS_BY_FIELD[field_name][1], self._section_instructions(name))}
+        elif pending:
+            composite = composite_model(tuple(field_name for field_name, _, _ in pending))
+            extracted = await self.async_llm.extract_data(
+                self._group_content([(name, content) for _, name, content in pending]),
+                composite,
+                self._group_instructions([name for _, name, _ in pending])
+            )
+            pending_data = {field_name: getattr(extracted, field_name) for field_name, _, _ in pending}
+        else:
+            pending_data = {}
+        self._record_provider(*pending_data)
+
+        for field_name, section_data in pending_data.items():
+            name, model_cls = SECTIONS_BY_FIELD[field_name]
+            if self.cache:
+                await asyncio.to_thread(self.cache.set_section, jurisdiction_info, name, model_cls, section_data)
+            results[field_name] = section_data
+
+        return results
+
+    @staticmethod
+    async def _notify(on_section: Optional[SectionCallback], field_name: str, section_data: BaseModel) -> None:
+        # Async callers may pass either a plain function or a coroutine function
+        if on_section:
+            outcome = on_section(field_name, section_data)
+            if inspect.isawaitable(outcome):
+                await outcome
+
+    async def aresearch_sections(
+        self,
+        address: str,
+        location_info: LocationInformation,
+        on_section: Optional[SectionCallback] = None,
+        field_names: Optional[Iterable[str]] = None
+    ) -> Dict[str, BaseModel]:
+        """
+        Async variant of research_sections(); at most max_concurrency sections
+        (or section groups) are in flight.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        units = self._units(field_names)
+
+        async def research(unit):
+            async with semaphore:
+                with self.telemetry.section(self._unit_label(unit)):
+                    if self.batch_extraction:
+                        results = await self.aresearch_section_group(unit, address, location_info)
+                    else:
+                        name, model_cls, field_name = unit
+                        results = {field_name: await self.aresearch_section(name, model_cls, address, location_info)}
+            for field_name, section_data in results.items():
+                await self._notify(on_section, field_name, section_data)
+            return results
+
+        results = await asyncio.gather(*(research(unit) for unit in units))
+
+        merged = {field_name: data for result in results for field_name, data in result.items()}
+        return {field_name: merged[field_name] for _, _, field_name in SECTIONS if field_name in merged}
+
+    async def arun(
+        self,
+        address: str,
+        on_section: Optional[SectionCallback] = None,
+        location_info: Optional[LocationInformation] = None,
+        field_names: Optional[Iterable[str]] = None
+    ) -> CodeCheckForm:
+        """
+        Async orchestration method. Same result as run(), but never blocks the event loop.
+        on_section may be a plain function or a coroutine function.
+        """
+        self.section_providers = {}
+        if location_info is None:
+            with self.telemetry.section("location_information"):
+                location_info = await self.aresearch_jurisdiction(address)
+            await self._notify(on_section, "location_information", location_info)
 
         form = CodeCheckForm()
         form.location_information = location_info
 
-        # 2. Research each section
-        sections = [
-            ("Wall Signs", WallSigns, "wall_signs"),
-            ("Projecting Signs", ProjectingSigns, "projecting_signs"),
-            ("Freestanding Signs", FreestandingSigns, "freestanding_signs"),
-            ("Directionals / Regulatory / Parking Lot", DirectionalsRegulatory, "directionals_regulatory"),
-            ("Informational Signs", InformationalSigns, "informational_signs"),
-            ("Awnings", Awnings, "awnings"),
-            ("Undercanopy Signs", UndercanopySigns, "undercanopy_signs"),
-            ("Window Signs", WindowSigns, "window_signs"),
-            ("Temporary Signs", TemporarySigns, "temporary_signs"),
-            ("Approval Process", ApprovalProcess, "approval_process"),
-            ("Permit Requirements", PermitRequirements, "permit_requirements"),
-            ("Variance Procedures", VarianceProcedures, "variance_procedures"),
-        ]
-
-        for name, model_cls, field_name in sections:
-            section_data = self.research_section(name, model_cls, address, location_info)
+        for field_name, section_data in (await self.aresearch_sections(address, location_info, on_section, field_names)).items():
             setattr(form, field_name, section_data)
 
         return form
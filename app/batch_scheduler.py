@@ -0,0 +1,192 @@
+"""
+Jurisdiction-Aware Batch Scheduler
+
+Runs a batch of jobs so upstream research scales with the number of
+distinct jurisdictions instead of the number of addresses:
+
+1. Resolve every address's jurisdiction first (research_jurisdiction is one
+   search + one extraction, and memoized by the location cache)
+2. Group jobs by jurisdiction and zoning, the same scope the section cache
+   shares results over
+3. Research each group's 12 sections once and fan every section out to all
+   jobs in the group
+
+Jobs whose jurisdiction couldn't be identified run on their own.
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .cache import normalize_key_part
+from .models import LocationInformation
+
+# Route POST /jobs/batch through the scheduler (false = one worker per job)
+JOB_BATCH_SCHEDULER = os.getenv("JOB_BATCH_SCHEDULER", "true").lower() in ("1", "true", "yes")
+# Jurisdiction lookups in flight at once during the first pass
+JOB_BATCH_LOOKUP_CONCURRENCY = int(os.getenv("JOB_BATCH_LOOKUP_CONCURRENCY", "8"))
+# Jurisdiction groups researched at once (each fans out per AGENT_MAX_CONCURRENCY)
+JOB_BATCH_GROUP_CONCURRENCY = int(os.getenv("JOB_BATCH_GROUP_CONCURRENCY", "2"))
+
+Job = Dict[str, Any]
+
+
+def jurisdiction_group_key(location_info: LocationInformation) -> Optional[str]:
+    """
+    Key shared by addresses whose sections can be researched once:
+    jurisdiction|zoning, or None when the jurisdiction is unknown.
+    """
+    jurisdiction = normalize_key_part(location_info.jurisdiction.value)
+    if not jurisdiction:
+        return None
+    return f"{jurisdiction}|{normalize_key_part(location_info.zoning.value)}"
+
+
+class JurisdictionGroup:
+    """Jobs researched together, with the location used for the shared research."""
+
+    def __init__(self, key: Optional[str], jobs: List[Tuple[Job, LocationInformation]]):
+        self.key = key
+        self.jobs = jobs
+
+    @property
+    def address(self) -> str:
+        return self.jobs[0][0]["address"]
+
+    @property
+    def location_info(self) -> LocationInformation:
+        return self.jobs[0][1]
+
+
+class BatchScheduler:
+    """
+    Schedule a batch of jobs by jurisdiction on a CodeCheckAgent.
+
+    Results are reported through callbacks so callers decide how to persist
+    them (see worker_logic.process_research_batch).
+    """
+
+    def __init__(
+        self,
+        agent,
+        lookup_concurrency: int = JOB_BATCH_LOOKUP_CONCURRENCY,
+        group_concurrency: int = JOB_BATCH_GROUP_CONCURRENCY,
+        agent_for: Optional[Callable[[List[Job]], Any]] = None
+    ):
+        """
+        Args:
+            agent: CodeCheckAgent used for all research
+            lookup_concurrency: Jurisdiction lookups in flight at once
+            group_concurrency: Jurisdiction groups researched at once
+            agent_for: Called with the jobs a unit of work is for (one job's
+                jurisdiction lookup, or a group's sections) and returns the
+                agent to do it, so callers can keep each job's telemetry
+                apart. Default: agent for everything
+        """
+        if lookup_concurrency < 1 or group_concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.agent = agent
+        self.agent_for = agent_for or (lambda jobs: agent)
+        self.lookup_concurrency = lookup_concurrency
+        self.group_concurrency = group_concurrency
+
+    def resolve(self, jobs: List[Job]) -> List[Tuple[Job, Optional[LocationInformation], Optional[Exception]]]:
+        """
+        Resolve every job's jurisdiction concurrently.
+
+        Returns:
+            (job, location_info, error) per job, in input order
+        """
+        def lookup(job):
+            try:
+                return job, self.agent_for([job]).research_jurisdiction(job["address"]), None
+            except Exception as e:
+                return job, None, e
+
+        if not jobs:
+            return []
+        workers = min(self.lookup_concurrency, len(jobs))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jurisdiction") as executor:
+            return list(executor.map(lookup, jobs))
+
+    @staticmethod
+    def plan(located: List[Tuple[Job, LocationInformation]]) -> List[JurisdictionGroup]:
+        """
+        Group located jobs by jurisdiction, largest groups first.
+        Jobs with an unknown jurisdiction each form their own group.
+        """
+        groups: Dict[str, List[Tuple[Job, LocationInformation]]] = {}
+        singles = []
+        for job, location_info in located:
+            key = jurisdiction_group_key(location_info)
+            if key is None:
+                singles.append(JurisdictionGroup(None, [(job, location_info)]))
+            else:
+                groups.setdefault(key, []).append((job, location_info))
+
+        planned = [JurisdictionGroup(key, members) for key, members in groups.items()]
+        planned.sort(key=lambda group: len(group.jobs), reverse=True)
+        return planned + singles
+
+    def run(
+        self,
+        jobs: List[Job],
+        on_location: Callable[[Job, LocationInformation], Any],
+        on_section: Callable[[Job, str, BaseModel], Any],
+        on_done: Callable[[Job], Any],
+        on_error: Callable[[Job, Exception], Any]
+    ) -> Dict[str, int]:
+        """
+        Research a batch of jobs.
+
+        Args:
+            jobs: Job dicts with at least 'id' and 'address'
+            on_location: Called with each job's own location_information
+            on_section: Called with (job, field name, section) for every job in
+                a group as each shared section completes
+            on_done: Called once a job has all its sections
+            on_error: Called when a job's jurisdiction lookup or its group's
+                research fails
+
+        Returns:
+            Dict with 'jobs', 'groups' and 'failed' counts
+        """
+        located = []
+        failed = 0
+        for job, location_info, error in self.resolve(jobs):
+            if error is not None:
+                failed += 1
+                on_error(job, error)
+                continue
+            on_location(job, location_info)
+            located.append((job, location_info))
+
+        groups = self.plan(located)
+        print(f"[Scheduler] {len(jobs)} jobs in {len(groups)} jurisdiction groups", file=sys.stderr)
+
+        def research(group: JurisdictionGroup) -> int:
+            def fan_out(field_name, section_data):
+                for job, _ in group.jobs:
+                    on_section(job, field_name, section_data)
+
+            try:
+                agent = self.agent_for([job for job, _ in group.jobs])
+                agent.research_sections(group.address, group.location_info, on_section=fan_out)
+            except Exception as e:
+                print(f"[Scheduler] Group {group.key or group.address} failed: {e}", file=sys.stderr)
+                for job, _ in group.jobs:
+                    on_error(job, e)
+                return len(group.jobs)
+
+            for job, _ in group.jobs:
+                on_done(job)
+            return 0
+
+        if groups:
+            workers = min(self.group_concurrency, len(groups))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jurisdiction-group") as executor:
+                failed += sum(executor.map(research, groups))
+
+        return {"jobs": len(jobs), "groups": len(groups), "failed": failed}
@@ -0,0 +1,393 @@
+"""
+Research Cache
+
+Caches extracted section models so repeat jurisdictions skip both the
+Perplexity search and the LLM extraction, and memoizes the jurisdiction
+lookup (LocationInformation) per normalized address.
+
+Section entries are keyed on the normalized jurisdiction, zoning designation,
+section name and schema version; location entries on the normalized address
+and schema version. Entries expire after a TTL and are evicted
+least-recently-used once the backend holds more than max_entries.
+
+Backends (RESEARCH_CACHE_BACKEND):
+- none: caching disabled (default)
+- memory: per-process LRU dict
+- sqlite: file on local disk, shared by processes on one host
+- supabase: code_research_cache table (migrations/002_create_research_cache.sql)
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+from .address import normalize_address
+from .models import LocationInformation
+
+# Bump to invalidate every cached entry (e.g. after changing research prompts)
+CACHE_SCHEMA_VERSION = "1"
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def normalize_key_part(value: Optional[str]) -> str:
+    """Lowercase, strip punctuation and collapse whitespace for use in a cache key."""
+    if not value:
+        return ""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(value).lower()).split())
+
+
+@lru_cache(maxsize=None)
+def schema_fingerprint(model: Type[BaseModel]) -> str:
+    """
+    Short hash of a model's JSON schema, so entries written by an older
+    version of a section model are never served to a newer one.
+    """
+    schema = json.dumps(model.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode()).hexdigest()[:12]
+
+
+class CacheBackend:
+    """
+    Key/value storage for cache entries (JSON-serializable dicts).
+
+    Implementations enforce the TTL on read and the LRU size cap on write.
+    """
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache. Thread-safe; lost when the process exits."""
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__(ttl_seconds, max_entries)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache stored in a SQLite file on local disk."""
+
+    def __init__(self, path: str, ttl_seconds: int = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__(ttl_seconds, max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS research_cache ("
+                "cache_key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_research_cache_last_accessed "
+                "ON research_cache(last_accessed_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM research_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM research_cache WHERE cache_key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE research_cache SET last_accessed_at = ? WHERE cache_key = ?", (now, key)
+            )
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO research_cache (cache_key, value, expires_at, last_accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl_seconds, now)
+            )
+            conn.execute("DELETE FROM research_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM research_cache WHERE cache_key NOT IN ("
+                "SELECT cache_key FROM research_cache ORDER BY last_accessed_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM research_cache WHERE cache_key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM research_cache")
+
+
+class SupabaseCacheBackend(CacheBackend):
+    """
+    Cache stored in the code_research_cache table, shared by the API and all workers.
+
+    LRU eviction runs through the prune_code_research_cache() function every
+    prune_interval writes rather than on every write.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        prune_interval: int = 50
+    ):
+        super().__init__(ttl_seconds, max_entries)
+        self.prune_interval = prune_interval
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_client():
+        from .db import get_supabase_client
+        return get_supabase_client()
+
+    @staticmethod
+    def _iso(timestamp: float) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        client = self._get_client()
+        now = time.time()
+        result = client.table("code_research_cache")\
+            .select("value")\
+            .eq("cache_key", key)\
+            .gt("expires_at", self._iso(now))\
+            .execute()
+        if not result.data:
+            return None
+        client.table("code_research_cache")\
+            .update({"last_accessed_at": self._iso(now)})\
+            .eq("cache_key", key)\
+            .execute()
+        return result.data[0]["value"]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        client = self._get_client()
+        now = time.time()
+        client.table("code_research_cache").upsert({
+            "cache_key": key,
+            "value": value,
+            "expires_at": self._iso(now + self.ttl_seconds),
+            "last_accessed_at": self._iso(now)
+        }).execute()
+
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.prune_interval == 0
+        if should_prune:
+            client.rpc("prune_code_research_cache", {"max_entries": self.max_entries}).execute()
+
+    def delete(self, key: str) -> None:
+        self._get_client().table("code_research_cache").delete().eq("cache_key", key).execute()
+
+    def clear(self) -> None:
+        self._get_client().table("code_research_cache").delete().neq("cache_key", "").execute()
+
+
+class ResearchCache:
+    """
+    Section and location result cache used by CodeCheckAgent.
+
+    Wraps a CacheBackend with key construction, model (de)serialization
+    and per-kind hit/miss counters. Backend errors are treated as misses so
+    a cache outage never fails a job.
+    """
+
+    KINDS = ("location", "section")
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._counters = {kind: {"hits": 0, "misses": 0} for kind in self.KINDS}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def location_key(address: str) -> Optional[str]:
+        """Build the cache key for an address's jurisdiction lookup."""
+        normalized = normalize_address(address)
+        if not normalized:
+            return None
+        return f"location:v{CACHE_SCHEMA_VERSION}:{schema_fingerprint(LocationInformation)}:{normalized}"
+
+    @staticmethod
+    def section_key(jurisdiction_info: LocationInformation, section_name: str, model: Type[BaseModel]) -> Optional[str]:
+        """
+        Build the cache key for a section, or None when the jurisdiction is
+        unknown (results for an unidentified municipality are not shareable).
+        """
+        jurisdiction = normalize_key_part(jurisdiction_info.jurisdiction.value)
+        if not jurisdiction:
+            return None
+        zoning = normalize_key_part(jurisdiction_info.zoning.value)
+        section = normalize_key_part(section_name)
+        return f"section:v{CACHE_SCHEMA_VERSION}:{schema_fingerprint(model)}:{jurisdiction}|{zoning}|{section}"
+
+    def _get(self, kind: str, key: Optional[str], model: Type[BaseModel]) -> Optional[BaseModel]:
+        if key is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            value = None
+        with self._lock:
+            self._counters[kind]["hits" if value is not None else "misses"] += 1
+        return model.model_validate(value) if value is not None else None
+
+    def _set(self, key: Optional[str], data: BaseModel) -> None:
+        if key is None:
+            return
+        try:
+            self.backend.set(key, data.model_dump(mode="json"))
+        except Exception:
+            pass
+
+    def get_location(self, address: str) -> Optional[LocationInformation]:
+        return self._get("location", self.location_key(address), LocationInformation)
+
+    def set_location(self, address: str, data: LocationInformation) -> None:
+        # An unidentified jurisdiction is not worth memoizing; retry it next time
+        if not data.jurisdiction.value:
+            return
+        self._set(self.location_key(address), data)
+
+    def get_section(self, jurisdiction_info: LocationInformation, section_name: str, model: Type[BaseModel]) -> Optional[BaseModel]:
+        return self._get("section", self.section_key(jurisdiction_info, section_name, model), model)
+
+    def set_section(self, jurisdiction_info: LocationInformation, section_name: str, model: Type[BaseModel], data: BaseModel) -> None:
+        self._set(self.section_key(jurisdiction_info, section_name, model), data)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters since process start.
+
+        Returns:
+            Dict with the backend name and, per kind ('location', 'section'),
+            hits, misses and hit_ratio
+        """
+        with self._lock:
+            stats: Dict[str, Any] = {"backend": type(self.backend).__name__}
+            for kind, counts in self._counters.items():
+                total = counts["hits"] + counts["misses"]
+                stats[kind] = {
+                    "hits": counts["hits"],
+                    "misses": counts["misses"],
+                    "hit_ratio": counts["hits"] / total if total else 0.0
+                }
+            return stats
+
+
+def create_cache_backend(
+    backend: str,
+    ttl_seconds: int = DEFAULT_TTL_SECONDS,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    sqlite_path: Optional[str] = None
+) -> Optional[CacheBackend]:
+    """
+    Build a cache backend by name ('none', 'memory', 'sqlite' or 'supabase').
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    backend = backend.lower()
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryCacheBackend(ttl_seconds, max_entries)
+    if backend == "sqlite":
+        return SQLiteCacheBackend(sqlite_path or ".cache/research_cache.sqlite3", ttl_seconds, max_entries)
+    if backend == "supabase":
+        return SupabaseCacheBackend(ttl_seconds, max_entries)
+    raise ValueError(f"Unsupported cache backend: {backend}")
+
+
+@lru_cache(maxsize=1)
+def get_research_cache() -> Optional[ResearchCache]:
+    """
+    Get the process-wide research cache configured from the environment.
+
+    Environment variables:
+    - RESEARCH_CACHE_BACKEND: none (default), memory, sqlite or supabase
+    - RESEARCH_CACHE_TTL_SECONDS: Entry lifetime (default: 7 days)
+    - RESEARCH_CACHE_MAX_ENTRIES: LRU size cap (default: 10000)
+    - RESEARCH_CACHE_SQLITE_PATH: SQLite file (default: .cache/research_cache.sqlite3)
+
+    Returns:
+        ResearchCache, or None when caching is disabled
+    """
+    backend = create_cache_backend(
+        os.getenv("RESEARCH_CACHE_BACKEND", "none"),
+        ttl_seconds=int(os.getenv("RESEARCH_CACHE_TTL_SECONDS", str(DEFAULT_TTL_SECONDS))),
+        max_entries=int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))),
+        sqlite_path=os.getenv("RESEARCH_CACHE_SQLITE_PATH")
+    )
+    return ResearchCache(backend) if backend is not None else None
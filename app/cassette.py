@@ -0,0 +1,187 @@
+"""
+Upstream Record / Replay
+
+A cassette stores what Perplexity and the LLM providers returned, so a job
+can be rerun deterministically and at no cost:
+
+- record: every successful upstream response is appended to the cassette
+  with its latency
+- replay: responses are served from the cassette and nothing is sent
+  upstream; a request that was never recorded raises CassetteMissError
+
+Entries are keyed by a hash of the provider, model, prompt/query and (for
+extraction) the response schema's fingerprint (app.cache.schema_fingerprint). The file is gzip-compressed JSON lines,
+one entry per line: {"k": key, "op": "perplexity.search", "ms": latency,
+"r": response}. Appends are durable per entry, so a crashed worker keeps
+everything it recorded. A key recorded several times is replayed in
+recorded order, repeating the last response.
+
+Environment variables:
+- UPSTREAM_CASSETTE: off (default), record or replay
+- UPSTREAM_CASSETTE_PATH: Cassette file (default: .cassettes/upstream.jsonl.gz)
+- UPSTREAM_CASSETTE_TIMING: zero (default) or original - replay instantly
+  or sleep for each response's recorded latency
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .retry import UpstreamError
+
+CASSETTE_MODES = ("off", "record", "replay")
+CASSETTE_TIMINGS = ("zero", "original")
+DEFAULT_CASSETTE_PATH = os.path.join(".cassettes", "upstream.jsonl.gz")
+
+
+class CassetteMissError(UpstreamError):
+    """Replay mode: the request was never recorded."""
+
+
+def cassette_key(*parts: Any) -> str:
+    """Hash request parts (provider, model, prompt, schema digest...) into an entry key."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+class Cassette:
+    """Recorded upstream responses backed by one file. Thread-safe."""
+
+    def __init__(self, path: str, mode: str = "record", timing: str = "zero"):
+        """
+        Args:
+            path: Cassette file (gzip JSON lines)
+            mode: 'record' or 'replay'
+            timing: Replay latency, 'zero' or 'original'
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if timing not in CASSETTE_TIMINGS:
+            raise ValueError(f"Unknown cassette timing: {timing}")
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self._entries: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._entries is None:
+            entries: Dict[str, List[Dict[str, Any]]] = {}
+            if os.path.exists(self.path):
+                with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            entries.setdefault(entry["k"], []).append(entry)
+            self._entries = entries
+            print(f"[Cassette] Loaded {sum(map(len, entries.values()))} responses from {self.path}", file=sys.stderr)
+        return self._entries
+
+    def lookup(self, key: str, operation: str) -> Dict[str, Any]:
+        """Next recorded entry for a key (replay order)."""
+        with self._lock:
+            recorded = self._load().get(key)
+            if not recorded:
+                provider = operation.split(".")[0]
+                raise CassetteMissError(f"No recorded {operation} response for key {key} in {self.path}", provider)
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            return recorded[min(index, len(recorded) - 1)]
+
+    def record(self, key: str, operation: str, response: Any, seconds: float) -> None:
+        """Append one response to the cassette."""
+        line = json.dumps(
+            {"k": key, "op": operation, "ms": round(seconds * 1000, 1), "r": response},
+            separators=(",", ":"),
+            default=str
+        )
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Each append is its own gzip member; gzip readers concatenate them
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line + "\n")
+            if self._entries is not None:
+                self._entries.setdefault(key, []).append(json.loads(line))
+
+    def _delay(self, entry: Dict[str, Any]) -> float:
+        return entry["ms"] / 1000 if self.timing == "original" else 0.0
+
+    def call(
+        self,
+        key: str,
+        operation: str,
+        fetch: Callable[[], Any],
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda stored: stored
+    ) -> Any:
+        """
+        Fetch a response through the cassette.
+
+        Args:
+            key: cassette_key() of the request
+            operation: e.g. 'perplexity.search' or 'openai.extract'
+            fetch: Performs the real upstream call (record mode)
+            encode: Response -> JSON-serializable form to store
+            decode: Stored form -> response object the caller expects
+        """
+        if self.replaying:
+            entry = self.lookup(key, operation)
+            delay = self._delay(entry)
+            if delay:
+                time.sleep(delay)
+            return decode(entry["r"])
+        start = time.monotonic()
+        value = fetch()
+        self.record(key, operation, encode(value), time.monotonic() - start)
+        return value
+
+    async def acall(
+        self,
+        key: str,
+        operation: str,
+        fetch: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda stored: stored
+    ) -> Any:
+        """call() for async upstream calls."""
+        if self.replaying:
+            entry = self.lookup(key, operation)
+            delay = self._delay(entry)
+            if delay:
+                await asyncio.sleep(delay)
+            return decode(entry["r"])
+        start = time.monotonic()
+        value = await fetch()
+        self.record(key, operation, encode(value), time.monotonic() - start)
+        return value
+
+
+@lru_cache(maxsize=1)
+def get_cassette() -> Optional[Cassette]:
+    """
+    Get the process-wide cassette configured by UPSTREAM_CASSETTE.
+
+    Returns:
+        Cassette, or None when record/replay is off
+    """
+    mode = os.getenv("UPSTREAM_CASSETTE", "off").lower()
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"Unknown UPSTREAM_CASSETTE mode: {mode}")
+    if mode == "off":
+        return None
+    path = os.getenv("UPSTREAM_CASSETTE_PATH", DEFAULT_CASSETTE_PATH)
+    timing = os.getenv("UPSTREAM_CASSETTE_TIMING", "zero").lower()
+    print(f"[Cassette] {mode} mode, {path} (replay timing: {timing})", file=sys.stderr)
+    return Cassette(path, mode, timing)
@@ -1,30 +1,310 @@
+import asyncio
 import os
 import json
+import sys
+import threading
+import time
+import types
+import httpx
 import requests
-from typing import List, Dict, Any, Optional, Type
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import ContextVar, copy_context
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Type
 from pydantic import BaseModel
-from openai import OpenAI
-import google.generativeai as genai
+
+from .cache import schema_fingerprint
+from .cassette import Cassette, cassette_key, get_cassette
+from .rate_limit import ProviderLimiter, get_rate_limiter
+from .retry import RetryBudget, RetryPolicy, classify_error, get_retry_policy
+from .schema_registry import CompiledSchema, get_schema_registry
+from .telemetry import JobTelemetry, UpstreamCall, upstream_call
+
+# Upstream HTTP connection pool settings
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_KEEP_ALIVE = os.getenv("HTTP_KEEP_ALIVE", "true").lower() in ("1", "true", "yes")
+HTTP_KEEP_ALIVE_EXPIRY = float(os.getenv("HTTP_KEEP_ALIVE_EXPIRY", "60"))
+PERPLEXITY_CONNECT_TIMEOUT = float(os.getenv("PERPLEXITY_CONNECT_TIMEOUT", "10"))
+PERPLEXITY_READ_TIMEOUT = float(os.getenv("PERPLEXITY_READ_TIMEOUT", "120"))
+
+# Multi-provider extraction (see MultiProviderLLMClient)
+LLM_PROVIDERS = ("openai", "gemini")
+LLM_FALLBACK_PROVIDER = os.getenv("LLM_FALLBACK_PROVIDER", "none").lower()
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "30"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+LLM_HEDGE_POOL_SIZE = int(os.getenv("LLM_HEDGE_POOL_SIZE", "64"))
+LLM_FAILURE_THRESHOLD = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))
+LLM_FAILURE_COOLDOWN = float(os.getenv("LLM_FAILURE_COOLDOWN", "60"))
+
+# The google.generativeai and openai SDKs take a second or more to import, so
+# they are loaded when a client first needs them (cold starts of endpoints
+# that never call an LLM don't pay for them)
+def _genai():
+    import google.generativeai as genai
+    return genai
+
+# genai.configure() sets one API key for the whole process, shared by every
+# GenerativeModel, so the process can only ever use one Gemini key
+_gemini_api_key: Optional[str] = None
+_gemini_lock = threading.Lock()
+
+
+def _configure_gemini(genai, api_key: str) -> None:
+    """Configure the Gemini SDK with the process's key (once)."""
+    global _gemini_api_key
+    with _gemini_lock:
+        if _gemini_api_key is None:
+            genai.configure(api_key=api_key)
+            _gemini_api_key = api_key
+        elif _gemini_api_key != api_key:
+            raise ValueError("Gemini is already configured with another API key; one key per process is supported")
+
+# Provider that served the caller's most recent extract_data() call
+_served_provider: ContextVar[Optional[str]] = ContextVar("served_provider", default=None)
+
+
+def served_provider() -> Optional[str]:
+    """Provider ('openai' or 'gemini') that answered this thread's/task's last extraction."""
+    return _served_provider.get()
+
+
+@lru_cache(maxsize=1)
+def get_http_session() -> requests.Session:
+    """
+    Get the shared, pooled HTTP session for sync upstream calls.
+
+    Uses lru_cache to ensure a single instance per process, so every
+    PerplexityClient (and every agent) reuses the same keep-alive connections
+    instead of paying a TLS handshake per request.
+    Environment variables:
+    - HTTP_POOL_SIZE: Max pooled connections per host (default: 20)
+    - HTTP_KEEP_ALIVE: Reuse connections between requests (default: true)
+
+    Returns:
+        requests.Session: Session with a pooled HTTPS adapter mounted
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, pool_block=False)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not HTTP_KEEP_ALIVE:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def get_http_pool_stats(session: Optional[requests.Session] = None) -> Dict[str, Any]:
+    """
+    Connection pool statistics for a sync session (the shared session by default).
+
+    Returns:
+        Dict with pool settings and, per host, the number of connections
+        opened, requests served and idle connections available for reuse.
+    """
+    adapter = (session or get_http_session()).get_adapter("https://")
+    pools = adapter.poolmanager.pools
+    hosts = {}
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+            "connections_opened": pool.num_connections,
+            "requests": pool.num_requests,
+            "idle_connections": pool.pool.qsize() if pool.pool is not None else 0,
+        }
+    return {
+        "pool_size": HTTP_POOL_SIZE,
+        "keep_alive": HTTP_KEEP_ALIVE,
+        "hosts": hosts,
+    }
+
+# Shared async HTTP clients, one per event loop (httpx connection pools are
+# loop-bound), keyed by id(loop) with the loop kept alongside: an id can be
+# reused once its loop is gone
+_async_http_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+_async_http_clients_lock = threading.Lock()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client for the running event loop.
+
+    All async upstream clients in a process reuse this connection pool.
+    Must be called from within a running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_http_clients_lock:
+        entry = _async_http_clients.get(id(loop))
+        if entry is not None and entry[0] is loop and not entry[1].is_closed:
+            return entry[1]
+        # Clients of loops that have since closed (asyncio.run() per job) are dropped
+        for key, (other, _) in list(_async_http_clients.items()):
+            if other.is_closed():
+                del _async_http_clients[key]
+        client = httpx.AsyncClient(
+            timeout=None,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE,
+                max_keepalive_connections=HTTP_POOL_SIZE if HTTP_KEEP_ALIVE else 0,
+                keepalive_expiry=HTTP_KEEP_ALIVE_EXPIRY
+            )
+        )
+        _async_http_clients[id(loop)] = (loop, client)
+        return client
+
+
+async def close_async_http_client() -> None:
+    """Close the shared async HTTP client for the running event loop (app shutdown)."""
+    loop = asyncio.get_running_loop()
+    get_client_registry().discard_loop(loop)
+    with _async_http_clients_lock:
+        entry = _async_http_clients.pop(id(loop), None)
+    if entry is not None:
+        await entry[1].aclose()
+
+
+class ClientRegistry:
+    """
+    Long-lived provider SDK handles, one per provider and API key, shared by
+    every job in the process. Thread-safe.
+
+    Agents and their PerplexityClient/LLMClient wrappers are per job (they
+    carry the job's retry budget and telemetry); the expensive parts they
+    wrap - SDK clients with their connection pools, Gemini model handles -
+    come from here instead of being rebuilt for every job:
+
+    - openai(): OpenAI client per API key
+    - async_openai(): AsyncOpenAI client per API key and event loop (its
+      connection pool is the loop's shared async HTTP client)
+    - gemini_model(): GenerativeModel per model name (Gemini has a single
+      process-wide API key)
+    """
+
+    def __init__(self):
+        self._clients: Dict[tuple, Any] = {}
+        # (api_key, id(loop)) -> (loop, AsyncOpenAI); the loop is kept so a closed one can be pruned
+        self._async_clients: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def openai(self, api_key: str):
+        """Shared OpenAI client for an API key."""
+        with self._lock:
+            client = self._clients.get(("openai", api_key))
+            if client is None:
+                from openai import OpenAI
+                # Retries are handled by retry_policy, not the SDK
+                client = self._clients[("openai", api_key)] = OpenAI(api_key=api_key, max_retries=0)
+            return client
+
+    def async_openai(self, api_key: str):
+        """
+        Shared AsyncOpenAI client for an API key and the running event loop.
+        Outside an event loop a new, unshared client is returned.
+        """
+        from openai import AsyncOpenAI
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return AsyncOpenAI(api_key=api_key, max_retries=0)
+        with self._lock:
+            entry = self._async_clients.get((api_key, id(loop)))
+            if entry is None or entry[0] is not loop:
+                # Clients of loops that have since closed (asyncio.run() per job) are dropped
+                for key, (other, _) in list(self._async_clients.items()):
+                    if other.is_closed():
+                        del self._async_clients[key]
+                client = AsyncOpenAI(api_key=api_key, http_client=get_async_http_client(), max_retries=0)
+                entry = self._async_clients[(api_key, id(loop))] = (loop, client)
+            return entry[1]
+
+    def gemini_model(self, api_key: str, model: str):
+        """
+        Shared GenerativeModel for a model name.
+
+        Raises:
+            ValueError: If api_key isn't the key Gemini was first configured
+                with in this process (genai.configure() is process-global,
+                so a second key would silently replace the first)
+        """
+        genai = _genai()
+        _configure_gemini(genai, api_key)
+        with self._lock:
+            handle = self._clients.get(("gemini", model))
+            if handle is None:
+                handle = self._clients[("gemini", model)] = genai.GenerativeModel(model)
+            return handle
+
+    def discard_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Forget the async clients bound to an event loop (its HTTP client is closing)."""
+        with self._lock:
+            for key in [key for key in self._async_clients if key[1] == id(loop)]:
+                del self._async_clients[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients) + len(self._async_clients)
+
+
+@lru_cache(maxsize=1)
+def get_client_registry() -> ClientRegistry:
+    """
+    Get the process-wide provider client registry.
+
+    Uses lru_cache to ensure a single instance per process (API server,
+    local executor threads and Modal worker containers alike).
+    """
+    return ClientRegistry()
 
 class PerplexityClient:
-    def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key or os.getenv("PERPLEXITY_API_KEY")
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        connect_timeout: float = PERPLEXITY_CONNECT_TIMEOUT,
+        read_timeout: float = PERPLEXITY_READ_TIMEOUT,
+        rate_limiter: Optional[ProviderLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        telemetry: Optional[JobTelemetry] = None,
+        cassette: Optional[Cassette] = None
+    ):
+        # Record/replay of upstream responses (UPSTREAM_CASSETTE)
+        self.cassette = cassette if cassette is not None else get_cassette()
+        self.api_key = api_key or os.getenv("PERPLEXITY_API_KEY") or self._replay_key()
         if not self.api_key:
             raise ValueError("PERPLEXITY_API_KEY environment variable not set")
         self.base_url = "https://api.perplexity.ai/chat/completions"
         self.model = "sonar-pro"
+        self.session = session or get_http_session()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # Shared by every client in the process unless one is injected
+        self.rate_limiter = rate_limiter or get_rate_limiter("perplexity")
+        self.retry_policy = retry_policy or get_retry_policy("perplexity")
+        # Usually the owning job's budget and telemetry, shared with its other clients
+        self.retry_budget = retry_budget
+        self.telemetry = telemetry
 
-    def search(self, query: str, system_prompt: str = "You are a helpful research assistant.") -> Dict[str, Any]:
-        """
-        Performs a search using Perplexity API.
-        Returns a dictionary with 'content' and 'citations'.
-        """
-        headers = {
+    def _replay_key(self) -> Optional[str]:
+        # Nothing is sent upstream when replaying, so no API key is needed
+        return "replay" if self.cassette is not None and self.cassette.replaying else None
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool statistics for this client's session."""
+        return get_http_pool_stats(self.session)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
-        payload = {
+    def _payload(self, query: str, system_prompt: str) -> Dict[str, Any]:
+        return {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
@@ -32,75 +312,588 @@ class PerplexityClient:
             ]
         }
 
-        try:
-            response = requests.post(self.base_url, json=payload, headers=headers)
+    @staticmethod
+    def _usage_tokens(data: Dict[str, Any]) -> Optional[int]:
+        return (data.get("usage") or {}).get("total_tokens")
+
+    @staticmethod
+    def _parse_response(data: Dict[str, Any], call: UpstreamCall) -> Dict[str, Any]:
+        usage = data.get("usage") or {}
+        content = data["choices"][0]["message"]["content"]
+        call.record_response(content, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        return {
+            "content": content,
+            "citations": data.get("citations", [])
+        }
+
+    def search(self, query: str, system_prompt: str = "You are a helpful research assistant.") -> Dict[str, Any]:
+        """
+        Performs a search using Perplexity API.
+        Returns a dictionary with 'content' and 'citations'.
+
+        Transient failures (429, 5xx, timeouts) are retried per retry_policy;
+        anything else raises the matching UpstreamError.
+        """
+        with upstream_call("perplexity", "search", self.telemetry, len(system_prompt) + len(query)) as call:
+            return self.retry_policy.call(lambda: self._search_once(query, system_prompt, call), self.retry_budget)
+
+    def _cassette_key(self, query: str, system_prompt: str) -> str:
+        return cassette_key("perplexity", self.model, system_prompt, query)
+
+    def _post(self, query: str, system_prompt: str) -> Dict[str, Any]:
+        with self.rate_limiter.limit(self.rate_limiter.estimate(system_prompt + query)) as reservation:
+            response = self.session.post(
+                self.base_url,
+                json=self._payload(query, system_prompt),
+                headers=self._headers(),
+                timeout=(self.connect_timeout, self.read_timeout)
+            )
             response.raise_for_status()
             data = response.json()
+            reservation.settle(self._usage_tokens(data))
+        return data
+
+    def _search_once(self, query: str, system_prompt: str, call: UpstreamCall) -> Dict[str, Any]:
+        call.attempt()
+        try:
+            if self.cassette is None:
+                data = self._post(query, system_prompt)
+            else:
+                data = self.cassette.call(
+                    self._cassette_key(query, system_prompt),
+                    "perplexity.search",
+                    lambda: self._post(query, system_prompt)
+                )
+            return self._parse_response(data, call)
+        except Exception as e:
+            raise classify_error("perplexity", e, "Error calling Perplexity API") from e
+
+class AsyncPerplexityClient(PerplexityClient):
+    """
+    Non-blocking Perplexity client backed by the shared async HTTP client.
+    """
+
+    async def search(self, query: str, system_prompt: str = "You are a helpful research assistant.") -> Dict[str, Any]:
+        """
+        Performs a search using Perplexity API without blocking the event loop.
+        Returns a dictionary with 'content' and 'citations'.
+        """
+        with upstream_call("perplexity", "search", self.telemetry, len(system_prompt) + len(query)) as call:
+            return await self.retry_policy.acall(lambda: self._asearch_once(query, system_prompt, call), self.retry_budget)
 
-            content = data["choices"][0]["message"]["content"]
-            citations = data.get("citations", [])
+    async def _apost(self, query: str, system_prompt: str) -> Dict[str, Any]:
+        async with self.rate_limiter.alimit(self.rate_limiter.estimate(system_prompt + query)) as reservation:
+            response = await get_async_http_client().post(
+                self.base_url,
+                json=self._payload(query, system_prompt),
+                headers=self._headers(),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+            )
+            response.raise_for_status()
+            data = response.json()
+            reservation.settle(self._usage_tokens(data))
+        return data
 
-            return {
-                "content": content,
-                "citations": citations
-            }
+    async def _asearch_once(self, query: str, system_prompt: str, call: UpstreamCall) -> Dict[str, Any]:
+        call.attempt()
+        try:
+            if self.cassette is None:
+                data = await self._apost(query, system_prompt)
+            else:
+                data = await self.cassette.acall(
+                    self._cassette_key(query, system_prompt),
+                    "perplexity.search",
+                    lambda: self._apost(query, system_prompt)
+                )
+            return self._parse_response(data, call)
         except Exception as e:
-            raise Exception(f"Error calling Perplexity API: {e}")
+            raise classify_error("perplexity", e, "Error calling Perplexity API") from e
 
 class LLMClient:
-    def __init__(self, provider: str = "openai", api_key: Optional[str] = None):
+    def __init__(
+        self,
+        provider: str = "openai",
+        api_key: Optional[str] = None,
+        rate_limiter: Optional[ProviderLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        telemetry: Optional[JobTelemetry] = None,
+        cassette: Optional[Cassette] = None,
+        registry: Optional[ClientRegistry] = None
+    ):
         self.provider = provider.lower()
         self.api_key = api_key
+        # SDK clients and model handles are shared process-wide, per provider and key
+        self.registry = registry if registry is not None else get_client_registry()
+        # Record/replay of upstream responses (UPSTREAM_CASSETTE); replay needs no API key
+        self.cassette = cassette if cassette is not None else get_cassette()
+        replay_key = "replay" if self.cassette is not None and self.cassette.replaying else None
 
         if self.provider == "openai":
-            self.api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+            self.api_key = self.api_key or os.getenv("OPENAI_API_KEY") or replay_key
             if not self.api_key:
                 raise ValueError("OPENAI_API_KEY environment variable not set")
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = self._create_openai_client()
             self.model = "gpt-4o"
 
         elif self.provider == "gemini":
-            self.api_key = self.api_key or os.getenv("GEMINI_API_KEY")
+            self.api_key = self.api_key or os.getenv("GEMINI_API_KEY") or replay_key
             if not self.api_key:
                 raise ValueError("GEMINI_API_KEY environment variable not set")
-            genai.configure(api_key=self.api_key)
             self.model = "gemini-1.5-pro-latest"
 
         else:
             raise ValueError(f"Unsupported provider: {provider}")
 
-    def extract_data(self, content: str, schema: Type[BaseModel], system_instructions: str = "") -> BaseModel:
+        self.rate_limiter = rate_limiter or get_rate_limiter(self.provider)
+        self.retry_policy = retry_policy or get_retry_policy(self.provider)
+        self.retry_budget = retry_budget
+        self.telemetry = telemetry
+
+    def _create_openai_client(self):
+        return self.registry.openai(self.api_key)
+
+    def _gemini_model(self):
+        return self.registry.gemini_model(self.api_key, self.model)
+
+    @staticmethod
+    def _build_prompt(content: str, system_instructions: str) -> str:
+        return f"{system_instructions}\n\nPlease extract the following information from the text provided below:\n\n{content}"
+
+    @staticmethod
+    def _openai_messages(prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": "You are a precise data extraction expert."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @staticmethod
+    def _openai_usage_tokens(completion) -> Optional[int]:
+        usage = getattr(completion, "usage", None)
+        return getattr(usage, "total_tokens", None)
+
+    @staticmethod
+    def _gemini_usage_tokens(result) -> Optional[int]:
+        usage = getattr(result, "usage_metadata", None)
+        return getattr(usage, "total_token_count", None)
+
+    @staticmethod
+    def _openai_result(completion, schema: Type[BaseModel], call: UpstreamCall) -> BaseModel:
+        message = completion.choices[0].message
+        usage = getattr(completion, "usage", None)
+        call.record_response(message.content, getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+        if getattr(message, "refusal", None):
+            raise ValueError(f"Model refused to extract: {message.refusal}")
+        return schema.model_validate_json(message.content)
+
+    @staticmethod
+    def _gemini_result(result, schema: Type[BaseModel], call: UpstreamCall) -> BaseModel:
+        usage = getattr(result, "usage_metadata", None)
+        call.record_response(result.text, getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None))
+        return schema.model_validate_json(result.text)
+
+    @staticmethod
+    def _compiled(schema: Type[BaseModel]) -> CompiledSchema:
+        # Response formats are compiled once per model, not per call
+        return get_schema_registry().get(schema)
+
+    # Cassette form of each provider's response: text plus token usage
+    @staticmethod
+    def _encode_openai(completion) -> Dict[str, Any]:
+        usage = getattr(completion, "usage", None)
+        return {
+            "text": completion.choices[0].message.content,
+            "usage": {name: getattr(usage, name, None) for name in ("prompt_tokens", "completion_tokens", "total_tokens")}
+        }
+
+    @staticmethod
+    def _decode_openai(stored: Dict[str, Any]):
+        message = types.SimpleNamespace(content=stored["text"], refusal=None)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=types.SimpleNamespace(**stored["usage"]))
+
+    @staticmethod
+    def _encode_gemini(result) -> Dict[str, Any]:
+        usage = getattr(result, "usage_metadata", None)
+        return {
+            "text": result.text,
+            "usage": {name: getattr(usage, name, None) for name in ("prompt_token_count", "candidates_token_count", "total_token_count")}
+        }
+
+    @staticmethod
+    def _decode_gemini(stored: Dict[str, Any]):
+        return types.SimpleNamespace(text=stored["text"], usage_metadata=types.SimpleNamespace(**stored["usage"]))
+
+    def _cassette_args(self, prompt: str, schema: Type[BaseModel]) -> tuple:
+        """(key, operation, encode, decode) for Cassette.call()/acall()."""
+        key = cassette_key(self.provider, self.model, prompt, schema_fingerprint(schema))
+        if self.provider == "openai":
+            return key, "openai.extract", self._encode_openai, self._decode_openai
+        return key, "gemini.extract", self._encode_gemini, self._decode_gemini
+
+    def _openai_parse(self, prompt: str, schema: Type[BaseModel]):
+        with self.rate_limiter.limit(self.rate_limiter.estimate(prompt)) as reservation:
+            completion = self.client.chat.completions.create(
+                model=self.model,
+                messages=self._openai_messages(prompt),
+                response_format=self._compiled(schema).openai
+            )
+            reservation.settle(self._openai_usage_tokens(completion))
+        return completion
+
+    def _gemini_generate(self, prompt: str, schema: Type[BaseModel]):
+        model = self._gemini_model()
+        with self.rate_limiter.limit(self.rate_limiter.estimate(prompt)) as reservation:
+            result = model.generate_content(
+                prompt,
+                generation_config=self._compiled(schema).gemini
+            )
+            reservation.settle(self._gemini_usage_tokens(result))
+        return result
+
+    def _fetch(self, prompt: str, schema: Type[BaseModel], fetch):
+        # Through the cassette when record/replay is on
+        if self.cassette is None:
+            return fetch()
+        key, operation, encode, decode = self._cassette_args(prompt, schema)
+        return self.cassette.call(key, operation, fetch, encode, decode)
+
+    def extract_data(
+        self,
+        content: str,
+        schema: Type[BaseModel],
+        system_instructions: str = "",
+        cancel: Optional[threading.Event] = None
+    ) -> BaseModel:
         """
         Extracts structured data from the content using the specified schema.
+
+        Transient failures are retried per retry_policy; anything else raises
+        the matching UpstreamError. Setting cancel stops further retries.
         """
-        prompt = f"{system_instructions}\n\nPlease extract the following information from the text provided below:\n\n{content}"
+        prompt = self._build_prompt(content, system_instructions)
+        with upstream_call(self.provider, "extract", self.telemetry, len(prompt)) as call:
+            result = self.retry_policy.call(lambda: self._extract_once(prompt, schema, call), self.retry_budget, cancel)
+        _served_provider.set(self.provider)
+        return result
 
+    def _extract_once(self, prompt: str, schema: Type[BaseModel], call: UpstreamCall) -> BaseModel:
+        call.attempt()
         if self.provider == "openai":
             try:
-                completion = self.client.beta.chat.completions.parse(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a precise data extraction expert."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    response_format=schema
-                )
-                return completion.choices[0].message.parsed
+                completion = self._fetch(prompt, schema, lambda: self._openai_parse(prompt, schema))
+                return self._openai_result(completion, schema, call)
             except Exception as e:
-                raise Exception(f"Error calling OpenAI: {e}")
+                raise classify_error("openai", e, "Error calling OpenAI") from e
 
         elif self.provider == "gemini":
             try:
-                model = genai.GenerativeModel(self.model)
-                result = model.generate_content(
-                    prompt,
-                    generation_config=genai.GenerationConfig(
-                        response_mime_type="application/json",
-                        response_schema=schema
-                    )
-                )
-                return schema.model_validate_json(result.text)
+                result = self._fetch(prompt, schema, lambda: self._gemini_generate(prompt, schema))
+                return self._gemini_result(result, schema, call)
             except Exception as e:
-                raise Exception(f"Error calling Gemini: {e}")
+                raise classify_error("gemini", e, "Error calling Gemini") from e
 
         return schema()
+
+class AsyncLLMClient(LLMClient):
+    """
+    Non-blocking LLM client using the async OpenAI and Gemini SDK methods.
+    """
+
+    def _create_openai_client(self):
+        # Shares the Perplexity connection pool when constructed inside an event loop
+        return self.registry.async_openai(self.api_key)
+
+    async def extract_data(self, content: str, schema: Type[BaseModel], system_instructions: str = "") -> BaseModel:
+        """
+        Extracts structured data from the content without blocking the event loop.
+        """
+        prompt = self._build_prompt(content, system_instructions)
+        with upstream_call(self.provider, "extract", self.telemetry, len(prompt)) as call:
+            result = await self.retry_policy.acall(lambda: self._aextract_once(prompt, schema, call), self.retry_budget)
+        _served_provider.set(self.provider)
+        return result
+
+    async def _aopenai_parse(self, prompt: str, schema: Type[BaseModel]):
+        async with self.rate_limiter.alimit(self.rate_limiter.estimate(prompt)) as reservation:
+            completion = await self.client.chat.completions.create(
+                model=self.model,
+                messages=self._openai_messages(prompt),
+                response_format=self._compiled(schema).openai
+            )
+            reservation.settle(self._openai_usage_tokens(completion))
+        return completion
+
+    async def _agemini_generate(self, prompt: str, schema: Type[BaseModel]):
+        model = self._gemini_model()
+        async with self.rate_limiter.alimit(self.rate_limiter.estimate(prompt)) as reservation:
+            result = await model.generate_content_async(
+                prompt,
+                generation_config=self._compiled(schema).gemini
+            )
+            reservation.settle(self._gemini_usage_tokens(result))
+        return result
+
+    async def _afetch(self, prompt: str, schema: Type[BaseModel], fetch):
+        if self.cassette is None:
+            return await fetch()
+        key, operation, encode, decode = self._cassette_args(prompt, schema)
+        return await self.cassette.acall(key, operation, fetch, encode, decode)
+
+    async def _aextract_once(self, prompt: str, schema: Type[BaseModel], call: UpstreamCall) -> BaseModel:
+        call.attempt()
+        if self.provider == "openai":
+            try:
+                completion = await self._afetch(prompt, schema, lambda: self._aopenai_parse(prompt, schema))
+                return self._openai_result(completion, schema, call)
+            except Exception as e:
+                raise classify_error("openai", e, "Error calling OpenAI") from e
+
+        elif self.provider == "gemini":
+            try:
+                result = await self._afetch(prompt, schema, lambda: self._agemini_generate(prompt, schema))
+                return self._gemini_result(result, schema, call)
+            except Exception as e:
+                raise classify_error("gemini", e, "Error calling Gemini") from e
+
+        return schema()
+
+
+def fallback_provider(primary: str) -> Optional[str]:
+    """
+    The LLM provider to hedge/fall back to, from LLM_FALLBACK_PROVIDER:
+    'none' (default) disables multi-provider extraction, 'auto' picks the
+    other provider when its API key is set, 'openai'/'gemini' pick that one.
+
+    Opt-in: hedging sends duplicate requests, so a second key being present
+    is not enough to turn it on.
+    """
+    primary = primary.lower()
+    if LLM_FALLBACK_PROVIDER == "none":
+        return None
+    if LLM_FALLBACK_PROVIDER != "auto":
+        return LLM_FALLBACK_PROVIDER if LLM_FALLBACK_PROVIDER != primary else None
+    for provider in LLM_PROVIDERS:
+        if provider != primary and os.getenv(f"{provider.upper()}_API_KEY"):
+            return provider
+    return None
+
+
+class ProviderHealth:
+    """
+    Recent extraction latencies and consecutive failures for one provider,
+    shared by every multi-provider client in the process. Thread-safe.
+    """
+
+    def __init__(self, provider: str, window: int = 200):
+        self.provider = provider
+        self._latencies = deque(maxlen=window)
+        self._failures = 0
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            self._failures = 0
+            self._down_until = 0.0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= LLM_FAILURE_THRESHOLD:
+                if not self._down_until:
+                    print(f"[LLM] {self.provider} failing ({self._failures} in a row); "
+                          f"preferring fallback for {LLM_FAILURE_COOLDOWN:.0f}s", file=sys.stderr)
+                self._down_until = time.monotonic() + LLM_FAILURE_COOLDOWN
+
+    def healthy(self) -> bool:
+        with self._lock:
+            return time.monotonic() >= self._down_until
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Seconds to wait before hedging: the LLM_HEDGE_PERCENTILE latency once
+        LLM_HEDGE_MIN_SAMPLES calls are recorded, LLM_HEDGE_DEFAULT_DELAY
+        before that. None disables hedging.
+        """
+        if LLM_HEDGE_PERCENTILE <= 0:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY
+        index = min(len(samples) - 1, int(len(samples) * LLM_HEDGE_PERCENTILE / 100))
+        return max(LLM_HEDGE_MIN_DELAY, samples[index])
+
+
+_provider_health: Dict[str, ProviderHealth] = {}
+_provider_health_lock = threading.Lock()
+
+
+def get_provider_health(provider: str) -> ProviderHealth:
+    """Process-wide latency/failure tracker for an LLM provider."""
+    with _provider_health_lock:
+        health = _provider_health.get(provider)
+        if health is None:
+            health = _provider_health[provider] = ProviderHealth(provider)
+        return health
+
+
+@lru_cache(maxsize=1)
+def _hedge_pool() -> ThreadPoolExecutor:
+    # Shared by all sync multi-provider clients; calls are I/O bound
+    return ThreadPoolExecutor(max_workers=LLM_HEDGE_POOL_SIZE, thread_name_prefix="llm-hedge")
+
+
+class MultiProviderLLMClient:
+    """
+    Extraction across several LLM providers (primary first).
+
+    - Hedging: if the preferred provider hasn't answered within its recent
+      LLM_HEDGE_PERCENTILE latency, the same request is sent to the next
+      provider and the first valid parse wins
+    - Fallback: a failed call moves on to the next provider, and a provider
+      with LLM_FAILURE_THRESHOLD consecutive failures is tried last until
+      LLM_FAILURE_COOLDOWN has passed
+
+    served_provider() reports which provider answered.
+    """
+
+    def __init__(self, clients: Sequence[LLMClient]):
+        if not clients:
+            raise ValueError("At least one LLM client is required")
+        self.clients = list(clients)
+
+    @property
+    def provider(self) -> str:
+        return self.clients[0].provider
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self.clients[0].api_key
+
+    def _ordered(self) -> List[LLMClient]:
+        # Healthy providers first, otherwise keep the configured order
+        return sorted(self.clients, key=lambda client: not get_provider_health(client.provider).healthy())
+
+    def _timed(
+        self,
+        client: LLMClient,
+        content: str,
+        schema: Type[BaseModel],
+        system_instructions: str,
+        cancel: threading.Event
+    ) -> BaseModel:
+        health = get_provider_health(client.provider)
+        start = time.monotonic()
+        try:
+            result = client.extract_data(content, schema, system_instructions, cancel=cancel)
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success(time.monotonic() - start)
+        return result
+
+    def extract_data(self, content: str, schema: Type[BaseModel], system_instructions: str = "") -> BaseModel:
+        """
+        Extracts structured data with the fastest healthy provider.
+        Raises the first provider's error if every provider fails.
+        """
+        remaining = self._ordered()
+        in_flight = {}
+        errors = []
+        # Set once a provider answers: the losing calls stop retrying
+        cancel = threading.Event()
+
+        def launch():
+            client = remaining.pop(0)
+            # copy_context() keeps the caller's section attribution in the pool thread
+            future = _hedge_pool().submit(copy_context().run, self._timed, client, content, schema, system_instructions, cancel)
+            in_flight[future] = client
+            return client
+
+        primary = launch()
+        while in_flight:
+            timeout = get_provider_health(primary.provider).hedge_delay() if remaining else None
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedge = launch()
+                print(f"[LLM] {primary.provider} slower than {timeout:.1f}s; hedging with {hedge.provider}", file=sys.stderr)
+                continue
+            for future in done:
+                client = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    if remaining and not in_flight:
+                        fallback = launch()
+                        print(f"[LLM] {client.provider} failed ({e}); falling back to {fallback.provider}", file=sys.stderr)
+                    continue
+                # A slower duplicate's request in flight finishes in the
+                # background and is discarded; it isn't retried
+                cancel.set()
+                for loser in in_flight:
+                    loser.cancel()
+                _served_provider.set(client.provider)
+                return result
+        raise errors[0]
+
+
+class AsyncMultiProviderLLMClient(MultiProviderLLMClient):
+    """
+    Non-blocking MultiProviderLLMClient over AsyncLLMClients; the losing
+    request of a hedge is cancelled.
+    """
+
+    async def _atimed(self, client: AsyncLLMClient, content: str, schema: Type[BaseModel], system_instructions: str) -> BaseModel:
+        health = get_provider_health(client.provider)
+        start = time.monotonic()
+        try:
+            result = await client.extract_data(content, schema, system_instructions)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success(time.monotonic() - start)
+        return result
+
+    async def extract_data(self, content: str, schema: Type[BaseModel], system_instructions: str = "") -> BaseModel:
+        """
+        Extracts structured data with the fastest healthy provider without
+        blocking the event loop.
+        """
+        remaining = self._ordered()
+        in_flight = {}
+        errors = []
+
+        def launch():
+            client = remaining.pop(0)
+            task = asyncio.ensure_future(self._atimed(client, content, schema, system_instructions))
+            in_flight[task] = client
+            return client
+
+        primary = launch()
+        try:
+            while in_flight:
+                timeout = get_provider_health(primary.provider).hedge_delay() if remaining else None
+                done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge = launch()
+                    print(f"[LLM] {primary.provider} slower than {timeout:.1f}s; hedging with {hedge.provider}", file=sys.stderr)
+                    continue
+                for task in done:
+                    client = in_flight.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        if remaining and not in_flight:
+                            fallback = launch()
+                            print(f"[LLM] {client.provider} failed ({task.exception()}); falling back to {fallback.provider}", file=sys.stderr)
+                        continue
+                    _served_provider.set(client.provider)
+                    return task.result()
+            raise errors[0]
+        finally:
+            for task in in_flight:
+                task.cancel()
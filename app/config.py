@@ -1,7 +1,9 @@
 from pydantic_settings import BaseSettings
 from typing import Optional
 
-class Settings(BaseSettings):
+from .rate_limit import RateLimitSettings
+
+class Settings(RateLimitSettings):
     """Application configuration loaded from environment variables."""
 
     # API Configuration
@@ -24,6 +26,12 @@ class Settings(BaseSettings):
     # Default LLM Provider
     default_llm_provider: str = "openai"
 
+    # Agent Execution
+    agent_max_concurrency: int = 1  # Sections researched in parallel (1 = sequential)
+
+    # Upstream rate limits (rate_limit_backend, <provider>_rpm/_tpm/_max_concurrency)
+    # are inherited from RateLimitSettings, see app/rate_limit.py
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -2,16 +2,36 @@
 Database Client for Async Job Queue
 
 Provides CRUD operations for jobs and research results using Supabase.
-Uses connection pooling via singleton pattern.
+Uses connection pooling via singleton pattern. The supabase SDK is imported
+when the first client is built, not when this module is imported.
 """
-from supabase import create_client, Client
-from typing import Dict, List, Any, Optional
-from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Tuple
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
 import os
+import sys
+import threading
+import time
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Postgres unique_violation error code
+UNIQUE_VIOLATION = "23505"
+
+# Rows per bulk insert, and values per IN (...) filter (PostgREST puts
+# filters in the URL, so long value lists are split)
+BULK_INSERT_CHUNK = 500
+IN_FILTER_CHUNK = 100
+
+# SectionResultWriter defaults: flush after this many buffered sections, or
+# this many seconds after the first one was buffered (0 disables the timer)
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "4"))
+DB_WRITE_FLUSH_INTERVAL = float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "2.0"))
 
 
 @lru_cache(maxsize=1)
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """
     Get cached Supabase client with connection pooling.
     
@@ -36,9 +56,20 @@ def get_supabase_client() -> Client:
     if not supabase_key:
         raise ValueError("SUPABASE_KEY, SUPABASE_SERVICE_KEY, or SUPABASE_SERVICE_ROLE_KEY environment variable not set")
     
+    from supabase import create_client
     return create_client(supabase_url, supabase_key)
 
 
+def is_unique_violation(error: BaseException) -> bool:
+    """
+    True if a Supabase call failed with a Postgres unique_violation.
+    
+    Lets callers catch conflicts without importing postgrest up front.
+    """
+    from postgrest.exceptions import APIError
+    return isinstance(error, APIError) and error.code == UNIQUE_VIOLATION
+
+
 class JobDB:
     """
     Database operations for jobs and research results.
@@ -47,18 +78,23 @@ class JobDB:
     """
     
     @staticmethod
-    def _get_client() -> Client:
+    def _get_client() -> "Client":
         """Get the pooled Supabase client"""
         return get_supabase_client()
     
     @staticmethod
-    def create_job(address: str, llm_provider: str = "openai") -> Dict[str, Any]:
+    def create_job(
+        address: str,
+        llm_provider: str = "openai",
+        dedupe_key: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Create a new job record.
         
         Args:
             address: US address to research
             llm_provider: LLM provider ('openai' or 'gemini')
+            dedupe_key: Optional request coalescing key (see create_or_attach_job)
         
         Returns:
             Dict containing job data with 'id', 'status', 'address', etc.
@@ -68,15 +104,175 @@ class JobDB:
         """
         client = JobDB._get_client()
         
-        result = client.table("code_research_jobs").insert({
+        row = {
             "address": address,
             "llm_provider": llm_provider,
             "status": "pending",
             "progress": "0/13 sections"
-        }).execute()
+        }
+        if dedupe_key is not None:
+            row["dedupe_key"] = dedupe_key
+        
+        result = client.table("code_research_jobs").insert(row).execute()
         
         return result.data[0]
     
+    @staticmethod
+    def get_active_job_by_dedupe_key(dedupe_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the pending or processing job holding a dedupe key, if any.
+        
+        Args:
+            dedupe_key: Request coalescing key
+        
+        Returns:
+            Dict containing job data, or None if no job is in flight
+        """
+        client = JobDB._get_client()
+        
+        result = client.table("code_research_jobs")\
+            .select("*")\
+            .eq("dedupe_key", dedupe_key)\
+            .in_("status", ["pending", "processing"])\
+            .execute()
+        
+        return result.data[0] if result.data else None
+    
+    @staticmethod
+    def create_or_attach_job(
+        address: str,
+        llm_provider: str,
+        dedupe_key: str
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Create a job, or attach to the identical job already in flight.
+        
+        The partial unique index on dedupe_key (migration 003) acts as a lock
+        row: only one pending/processing job can exist per key, across all
+        API processes and workers.
+        
+        Args:
+            address: US address to research
+            llm_provider: LLM provider ('openai' or 'gemini')
+            dedupe_key: Request coalescing key
+        
+        Returns:
+            Tuple of (job data, created). created is False when attached
+            to an existing job.
+        """
+        for _ in range(3):
+            try:
+                return JobDB.create_job(address, llm_provider, dedupe_key=dedupe_key), True
+            except Exception as e:
+                if not is_unique_violation(e):
+                    raise
+            
+            existing = JobDB.get_active_job_by_dedupe_key(dedupe_key)
+            if existing:
+                return existing, False
+            # The holder finished between our insert and lookup; try again
+        
+        raise Exception(f"Could not create or attach job for key: {dedupe_key}")
+    
+    @staticmethod
+    def get_active_jobs_by_dedupe_keys(dedupe_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the pending or processing jobs holding any of the dedupe keys.
+        
+        Args:
+            dedupe_keys: Request coalescing keys
+        
+        Returns:
+            Dict mapping dedupe key -> job data (keys without a job are omitted)
+        """
+        client = JobDB._get_client()
+        
+        jobs = {}
+        for i in range(0, len(dedupe_keys), IN_FILTER_CHUNK):
+            result = client.table("code_research_jobs")\
+                .select("*")\
+                .in_("dedupe_key", dedupe_keys[i:i + IN_FILTER_CHUNK])\
+                .in_("status", ["pending", "processing"])\
+                .execute()
+            jobs.update((job["dedupe_key"], job) for job in result.data)
+        
+        return jobs
+    
+    @staticmethod
+    def create_jobs(
+        jobs: List[Tuple[str, str]],
+        llm_provider: str = "openai"
+    ) -> List[Dict[str, Any]]:
+        """
+        Create several job records in one insert.
+        
+        Args:
+            jobs: (address, dedupe_key) pairs
+            llm_provider: LLM provider ('openai' or 'gemini')
+        
+        Returns:
+            List of created jobs
+        
+        Raises:
+            APIError: If the insert fails (nothing is created). A
+                unique_violation means a dedupe key is already in flight.
+        """
+        if not jobs:
+            return []
+        
+        client = JobDB._get_client()
+        
+        result = client.table("code_research_jobs").insert([
+            {
+                "address": address,
+                "llm_provider": llm_provider,
+                "status": "pending",
+                "progress": "0/13 sections",
+                "dedupe_key": dedupe_key
+            }
+            for address, dedupe_key in jobs
+        ]).execute()
+        
+        return result.data
+    
+    @staticmethod
+    def create_or_attach_jobs(
+        jobs: List[Tuple[str, str]],
+        llm_provider: str
+    ) -> List[Tuple[Dict[str, Any], bool]]:
+        """
+        Bulk version of create_or_attach_job.
+        
+        Looks up in-flight jobs for all keys at once, then creates the rest
+        with one insert per BULK_INSERT_CHUNK rows. A chunk that races with
+        another submission falls back to create_or_attach_job per row.
+        
+        Args:
+            jobs: (address, dedupe_key) pairs with distinct dedupe keys
+            llm_provider: LLM provider ('openai' or 'gemini')
+        
+        Returns:
+            (job data, created) per input pair, in input order
+        """
+        by_key = {
+            key: (job, False)
+            for key, job in JobDB.get_active_jobs_by_dedupe_keys([key for _, key in jobs]).items()
+        }
+        missing = [(address, key) for address, key in jobs if key not in by_key]
+        
+        for i in range(0, len(missing), BULK_INSERT_CHUNK):
+            chunk = missing[i:i + BULK_INSERT_CHUNK]
+            try:
+                created = JobDB.create_jobs(chunk, llm_provider)
+                by_key.update((job["dedupe_key"], (job, True)) for job in created)
+            except Exception as e:
+                if not is_unique_violation(e):
+                    raise
+                for address, key in chunk:
+                    by_key[key] = JobDB.create_or_attach_job(address, llm_provider, key)
+        
+        return [by_key[key] for _, key in jobs]
+    
     @staticmethod
     def get_job(job_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -121,6 +317,23 @@ class JobDB:
         
         return result.data[0]
     
+    @staticmethod
+    def update_jobs(job_ids: List[str], **updates) -> None:
+        """
+        Apply the same field updates to several jobs.
+        
+        Args:
+            job_ids: UUIDs of the jobs
+            **updates: Field names and values to update
+        """
+        client = JobDB._get_client()
+        
+        for i in range(0, len(job_ids), IN_FILTER_CHUNK):
+            client.table("code_research_jobs")\
+                .update(updates)\
+                .in_("id", job_ids[i:i + IN_FILTER_CHUNK])\
+                .execute()
+    
     @staticmethod
     def save_section_result(
         job_id: str,
@@ -148,6 +361,37 @@ class JobDB:
         
         return result.data[0]
     
+    @staticmethod
+    def save_section_results(
+        job_id: str,
+        sections: Dict[str, Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Save research results for several sections in one insert.
+        
+        Args:
+            job_id: UUID of the parent job
+            sections: Section name -> section data dict
+        
+        Returns:
+            List of saved results, one per section
+        """
+        if not sections:
+            return []
+        
+        client = JobDB._get_client()
+        
+        result = client.table("code_research_research_results").insert([
+            {
+                "job_id": job_id,
+                "section_name": section_name,
+                "section_data": section_data
+            }
+            for section_name, section_data in sections.items()
+        ]).execute()
+        
+        return result.data
+    
     @staticmethod
     def get_job_results(job_id: str) -> List[Dict[str, Any]]:
         """
@@ -169,6 +413,76 @@ class JobDB:
         
         return result.data
     
+    @staticmethod
+    def get_jobs(job_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get several jobs in one query.
+        
+        Args:
+            job_ids: UUIDs of the jobs
+        
+        Returns:
+            List of dicts containing job data (missing IDs are omitted)
+        """
+        if not job_ids:
+            return []
+        
+        client = JobDB._get_client()
+        
+        jobs = []
+        for i in range(0, len(job_ids), IN_FILTER_CHUNK):
+            result = client.table("code_research_jobs")\
+                .select("*")\
+                .in_("id", job_ids[i:i + IN_FILTER_CHUNK])\
+                .execute()
+            jobs.extend(result.data)
+        
+        return jobs
+    
+    @staticmethod
+    def get_results_since(cursors: Dict[str, Optional[str]]) -> List[Dict[str, Any]]:
+        """
+        Get the research results each job saved since its own cursor.
+        
+        Args:
+            cursors: Job UUID -> ISO timestamp; only that job's results
+                created at or after it are returned (None: all its results)
+        
+        Returns:
+            List of dicts containing section results, ordered by created_at
+        """
+        if not cursors:
+            return []
+        
+        client = JobDB._get_client()
+        table = "code_research_research_results"
+        
+        unread = [job_id for job_id, since in cursors.items() if not since]
+        tails = [(job_id, since) for job_id, since in cursors.items() if since]
+        
+        results = []
+        for i in range(0, len(unread), IN_FILTER_CHUNK):
+            result = client.table(table)\
+                .select("*")\
+                .in_("job_id", unread[i:i + IN_FILTER_CHUNK])\
+                .execute()
+            results.extend(result.data)
+        # One filter per job: job_id.eq.<id> and created_at.gte.<its cursor>.
+        # Each is about twice the length of a bare UUID, hence half the chunk
+        chunk = max(IN_FILTER_CHUNK // 2, 1)
+        for i in range(0, len(tails), chunk):
+            filters = ",".join(
+                f'and(job_id.eq.{job_id},created_at.gte."{since}")' for job_id, since in tails[i:i + chunk]
+            )
+            result = client.table(table)\
+                .select("*")\
+                .or_(filters)\
+                .execute()
+            results.extend(result.data)
+        
+        results.sort(key=lambda result: result["created_at"])
+        return results
+    
     @staticmethod
     def list_jobs(limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
         """
@@ -192,6 +506,95 @@ class JobDB:
         
         return result.data
     
+    @staticmethod
+    def list_job_telemetry(limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Telemetry stored by workers on the most recently finished jobs.
+        
+        Args:
+            limit: Maximum number of jobs to read
+        
+        Returns:
+            List of JobTelemetry summaries (metadata->telemetry), newest first
+        """
+        client = JobDB._get_client()
+        
+        result = client.table("code_research_jobs")\
+            .select("telemetry:metadata->telemetry")\
+            .in_("status", ["completed", "failed"])\
+            .not_.is_("metadata->telemetry", "null")\
+            .order("completed_at", desc=True)\
+            .limit(limit)\
+            .execute()
+        
+        return [row["telemetry"] for row in result.data if row.get("telemetry")]
+    
+    @staticmethod
+    def create_batch(
+        llm_provider: str,
+        total_addresses: int,
+        job_ids: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Create a batch and record its jobs.
+        
+        Args:
+            llm_provider: LLM provider ('openai' or 'gemini')
+            total_addresses: Addresses submitted, including duplicates
+            job_ids: Distinct jobs (created or attached) in the batch
+        
+        Returns:
+            Dict containing batch data with 'id', 'total_jobs', etc.
+        """
+        client = JobDB._get_client()
+        
+        batch = client.table("code_research_batches").insert({
+            "llm_provider": llm_provider,
+            "total_addresses": total_addresses,
+            "total_jobs": len(job_ids)
+        }).execute().data[0]
+        
+        for i in range(0, len(job_ids), BULK_INSERT_CHUNK):
+            client.table("code_research_batch_jobs").insert([
+                {"batch_id": batch["id"], "job_id": job_id}
+                for job_id in job_ids[i:i + BULK_INSERT_CHUNK]
+            ]).execute()
+        
+        return batch
+    
+    @staticmethod
+    def get_batch(batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get batch by ID.
+        
+        Returns:
+            Dict containing batch data, or None if not found
+        """
+        client = JobDB._get_client()
+        
+        result = client.table("code_research_batches")\
+            .select("*")\
+            .eq("id", batch_id)\
+            .execute()
+        
+        return result.data[0] if result.data else None
+    
+    @staticmethod
+    def get_batch_progress(batch_id: str) -> Dict[str, int]:
+        """
+        Count a batch's jobs per status (aggregated in the database).
+        
+        Returns:
+            Dict mapping status -> number of jobs
+        """
+        client = JobDB._get_client()
+        
+        result = client.rpc("code_research_batch_progress", {
+            "target_batch_id": batch_id
+        }).execute()
+        
+        return {row["status"]: row["jobs"] for row in result.data or []}
+    
     @staticmethod
     def delete_job(job_id: str) -> None:
         """
@@ -207,7 +610,234 @@ class JobDB:
         client = JobDB._get_client()
         
         client.table("code_research_jobs").delete().eq("id", job_id).execute()
+    
+    @staticmethod
+    def count_jobs_by_status() -> Dict[str, int]:
+        """
+        Count all jobs per status (aggregated in the database).
+        
+        Returns:
+            Dict mapping status -> number of jobs
+        """
+        client = JobDB._get_client()
+        
+        result = client.rpc("code_research_job_counts", {}).execute()
+        
+        return {row["status"]: row["jobs"] for row in result.data or []}
+    
+    @staticmethod
+    def save_worker_metrics(worker_id: str, snapshot: Dict[str, Any]) -> None:
+        """
+        Store a worker process's cumulative metrics snapshot (one row per worker).
+        
+        Args:
+            worker_id: Worker process identifier
+            snapshot: app.metrics.collect_process_metrics() output
+        """
+        client = JobDB._get_client()
+        
+        client.table("code_research_worker_metrics").upsert({
+            "worker_id": worker_id,
+            "snapshot": snapshot,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }).execute()
+    
+    @staticmethod
+    def update_worker_metrics(worker_id: str, snapshot: Dict[str, Any]) -> bool:
+        """
+        Replace a worker's snapshot, only if its row still exists.
+        
+        Args:
+            worker_id: Worker process identifier
+            snapshot: Metrics snapshot
+        
+        Returns:
+            False if the worker has no row (it was folded into the aggregate row)
+        """
+        client = JobDB._get_client()
+        
+        result = client.table("code_research_worker_metrics")\
+            .update({
+                "snapshot": snapshot,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            })\
+            .eq("worker_id", worker_id)\
+            .execute()
+        
+        return bool(result.data)
+    
+    @staticmethod
+    def list_worker_metrics() -> List[Dict[str, Any]]:
+        """
+        Every worker metrics row: live workers plus the aggregate of expired
+        ones (migration 009 keeps the table that small).
+        
+        Returns:
+            List of dicts with 'worker_id', 'snapshot' and 'updated_at'
+        """
+        client = JobDB._get_client()
+        
+        result = client.table("code_research_worker_metrics")\
+            .select("worker_id, snapshot, updated_at")\
+            .execute()
+        
+        return result.data
+    
+    @staticmethod
+    def fold_worker_metrics(
+        worker_ids: List[str],
+        stale_before: str,
+        folded_snapshot: Dict[str, Any],
+        folded_updated_at: str
+    ) -> bool:
+        """
+        Atomically delete expired worker rows and store the aggregate that
+        now includes them (RPC from migration 009).
+        
+        Args:
+            worker_ids: Rows to fold
+            stale_before: ISO timestamp; rows pushed since are left alone
+            folded_snapshot: The aggregate row's snapshot merged with theirs
+            folded_updated_at: The aggregate's updated_at as read
+        
+        Returns:
+            False if nothing changed (folded concurrently, or a worker pushed again)
+        """
+        client = JobDB._get_client()
+        
+        result = client.rpc("fold_code_research_worker_metrics", {
+            "worker_ids": worker_ids,
+            "stale_before": stale_before,
+            "folded_snapshot": folded_snapshot,
+            "folded_updated_at": folded_updated_at
+        }).execute()
+        
+        return bool(result.data)
+
+
+def _timed(name: str, method):
+    @wraps(method)
+    def timed(*args, **kwargs):
+        from app.metrics import get_metrics_registry
+        registry = get_metrics_registry()
+        start = time.monotonic()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            registry.inc("db_errors_total", {"operation": name})
+            raise
+        finally:
+            registry.observe("db_query_duration_seconds", time.monotonic() - start, {"operation": name})
+    return timed
 
 
-# Module-level singleton instance for backwards compatibility
-supabase = get_supabase_client()
+# Every public JobDB method is timed for /metrics (db_query_duration_seconds)
+for _name, _method in list(vars(JobDB).items()):
+    if isinstance(_method, staticmethod) and not _name.startswith("_"):
+        setattr(JobDB, _name, staticmethod(_timed(_name, _method.__func__)))
+
+
+class SectionResultWriter:
+    """
+    Buffered writer for one job's section results.
+    
+    Sections are collected in memory and written with a single
+    JobDB.save_section_results() insert plus a single JobDB.update_job()
+    carrying the new progress. A flush happens when flush_size sections are
+    buffered or flush_interval seconds after the first one was buffered.
+    flush() also accepts extra job fields, so the last batch and the final
+    status change go out in the same update.
+    
+    Thread-safe: sections may be added from concurrent agent callbacks.
+    """
+    
+    def __init__(
+        self,
+        job_id: str,
+        total_sections: int = 13,
+        saved: Optional[List[str]] = None,
+        flush_size: Optional[int] = None,
+        flush_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            job_id: UUID of the job the sections belong to
+            total_sections: Denominator for the progress string
+            saved: Section names already stored for the job (e.g. on resume)
+            flush_size: Sections per batch (default: DB_WRITE_BATCH_SIZE)
+            flush_interval: Max seconds a section stays buffered
+                (default: DB_WRITE_FLUSH_INTERVAL, 0 disables the timer)
+        """
+        self.job_id = job_id
+        self.total_sections = total_sections
+        self.flush_size = max(1, flush_size if flush_size is not None else DB_WRITE_BATCH_SIZE)
+        self.flush_interval = flush_interval if flush_interval is not None else DB_WRITE_FLUSH_INTERVAL
+        self._saved = set(saved or [])
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+    
+    @property
+    def saved_count(self) -> int:
+        """Number of sections written to the database."""
+        return len(self._saved)
+    
+    def progress(self) -> str:
+        return f"{len(self._saved)}/{self.total_sections} sections"
+    
+    def add(self, section_name: str, section_data: Dict[str, Any]) -> bool:
+        """
+        Buffer a section result, flushing if the batch is full.
+        
+        Returns:
+            False if the section was already saved or buffered
+        """
+        with self._lock:
+            if section_name in self._saved or section_name in self._pending:
+                return False
+            self._pending[section_name] = section_data
+            if len(self._pending) >= self.flush_size:
+                self._flush_locked({})
+            elif self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+            return True
+    
+    def flush(self, **job_updates) -> None:
+        """
+        Write buffered sections and progress, merged with any extra job fields.
+        
+        Example:
+            writer.flush(status="completed", completed_at=now)
+        """
+        with self._lock:
+            self._flush_locked(job_updates)
+    
+    def close(self) -> None:
+        """Stop the flush timer without writing."""
+        with self._lock:
+            self._cancel_timer()
+    
+    def _flush_on_timer(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            # Sections stay buffered; the next flush retries them
+            print(f"[DB] Timed flush for job {self.job_id} failed: {e}", file=sys.stderr)
+    
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+    
+    def _flush_locked(self, job_updates: Dict[str, Any]) -> None:
+        self._cancel_timer()
+        if not self._pending and not job_updates:
+            return
+        if self._pending:
+            JobDB.save_section_results(self.job_id, self._pending)
+            self._saved.update(self._pending)
+            self._pending = {}
+        JobDB.update_job(self.job_id, progress=self.progress(), **job_updates)
+
@@ -0,0 +1,382 @@
+"""
+Job Executors
+
+Pluggable backends that run research jobs created through POST /jobs.
+
+- ModalExecutor: spawns the deployed Modal function (default)
+- LocalExecutor: claims pending jobs from the durable queue
+  (app/job_queue.py) and runs worker_logic.process_research_job in a
+  bounded thread or process pool on this host
+
+Select the backend with JOB_EXECUTOR=modal|local. Whichever runs,
+recover_jobs() requeues jobs whose worker died and dispatches them again.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+from app.job_queue import JobQueue
+
+JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "modal")
+JOB_EXECUTOR_WORKERS = int(os.getenv("JOB_EXECUTOR_WORKERS", "4"))
+JOB_EXECUTOR_QUEUE_DEPTH = int(os.getenv("JOB_EXECUTOR_QUEUE_DEPTH", "16"))
+JOB_EXECUTOR_POLL_INTERVAL = float(os.getenv("JOB_EXECUTOR_POLL_INTERVAL", "5.0"))
+JOB_EXECUTOR_USE_PROCESSES = os.getenv("JOB_EXECUTOR_USE_PROCESSES", "false").lower() in ("1", "true", "yes")
+# Seconds between sweeps for jobs whose lease expired (0 disables)
+JOB_RECOVERY_INTERVAL = float(os.getenv("JOB_RECOVERY_INTERVAL", "30"))
+
+
+class JobExecutor:
+    """Base interface for job execution backends."""
+
+    name = "base"
+
+    def submit(self, job_id: str, address: str, llm_provider: str, resume: bool = False) -> bool:
+        """
+        Hand a job to the backend (non-blocking).
+
+        Returns:
+            True if the job was dispatched or will be picked up later,
+            False if it cannot be run
+        """
+        raise NotImplementedError
+
+    def submit_many(self, jobs: List[Dict]) -> List[str]:
+        """
+        Hand several jobs to the backend (non-blocking).
+
+        Returns:
+            IDs of the jobs that could not be dispatched
+        """
+        return [
+            job["id"] for job in jobs
+            if not self.submit(job["id"], job["address"], job["llm_provider"])
+        ]
+
+    def submit_batch(self, job_ids: List[str], llm_provider: str) -> bool:
+        """
+        Run a batch's jobs with the jurisdiction-aware scheduler
+        (worker_logic.process_research_batch), non-blocking.
+
+        Returns:
+            False if the backend can't run batches; callers then fall back
+            to submit_many()
+        """
+        return False
+
+    def recover(self, queue: Optional[JobQueue] = None) -> int:
+        """
+        Requeue jobs whose lease expired and dispatch them again.
+
+        Args:
+            queue: Job queue to requeue in (default: JobQueue())
+
+        Returns:
+            Number of jobs requeued
+        """
+        jobs = (queue if queue is not None else JobQueue()).requeue_expired()
+        if not jobs:
+            return 0
+        failed = self.submit_many(jobs)
+        print(f"[Executor] Requeued {len(jobs)} jobs with expired leases ({len(failed)} not dispatched)", file=sys.stderr)
+        return len(jobs)
+
+    def start(self) -> None:
+        """Start background machinery (called on API startup)."""
+
+    def stop(self) -> None:
+        """Stop background machinery (called on API shutdown)."""
+
+
+class ModalExecutor(JobExecutor):
+    """Run jobs on the deployed Modal function."""
+
+    name = "modal"
+
+    def __init__(self, app_name: str = "code-check-worker", function_name: str = "process_research_job"):
+        self.app_name = app_name
+        self.function_name = function_name
+
+    def submit(self, job_id: str, address: str, llm_provider: str, resume: bool = False) -> bool:
+        try:
+            import modal
+
+            # Spawn Modal function (non-blocking)
+            process_fn = modal.Function.lookup(self.app_name, self.function_name)
+            process_fn.spawn(job_id, address, llm_provider, resume)
+            print(f"[Executor] Spawned Modal worker for job {job_id}", file=sys.stderr)
+            return True
+
+        except Exception as modal_error:
+            print(f"[Executor] Failed to spawn Modal worker for job {job_id}: {modal_error}", file=sys.stderr)
+            return False
+
+    def submit_many(self, jobs: List[Dict]) -> List[str]:
+        try:
+            import modal
+            process_fn = modal.Function.lookup(self.app_name, self.function_name)
+        except Exception as modal_error:
+            print(f"[Executor] Failed to look up Modal worker: {modal_error}", file=sys.stderr)
+            return [job["id"] for job in jobs]
+
+        failed = []
+        for job in jobs:
+            try:
+                process_fn.spawn(job["id"], job["address"], job["llm_provider"], False)
+            except Exception as modal_error:
+                print(f"[Executor] Failed to spawn Modal worker for job {job['id']}: {modal_error}", file=sys.stderr)
+                failed.append(job["id"])
+        print(f"[Executor] Spawned {len(jobs) - len(failed)} Modal workers", file=sys.stderr)
+        return failed
+
+    def submit_batch(self, job_ids: List[str], llm_provider: str) -> bool:
+        try:
+            import modal
+            process_fn = modal.Function.lookup(self.app_name, "process_research_batch")
+            process_fn.spawn(job_ids, llm_provider)
+            print(f"[Executor] Spawned Modal batch worker for {len(job_ids)} jobs", file=sys.stderr)
+            return True
+        except Exception as modal_error:
+            print(f"[Executor] Failed to spawn Modal batch worker: {modal_error}", file=sys.stderr)
+            return False
+
+
+def _run_batch(job_ids: List[str], llm_provider: str) -> Dict:
+    from app.worker_logic import process_research_batch
+    return process_research_batch(job_ids, llm_provider)
+
+
+def _run_job(job_id: str, address: str, llm_provider: str, resume: bool) -> Dict:
+    # Top-level so it can be pickled into a process pool
+    from app.worker_logic import process_research_job
+    # Claimed by LocalExecutor.poll_once(), which also heartbeats the lease
+    return process_research_job(job_id, address, llm_provider, resume=resume, claimed=True)
+
+
+class LocalExecutor(JobExecutor):
+    """
+    Run jobs in a bounded local pool, fed from the durable job queue.
+
+    Jobs are never handed to the pool directly: submit() only wakes the
+    poller, which claims pending jobs through JobQueue while slots are free
+    (max_workers running + queue_depth waiting). Claimed jobs are
+    heartbeated until they finish and expired leases are requeued, so any
+    number of LocalExecutors can share one database without running a job
+    twice or losing one when a host dies (recover_jobs() requeues it).
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        max_workers: int = JOB_EXECUTOR_WORKERS,
+        queue_depth: int = JOB_EXECUTOR_QUEUE_DEPTH,
+        poll_interval: float = JOB_EXECUTOR_POLL_INTERVAL,
+        use_processes: bool = JOB_EXECUTOR_USE_PROCESSES,
+        queue: Optional[JobQueue] = None
+    ):
+        """
+        Args:
+            max_workers: Jobs running concurrently
+            queue_depth: Jobs claimed beyond max_workers and waiting in memory
+            poll_interval: Seconds between polls for pending jobs (0 disables
+                the background poller; submit() then claims inline)
+            use_processes: Use a process pool instead of threads
+            queue: Job queue to claim from (default: JobQueue())
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if queue_depth < 0:
+            raise ValueError("queue_depth must be non-negative")
+
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.poll_interval = poll_interval
+        self.use_processes = use_processes
+        self.queue = queue if queue is not None else JobQueue()
+        self._pool: Optional[Executor] = None
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+        self._last_maintenance = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_depth
+
+    def in_flight(self) -> int:
+        """Jobs running or queued in this executor."""
+        with self._lock:
+            return len(self._in_flight)
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            pool_cls = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self._pool = pool_cls(max_workers=self.max_workers)
+        return self._pool
+
+    def submit(self, job_id: str, address: str, llm_provider: str, resume: bool = False) -> bool:
+        # The job is already pending in the database; it runs once claimed
+        if self._poller is not None and self._poller.is_alive():
+            self._wake.set()
+            return True
+        try:
+            self.poll_once()
+            return True
+        except Exception as e:
+            print(f"[Executor] Failed to claim jobs: {e}", file=sys.stderr)
+            return False
+
+    def submit_many(self, jobs: List[Dict]) -> List[str]:
+        # All jobs are pending in the database; one wake-up claims them
+        if not jobs or self.submit(jobs[0]["id"], jobs[0]["address"], jobs[0]["llm_provider"]):
+            return []
+        return [job["id"] for job in jobs]
+
+    def submit_batch(self, job_ids: List[str], llm_provider: str) -> bool:
+        # Takes one pool slot; the batch claims its own jobs, and any the
+        # poller claimed first simply run individually
+        try:
+            future = self._get_pool().submit(_run_batch, list(job_ids), llm_provider)
+        except Exception as e:
+            print(f"[Executor] Failed to start batch: {e}", file=sys.stderr)
+            return False
+        future.add_done_callback(self._batch_finished)
+        return True
+
+    @staticmethod
+    def _batch_finished(future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            print(f"[Executor] Batch crashed: {future.exception()}", file=sys.stderr)
+
+    def _start(self, job: Dict) -> None:
+        job_id = job["id"]
+        with self._lock:
+            self._in_flight.add(job_id)
+        try:
+            future = self._get_pool().submit(
+                _run_job, job_id, job["address"], job["llm_provider"], JobQueue.is_retry(job)
+            )
+        except Exception as e:
+            # Still leased to us; requeued once the lease expires
+            with self._lock:
+                self._in_flight.discard(job_id)
+            print(f"[Executor] Failed to start job {job_id}: {e}", file=sys.stderr)
+            return
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+        print(f"[Executor] Claimed job {job_id}", file=sys.stderr)
+
+    def _finished(self, job_id: str, future) -> None:
+        with self._lock:
+            self._in_flight.discard(job_id)
+        if not future.cancelled() and future.exception() is not None:
+            print(f"[Executor] Job {job_id} crashed: {future.exception()}", file=sys.stderr)
+        # A slot freed up
+        self._wake.set()
+
+    def recover(self, queue: Optional[JobQueue] = None) -> int:
+        return super().recover(queue if queue is not None else self.queue)
+
+    def _maintain(self) -> None:
+        """Heartbeat running jobs, at most once per heartbeat interval."""
+        now = time.monotonic()
+        if now - self._last_maintenance < self.queue.heartbeat_interval:
+            return
+        self._last_maintenance = now
+
+        with self._lock:
+            job_ids = list(self._in_flight)
+        kept = set(self.queue.heartbeat(job_ids))
+        for job_id in job_ids:
+            if job_id not in kept:
+                print(f"[Executor] Lost lease on job {job_id}", file=sys.stderr)
+
+    def poll_once(self) -> int:
+        """
+        Claim pending jobs until the pool is full or the queue is empty.
+
+        Returns:
+            Number of jobs claimed
+        """
+        self._maintain()
+
+        claimed = 0
+        while self.in_flight() < self.capacity:
+            job = self.queue.claim()
+            if job is None:
+                break
+            self._start(job)
+            claimed += 1
+        return claimed
+
+    def _poll_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"[Executor] Poll failed: {e}", file=sys.stderr)
+
+    def start(self) -> None:
+        if self.poll_interval <= 0 or (self._poller is not None and self._poller.is_alive()):
+            return
+        self._stop.clear()
+        self._wake.set()
+        self._poller = threading.Thread(target=self._poll_loop, name="job-executor-poller", daemon=True)
+        self._poller.start()
+        print(f"[Executor] Local executor started as {self.queue.worker_id} ({self.max_workers} workers, queue depth {self.queue_depth})", file=sys.stderr)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._poller is not None:
+            self._poller.join(timeout=self.poll_interval + 1)
+            self._poller = None
+        if self._pool is not None:
+            # Running jobs finish in the background; queued ones keep their
+            # lease and are requeued when it expires
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def create_job_executor(name: str) -> JobExecutor:
+    """Build an executor by name ('modal' or 'local')."""
+    name = name.lower()
+    if name == "modal":
+        return ModalExecutor()
+    if name == "local":
+        return LocalExecutor()
+    raise ValueError(f"Unknown job executor: {name}")
+
+
+@lru_cache(maxsize=1)
+def get_job_executor() -> JobExecutor:
+    """Process-wide executor selected by JOB_EXECUTOR."""
+    return create_job_executor(JOB_EXECUTOR)
+
+
+async def recover_jobs(executor: JobExecutor, interval: float = JOB_RECOVERY_INTERVAL) -> None:
+    """
+    Run executor.recover() every interval seconds until cancelled.
+
+    Started by the API lifespan, so jobs whose worker died are requeued and
+    dispatched again whichever backend runs them.
+    """
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(executor.recover)
+        except Exception as e:
+            print(f"[Executor] Job recovery failed: {e}", file=sys.stderr)
@@ -0,0 +1,171 @@
+"""
+Job Event Stream
+
+Change feed behind GET /jobs/{job_id}/events (Server-Sent Events).
+
+A single JobEventBroker per API process watches every job that has at least
+one subscriber. Each tick it runs one query for the watched jobs and one for
+their new section results (each job's rows since its own cursor), then fans
+the changes out to all subscribers in memory. Database load therefore scales with the poll interval, not with the
+number of connected watchers.
+"""
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Set
+
+from app.db import JobDB
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+JOB_EVENTS_POLL_INTERVAL = float(os.getenv("JOB_EVENTS_POLL_INTERVAL", "1.0"))
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _status_payload(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job.get("progress"),
+        "started_at": job.get("started_at"),
+        "completed_at": job.get("completed_at"),
+        "error_message": job.get("error_message"),
+    }
+
+
+def _section_payload(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": result["job_id"],
+        "section_name": result["section_name"],
+        "section_data": result["section_data"],
+        "created_at": result["created_at"],
+    }
+
+
+class _WatchedJob:
+    """Last known state of a watched job, replayed to late subscribers."""
+
+    def __init__(self, job: Dict[str, Any], results: List[Dict[str, Any]]):
+        self.job = job
+        self.results = list(results)
+        self.seen_result_ids: Set[str] = {result["id"] for result in results}
+        self.subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def cursor(self) -> Optional[str]:
+        return self.results[-1]["created_at"] if self.results else None
+
+    def replay(self) -> List[tuple]:
+        events = [("status", _status_payload(self.job))]
+        events += [("section", _section_payload(result)) for result in self.results]
+        if self.job["status"] in TERMINAL_STATUSES:
+            events.append(("done", _status_payload(self.job)))
+        return events
+
+
+class JobEventBroker:
+    """
+    Shared poller that turns job/result table changes into events.
+
+    Subscribers receive (event, payload) tuples on an asyncio.Queue:
+    - status: job status or progress changed
+    - section: a section result was saved
+    - done: job reached a terminal status (last event)
+    """
+
+    def __init__(self, poll_interval: float = JOB_EVENTS_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._watched: Dict[str, _WatchedJob] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def subscribe(self, job_id: str) -> Optional[asyncio.Queue]:
+        """
+        Start receiving events for a job. The current state is replayed first.
+
+        Returns:
+            Queue of (event, payload) tuples, or None if the job doesn't exist
+        """
+        watched = self._watched.get(job_id)
+        if watched is None:
+            job = await asyncio.to_thread(JobDB.get_job, job_id)
+            if not job:
+                return None
+            results = await asyncio.to_thread(JobDB.get_job_results, job_id)
+            # Another subscriber may have started watching while we queried
+            watched = self._watched.setdefault(job_id, _WatchedJob(job, results))
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in watched.replay():
+            queue.put_nowait(event)
+        watched.subscribers.add(queue)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        watched = self._watched.get(job_id)
+        if watched is None:
+            return
+        watched.subscribers.discard(queue)
+        if not watched.subscribers:
+            del self._watched[job_id]
+
+    def watcher_count(self) -> int:
+        return sum(len(watched.subscribers) for watched in self._watched.values())
+
+    async def _run(self) -> None:
+        while self._watched:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._poll()
+            except Exception as e:
+                print(f"[Events] Poll failed: {e}", file=sys.stderr)
+
+    async def _poll(self) -> None:
+        active = {
+            job_id: watched for job_id, watched in self._watched.items()
+            if watched.job["status"] not in TERMINAL_STATUSES
+        }
+        if not active:
+            return
+
+        # Per-job cursors: a job with no results yet doesn't make the query
+        # re-read every other job's sections
+        cursors = {job_id: watched.cursor for job_id, watched in active.items()}
+
+        jobs = await asyncio.to_thread(JobDB.get_jobs, list(active))
+        results = await asyncio.to_thread(JobDB.get_results_since, cursors)
+
+        for result in results:
+            watched = active.get(result["job_id"])
+            if watched is None or result["id"] in watched.seen_result_ids:
+                continue
+            watched.seen_result_ids.add(result["id"])
+            watched.results.append(result)
+            self._publish(watched, "section", _section_payload(result))
+
+        for job in jobs:
+            watched = active.get(job["id"])
+            if watched is None:
+                continue
+            previous = watched.job
+            watched.job = job
+            if (job["status"], job.get("progress")) != (previous["status"], previous.get("progress")):
+                self._publish(watched, "status", _status_payload(job))
+            if job["status"] in TERMINAL_STATUSES:
+                self._publish(watched, "done", _status_payload(job))
+
+    @staticmethod
+    def _publish(watched: _WatchedJob, event: str, payload: Dict[str, Any]) -> None:
+        for queue in watched.subscribers:
+            queue.put_nowait((event, payload))
+
+
+# Process-wide broker shared by all SSE connections
+broker = JobEventBroker()
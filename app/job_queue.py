@@ -0,0 +1,185 @@
+"""
+Durable Job Queue
+
+Queue semantics over code_research_jobs (see migrations/004_add_job_queue_leases.sql):
+
+- claim(): atomically moves the oldest pending job to 'processing' and
+  leases it to this worker (FOR UPDATE SKIP LOCKED, so concurrent workers
+  never take the same row)
+- heartbeat(): extends the leases of the jobs this worker is running
+- requeue_expired(): returns jobs whose worker stopped heartbeating to
+  'pending', or fails them after max_attempts claims; the API runs it
+  periodically and dispatches the requeued jobs (executors.recover_jobs)
+
+A claimed job with attempts > 1 was interrupted before; it is resumed from
+its stored sections. A 'processing' job whose worker is gone (is_stale():
+lease expired, or never leased and running longer than a worker may) can be
+resumed through POST /jobs/{id}/resume.
+"""
+import os
+import socket
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from app.db import JobDB
+
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Longest a worker may run one job (the Modal function's timeout)
+JOB_WORKER_TIMEOUT_SECONDS = int(os.getenv("JOB_WORKER_TIMEOUT_SECONDS", "600"))
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    # Supabase returns ISO timestamps with an offset; the worker writes naive UTC
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def default_worker_id() -> str:
+    """Identifier unique to this process: host:pid:random."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobQueue:
+    """Lease-based queue over the jobs table."""
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        lease_seconds: int = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS
+    ):
+        """
+        Args:
+            worker_id: Lease owner name (default: host:pid:random)
+            lease_seconds: How long a claim or heartbeat keeps a job leased
+            max_attempts: Claims allowed before an expired job is failed
+        """
+        if lease_seconds < 1:
+            raise ValueError("lease_seconds must be at least 1")
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    @property
+    def heartbeat_interval(self) -> float:
+        """Heartbeat often enough that two missed beats don't expire the lease."""
+        return self.lease_seconds / 3
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest pending job to this worker.
+
+        Returns:
+            The claimed job (status 'processing'), or None if none is pending
+        """
+        client = JobDB._get_client()
+        result = client.rpc("claim_code_research_job", {
+            "worker_id": self.worker_id,
+            "lease_seconds": self.lease_seconds
+        }).execute()
+        return result.data[0] if result.data else None
+
+    def claim_jobs(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Lease specific pending jobs to this worker (e.g. a batch's jobs).
+
+        Returns:
+            The jobs claimed; ids already claimed elsewhere are skipped
+        """
+        if not job_ids:
+            return []
+        client = JobDB._get_client()
+        result = client.rpc("claim_code_research_jobs", {
+            "job_ids": list(job_ids),
+            "worker_id": self.worker_id,
+            "lease_seconds": self.lease_seconds
+        }).execute()
+        return result.data or []
+
+    def heartbeat(self, job_ids: List[str]) -> List[str]:
+        """
+        Extend the leases of jobs this worker holds, in one call.
+
+        Returns:
+            Ids whose lease was extended; the others were lost
+        """
+        if not job_ids:
+            return []
+        client = JobDB._get_client()
+        result = client.rpc("heartbeat_code_research_jobs", {
+            "job_ids": list(job_ids),
+            "worker_id": self.worker_id,
+            "lease_seconds": self.lease_seconds
+        }).execute()
+        return [row if isinstance(row, str) else next(iter(row.values())) for row in result.data or []]
+
+    def requeue_expired(self) -> List[Dict[str, Any]]:
+        """
+        Return jobs with expired leases to 'pending' (or fail them).
+
+        Returns:
+            The requeued jobs, to be dispatched again (JobExecutor.recover())
+        """
+        client = JobDB._get_client()
+        result = client.rpc("requeue_expired_code_research_jobs", {
+            "max_attempts": self.max_attempts
+        }).execute()
+        return result.data or []
+
+    @contextmanager
+    def hold_leases(self, job_ids: Callable[[], List[str]]):
+        """
+        Heartbeat job_ids() in a background thread for the duration of the block.
+
+        Example:
+            with queue.hold_leases(lambda: list(running)):
+                run_jobs()
+        """
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.heartbeat_interval):
+                try:
+                    self.heartbeat(job_ids())
+                except Exception as e:
+                    print(f"[Queue] Heartbeat failed: {e}", file=sys.stderr)
+
+        thread = threading.Thread(target=beat, name="job-queue-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join(timeout=1)
+
+    @staticmethod
+    def is_stale(job: Dict[str, Any], worker_timeout: int = JOB_WORKER_TIMEOUT_SECONDS) -> bool:
+        """
+        True if a 'processing' job has no live worker: its lease expired, or
+        it was never leased and started more than worker_timeout seconds ago
+        (a worker killed at its timeout never marks the job failed).
+        """
+        if job.get("status") != "processing":
+            return False
+        now = datetime.now(timezone.utc)
+        lease_expires_at = _parse_timestamp(job.get("lease_expires_at"))
+        if lease_expires_at is not None:
+            return lease_expires_at < now
+        started_at = _parse_timestamp(job.get("started_at") or job.get("created_at"))
+        return started_at is not None and started_at < now - timedelta(seconds=worker_timeout)
+
+    @staticmethod
+    def is_retry(job: Dict[str, Any]) -> bool:
+        """
+        True if the claimed job was interrupted before and should resume:
+        it has been claimed more than once (every claim sets started_at, so
+        that says nothing about earlier attempts).
+        """
+        return (job.get("attempts") or 0) > 1
@@ -1,7 +1,10 @@
 """
 Job Management API Endpoints
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Response, status
+from fastapi.responses import StreamingResponse
 from app.job_schemas import (
     JobCreateRequest,
     JobCreateResponse,
@@ -9,21 +12,101 @@ from app.job_schemas import (
     JobResultsResponse,
     JobListResponse,
     JobListItem,
-    SectionResult
+    SectionResult,
+    JobBatchCreateRequest,
+    JobBatchCreateResponse,
+    JobBatchItem,
+    JobBatchResponse,
+    JobTelemetryResponse
 )
-from app.db import JobDB
+from app.db import JobDB, is_unique_violation
 from app.job_auth import verify_job_api_key
+from app.singleflight import research_dedupe_key
+from app.job_events import broker, format_sse, TERMINAL_STATUSES
+from app.executors import get_job_executor
+from app.job_queue import JobQueue
+from app.batch_scheduler import JOB_BATCH_SCHEDULER
+from app.telemetry import aggregate_job_telemetry, get_upstream_stats
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
 
+def dispatch_job(job: dict, resume: bool = False) -> dict:
+    """
+    Hand a job to the configured executor (non-blocking).
+    
+    If the executor can't take the job it is marked failed instead of being
+    left pending forever; it can be retried with POST /jobs/{job_id}/resume.
+    
+    Returns:
+        The job, updated if dispatching failed
+    """
+    executor = get_job_executor()
+    if executor.submit(job["id"], job["address"], job["llm_provider"], resume=resume):
+        return job
+    
+    print(f"[API] Failed to dispatch job {job['id']} to {executor.name} executor")
+    try:
+        return JobDB.update_job(
+            job["id"],
+            status="failed",
+            error_message=f"Failed to dispatch job to {executor.name} executor",
+            completed_at=datetime.utcnow().isoformat()
+        )
+    except Exception as e:
+        print(f"[API] Failed to mark job {job['id']} as failed: {e}")
+        return job
+
+
+def dispatch_jobs(jobs: list) -> list:
+    """
+    Hand several jobs to the configured executor in one go.
+    
+    Jobs the executor can't take are marked failed in a single update.
+    
+    Returns:
+        IDs of the jobs that failed to dispatch
+    """
+    if not jobs:
+        return []
+    
+    executor = get_job_executor()
+    failed = executor.submit_many(jobs)
+    if failed:
+        print(f"[API] Failed to dispatch {len(failed)} jobs to {executor.name} executor")
+        try:
+            JobDB.update_jobs(
+                failed,
+                status="failed",
+                error_message=f"Failed to dispatch job to {executor.name} executor",
+                completed_at=datetime.utcnow().isoformat()
+            )
+        except Exception as e:
+            print(f"[API] Failed to mark jobs as failed: {e}")
+    return failed
+
+
+def dispatch_batch(jobs: list, llm_provider: str) -> list:
+    """
+    Hand a batch's new jobs to the jurisdiction-aware scheduler, falling
+    back to per-job dispatch when it is disabled or unavailable.
+    
+    Returns:
+        IDs of the jobs that failed to dispatch
+    """
+    if len(jobs) > 1 and JOB_BATCH_SCHEDULER:
+        if get_job_executor().submit_batch([job["id"] for job in jobs], llm_provider):
+            return []
+    return dispatch_jobs(jobs)
+
+
 @router.post(
     "",
     response_model=JobCreateResponse,
     status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(verify_job_api_key)]
 )
-async def create_job(request: JobCreateRequest):
+async def create_job(request: JobCreateRequest, response: Response):
     """
     Submit a new research job (Phase 3: Triggers Modal worker)
     
@@ -37,38 +120,42 @@ async def create_job(request: JobCreateRequest):
     
     **Phase 3**: Job is processed asynchronously by Modal worker.
     Use GET /jobs/{job_id} to poll for status updates.
+    
+    **Coalescing**: If an identical job (same normalized address and provider)
+    is already pending or processing, that job is returned with 200 and
+    deduplicated=true instead of starting a second pipeline.
     """
     try:
-        # Create job record (status: pending)
-        job = JobDB.create_job(
+        # Create job record (status: pending), or attach to the identical in-flight job
+        job, created = JobDB.create_or_attach_job(
             address=request.address,
-            llm_provider=request.llm_provider.value
+            llm_provider=request.llm_provider.value,
+            dedupe_key=research_dedupe_key(request.address, request.llm_provider.value)
         )
         
-        # Trigger Modal worker asynchronously (Phase 3)
-        try:
-            import modal
-            
-            # Spawn Modal function (non-blocking)
-            process_fn = modal.Function.lookup("code-check-worker", "process_research_job")
-            process_fn.spawn(
-                job["id"],
-                request.address,
-                request.llm_provider.value
+        if not created:
+            print(f"[API] Attached request to in-flight job {job['id']}")
+            response.status_code = status.HTTP_200_OK
+            return JobCreateResponse(
+                job_id=job["id"],
+                status=job["status"],
+                address=job["address"],
+                llm_provider=job["llm_provider"],
+                progress=job.get("progress"),
+                created_at=job["created_at"],
+                deduplicated=True
             )
-            print(f"[API] Spawned Modal worker for job {job['id']}")
-            
-        except Exception as modal_error:
-            print(f"[API] Warning: Failed to spawn Modal worker: {modal_error}")
-            # Don't fail the request - job is created, can be processed manually
-            # In production, you might want to update job status to 'failed'
+        
+        # Trigger the worker asynchronously (Modal or local pool, see app/executors.py)
+        # Don't fail the request if dispatching fails - the job is returned as failed
+        job = dispatch_job(job)
         
         return JobCreateResponse(
             job_id=job["id"],
             status=job["status"],
             address=job["address"],
             llm_provider=job["llm_provider"],
-            progress=job["progress"],
+            progress=job.get("progress"),
             created_at=job["created_at"]
         )
     except Exception as e:
@@ -78,6 +165,156 @@ async def create_job(request: JobCreateRequest):
         )
 
 
+@router.post(
+    "/batch",
+    response_model=JobBatchCreateResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(verify_job_api_key)]
+)
+async def create_job_batch(request: JobBatchCreateRequest):
+    """
+    Submit a portfolio of addresses as one batch
+    
+    **Authentication**: Requires X-API-Key header
+    
+    **Request Body**:
+    - addresses: 1-2000 US addresses
+    - llm_provider: LLM provider - 'openai' or 'gemini' (default: 'openai')
+    
+    **Returns**: batch_id plus the job each address maps to
+    
+    Addresses that normalize to the same address share one job, and addresses
+    already in flight attach to the existing job (deduplicated=true). New jobs
+    are inserted in bulk and handed to the batch scheduler, which resolves
+    jurisdictions first and researches each municipality's sections once.
+    Use GET /jobs/batch/{batch_id} for aggregate progress.
+    """
+    provider = request.llm_provider.value
+    
+    # One job per distinct normalized address
+    keys = [research_dedupe_key(address, provider) for address in request.addresses]
+    distinct = {}
+    for address, key in zip(request.addresses, keys):
+        distinct.setdefault(key, address)
+    
+    try:
+        results = JobDB.create_or_attach_jobs(
+            [(address, key) for key, address in distinct.items()],
+            llm_provider=provider
+        )
+        jobs_by_key = dict(zip(distinct, results))
+        batch = JobDB.create_batch(
+            llm_provider=provider,
+            total_addresses=len(request.addresses),
+            job_ids=[job["id"] for job, _ in results]
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create batch: {str(e)}"
+        )
+    
+    created_jobs = [job for job, created in results if created]
+    failed = set(dispatch_batch(created_jobs, provider))
+    print(f"[API] Batch {batch['id']}: {len(request.addresses)} addresses, "
+          f"{len(created_jobs)} new jobs, {len(results) - len(created_jobs)} attached")
+    
+    items = []
+    seen = set()
+    for address, key in zip(request.addresses, keys):
+        job, created = jobs_by_key[key]
+        items.append(JobBatchItem(
+            address=address,
+            job_id=job["id"],
+            status="failed" if job["id"] in failed else job["status"],
+            deduplicated=not created or key in seen
+        ))
+        seen.add(key)
+    
+    return JobBatchCreateResponse(
+        batch_id=batch["id"],
+        llm_provider=provider,
+        total_addresses=len(request.addresses),
+        total_jobs=len(results),
+        jobs_created=len(created_jobs),
+        jobs_deduplicated=sum(item.deduplicated for item in items),
+        created_at=batch["created_at"],
+        jobs=items
+    )
+
+
+@router.get(
+    "/batch/{batch_id}",
+    response_model=JobBatchResponse,
+    dependencies=[Depends(verify_job_api_key)]
+)
+async def get_job_batch(batch_id: str):
+    """
+    Get aggregate progress of a batch
+    
+    **Authentication**: Requires X-API-Key header
+    
+    **Path Parameters**:
+    - batch_id: UUID returned by POST /jobs/batch
+    
+    **Returns**: Job counts per status; status is 'completed' once every
+    job has finished (completed, failed or cancelled)
+    """
+    batch = JobDB.get_batch(batch_id)
+    
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Batch not found: {batch_id}"
+        )
+    
+    counts = JobDB.get_batch_progress(batch_id)
+    finished = sum(n for job_status, n in counts.items() if job_status in TERMINAL_STATUSES)
+    total = batch["total_jobs"]
+    
+    if finished >= total:
+        batch_status = "completed"
+    elif finished or counts.get("processing"):
+        batch_status = "processing"
+    else:
+        batch_status = "pending"
+    
+    return JobBatchResponse(
+        batch_id=batch["id"],
+        status=batch_status,
+        llm_provider=batch["llm_provider"],
+        total_addresses=batch["total_addresses"],
+        total_jobs=total,
+        jobs_by_status=counts,
+        progress=f"{finished}/{total} jobs finished",
+        created_at=batch["created_at"]
+    )
+
+
+@router.get(
+    "/telemetry",
+    response_model=JobTelemetryResponse,
+    dependencies=[Depends(verify_job_api_key)]
+)
+async def get_job_telemetry(limit: int = 200):
+    """
+    Upstream telemetry aggregated over recently finished jobs
+    
+    **Authentication**: Requires X-API-Key header
+    
+    **Query Parameters**:
+    - limit: Number of most recent finished jobs to aggregate (default: 200, max: 1000)
+    
+    **Returns**: Histograms (count, sum, buckets, p50/p95/p99) of job wall
+    time and, per section, wall time, upstream time and tokens, plus retry,
+    error and cost totals
+    """
+    limit = min(max(limit, 1), 1000)
+    
+    summaries = JobDB.list_job_telemetry(limit=limit)
+    return JobTelemetryResponse(upstream=get_upstream_stats(), **aggregate_job_telemetry(summaries))
+
+
 @router.get(
     "/{job_id}",
     response_model=JobResponse,
@@ -111,7 +348,8 @@ async def get_job(job_id: str):
         created_at=job["created_at"],
         started_at=job.get("started_at"),
         completed_at=job.get("completed_at"),
-        error_message=job.get("error_message")
+        error_message=job.get("error_message"),
+        metadata=job.get("metadata")
     )
 
 
@@ -160,6 +398,134 @@ async def get_job_results(job_id: str):
     )
 
 
+@router.post(
+    "/{job_id}/resume",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(verify_job_api_key)]
+)
+async def resume_job(job_id: str):
+    """
+    Resume a failed, cancelled or timed-out job from its last checkpoint
+    
+    **Authentication**: Requires X-API-Key header
+    
+    **Path Parameters**:
+    - job_id: UUID of the job
+    
+    **Returns**: Job details with status='pending'
+    
+    Sections already stored for the job are kept; the worker reuses the stored
+    location_information and researches only the missing sections.
+
+    A 'processing' job can be resumed once its worker is gone (lease expired,
+    or running longer than JOB_WORKER_TIMEOUT_SECONDS without a lease), e.g.
+    after Modal killed the worker at its timeout.
+    """
+    job = JobDB.get_job(job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}"
+        )
+    
+    stale = JobQueue.is_stale(job)
+    if job["status"] not in ("failed", "cancelled") and not stale:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Only failed, cancelled or timed-out jobs can be resumed (job is {job['status']})"
+        )
+    
+    # A timed-out job still carries its dead worker's lease
+    lease_updates = {"lease_owner": None, "lease_expires_at": None} if stale else {}
+    try:
+        job = JobDB.update_job(
+            job_id,
+            status="pending",
+            error_message=None,
+            completed_at=None,
+            **lease_updates
+        )
+    except Exception as e:
+        if is_unique_violation(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="An identical job is already in flight"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resume job: {str(e)}"
+        )
+    
+    job = dispatch_job(job, resume=True)
+    
+    return JobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        address=job["address"],
+        llm_provider=job["llm_provider"],
+        progress=job.get("progress"),
+        created_at=job["created_at"],
+        started_at=job.get("started_at"),
+        completed_at=job.get("completed_at"),
+        error_message=job.get("error_message"),
+        metadata=job.get("metadata")
+    )
+
+
+@router.get(
+    "/{job_id}/events",
+    dependencies=[Depends(verify_job_api_key)],
+    responses={200: {"content": {"text/event-stream": {}}}}
+)
+async def stream_job_events(job_id: str):
+    """
+    Stream job progress as Server-Sent Events
+    
+    **Authentication**: Requires X-API-Key header
+    
+    **Path Parameters**:
+    - job_id: UUID of the job
+    
+    **Events**:
+    - status: status/progress changed (current state is sent first)
+    - section: a section result was saved (includes section_data)
+    - done: job reached completed/failed/cancelled; the stream then closes
+    
+    Replaces polling GET /jobs/{job_id}. All watchers in a process share one
+    change feed, so database load does not grow with the number of clients.
+    """
+    queue = await broker.subscribe(job_id)
+    
+    if queue is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}"
+        )
+    
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    event, payload = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, payload)
+                if event == "done":
+                    break
+        finally:
+            broker.unsubscribe(job_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get(
     "",
     response_model=JobListResponse,
@@ -2,7 +2,7 @@
 Pydantic schemas for job API requests and responses
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
 from datetime import datetime
 from enum import Enum
 
@@ -36,6 +36,28 @@ class JobCreateRequest(BaseModel):
         return v.strip()
 
 
+MAX_BATCH_ADDRESSES = 2000
+
+
+class JobBatchCreateRequest(BaseModel):
+    """Request body for submitting a portfolio of addresses"""
+    addresses: List[str] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_ADDRESSES, description="US addresses to research"
+    )
+    llm_provider: LLMProvider = Field(default=LLMProvider.OPENAI, description="LLM provider for extraction")
+    
+    @field_validator('addresses')
+    @classmethod
+    def addresses_valid(cls, v: List[str]) -> List[str]:
+        addresses = []
+        for i, address in enumerate(v):
+            address = address.strip()
+            if not 5 <= len(address) <= 500:
+                raise ValueError(f'Address {i} must be 5-500 characters')
+            addresses.append(address)
+        return addresses
+
+
 # Response schemas
 class JobResponse(BaseModel):
     """Response for job status"""
@@ -48,6 +70,8 @@ class JobResponse(BaseModel):
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     error_message: Optional[str] = None
+    # section_providers and upstream telemetry recorded by the worker
+    metadata: Optional[Dict[str, Any]] = None
     
     class Config:
         from_attributes = True  # Allows creating from ORM models
@@ -59,8 +83,9 @@ class JobCreateResponse(BaseModel):
     status: str
     address: str
     llm_provider: str
-    progress: str
+    progress: Optional[str] = None
     created_at: datetime
+    deduplicated: bool = False  # True when attached to an identical job already in flight
     
     class Config:
         from_attributes = True
@@ -100,3 +125,44 @@ class JobListResponse(BaseModel):
     total: int
     limit: int
     offset: int
+
+
+class JobBatchItem(BaseModel):
+    """Job an address in a batch maps to"""
+    address: str
+    job_id: str
+    status: str
+    deduplicated: bool = False  # True when attached to a job already in flight or earlier in the batch
+
+
+class JobBatchCreateResponse(BaseModel):
+    """Response for batch submission"""
+    batch_id: str
+    llm_provider: str
+    total_addresses: int
+    total_jobs: int
+    jobs_created: int
+    jobs_deduplicated: int
+    created_at: datetime
+    jobs: List[JobBatchItem]
+
+
+class JobBatchResponse(BaseModel):
+    """Aggregate progress of a batch"""
+    batch_id: str
+    status: str  # pending, processing or completed (every job finished)
+    llm_provider: str
+    total_addresses: int
+    total_jobs: int
+    jobs_by_status: Dict[str, int]
+    progress: str  # e.g. "120/450 jobs finished"
+    created_at: datetime
+
+
+class JobTelemetryResponse(BaseModel):
+    """Upstream telemetry aggregated over recent finished jobs"""
+    jobs: int
+    wall_ms: Dict[str, Any]  # Histogram of job wall time
+    cost_usd: float
+    sections: Dict[str, Dict[str, Any]]  # Per-section histograms and totals
+    upstream: Dict[str, Dict[str, Any]]  # This process's per-provider call histograms
@@ -1,6 +1,9 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+import asyncio
 import os
 from typing import Optional
 
@@ -13,12 +16,31 @@ from .schemas import (
     HealthResponse
 )
 from .models import CodeCheckForm
-from .agent import CodeCheckAgent
+from .singleflight import AsyncSingleFlight, research_dedupe_key
 from .smartsheet_exporter import export_to_smartsheet
+from .executors import get_job_executor, recover_jobs
+from .rate_limit import configure_rate_limits
+from .metrics import record_request_metrics, render_metrics
 from . import job_routes
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Upstream rate limits come from Settings (shared by every agent in the process)
+    configure_rate_limits(settings)
+    # Local executor starts polling for pending jobs; Modal needs nothing
+    get_job_executor().start()
+    # Jobs whose worker died are requeued and dispatched again
+    recovery = asyncio.create_task(recover_jobs(get_job_executor()))
+    yield
+    recovery.cancel()
+    get_job_executor().stop()
+    # Release pooled upstream connections on shutdown
+    from .clients import close_async_http_client
+    await close_async_http_client()
+
 # Initialize FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.api_title,
     version=settings.api_version,
     description=settings.api_description,
@@ -35,9 +57,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route for /metrics
+app.middleware("http")(record_request_metrics)
+
 # Include job routes (Phase 2)
 app.include_router(job_routes.router)
 
+# Identical concurrent /research* requests share one agent run
+research_flights = AsyncSingleFlight()
+
+def client_registry():
+    """Dependency: the process-wide provider client registry shared by every request."""
+    # Imported on first use, like the agent (light endpoints don't need the clients)
+    from .clients import get_client_registry
+    return get_client_registry()
+
+async def run_research(address: str, llm_provider: str, clients=None) -> CodeCheckForm:
+    """Run the agent for an address, coalescing with any identical in-flight request."""
+    # Imported on first use: the agent pulls in the HTTP clients, which
+    # light endpoints (/health, /jobs/...) don't need on a cold start
+    from .agent import CodeCheckAgent
+
+    async def research():
+        agent = CodeCheckAgent(
+            llm_provider=llm_provider,
+            max_concurrency=settings.agent_max_concurrency,
+            clients=clients
+        )
+        return await agent.arun(address)
+
+    return await research_flights.do(research_dedupe_key(address, llm_provider), research)
+
 @app.get("/", tags=["Root"])
 async def root():
     """Root endpoint - API information."""
@@ -46,7 +96,8 @@ async def root():
         "version": settings.api_version,
         "description": settings.api_description,
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "metrics": "/metrics"
     }
 
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
@@ -67,6 +118,16 @@ async def health_check():
         services=services
     )
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def metrics():
+    """
+    Prometheus metrics for the API and its workers.
+    Does not require API key authentication.
+    """
+    # Reads worker snapshots and job counts from the database
+    body = await run_in_threadpool(render_metrics)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post(
     "/research",
     response_model=CodeCheckForm,
@@ -79,7 +140,7 @@ async def health_check():
         500: {"model": ErrorResponse, "description": "Internal server error"}
     }
 )
-async def research_address(request: ResearchRequest):
+async def research_address(request: ResearchRequest, clients=Depends(client_registry)):
     """
     Research zoning and sign codes for a US address.
 
@@ -114,8 +175,7 @@ async def research_address(request: ResearchRequest):
             )
 
         # Execute research
-        agent = CodeCheckAgent(llm_provider=request.llm_provider)
-        result = agent.run(request.address)
+        result = await run_research(request.address, request.llm_provider, clients)
 
         return result
 
@@ -141,7 +201,7 @@ async def research_address(request: ResearchRequest):
         500: {"model": ErrorResponse, "description": "Internal server error"}
     }
 )
-async def research_and_export(request: SmartsheetExportRequest):
+async def research_and_export(request: SmartsheetExportRequest, clients=Depends(client_registry)):
     """
     Research zoning and sign codes for a US address and export to Smartsheet.
 
@@ -180,11 +240,12 @@ async def research_and_export(request: SmartsheetExportRequest):
             )
 
         # Execute research
-        agent = CodeCheckAgent(llm_provider=request.llm_provider)
-        result = agent.run(request.address)
+        result = await run_research(request.address, request.llm_provider, clients)
 
         # Export to Smartsheet
-        export_result = export_to_smartsheet(
+        # Smartsheet SDK is blocking; keep it off the event loop
+        export_result = await run_in_threadpool(
+            export_to_smartsheet,
             form=result,
             access_token=request.smartsheet_access_token,
             workspace_name=request.workspace_name,
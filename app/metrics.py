@@ -0,0 +1,411 @@
+"""
+Prometheus Metrics
+
+Process-wide counters and histograms, rendered in the Prometheus text
+format by GET /metrics:
+
+- API request latency per route (see record_request_metrics)
+- DB round trips per JobDB method
+- Jobs processed by workers, by outcome, and their duration
+- Upstream call latency, errors, retries, tokens and cost (app.telemetry)
+- Research cache hits/misses and rate limiter waits
+
+Workers run in other processes (Modal containers, local process pools),
+so each one pushes a cumulative snapshot to code_research_worker_metrics
+(migrations/008_create_worker_metrics.sql) after every job. /metrics sums
+those rows with what the API process hasn't pushed yet, and adds gauges for
+jobs by status, queue depth and cache hit ratios.
+
+Rows not pushed for METRICS_WORKER_TTL_SECONDS are folded into one
+aggregate row (migrations/009_fold_worker_metrics.sql), so the table holds
+live workers only and *_total counters never go down when a worker stops.
+A process whose row was folded while it was idle pushes only what it
+counted since.
+
+Environment variables:
+- METRICS_PUSH: Workers push snapshots (default: true)
+- METRICS_WORKER_TTL_SECONDS: Fold snapshots older than this (default: 3600)
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.telemetry import Histogram, get_upstream_histograms, reset_upstream_stats
+
+METRICS_PUSH = os.getenv("METRICS_PUSH", "true").lower() in ("1", "true", "yes")
+METRICS_WORKER_TTL_SECONDS = int(os.getenv("METRICS_WORKER_TTL_SECONDS", "3600"))
+
+# Row holding the snapshots of workers that stopped pushing (migration 009)
+FOLDED_WORKER_ID = "_folded"
+
+PREFIX = "code_research_"
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# name -> (type, help) for every metric /metrics may emit
+METRICS = {
+    "http_request_duration_seconds": ("histogram", "API request latency by route"),
+    "db_query_duration_seconds": ("histogram", "Database round trip time by JobDB method"),
+    "db_errors_total": ("counter", "Failed database calls by JobDB method"),
+    "worker_jobs_total": ("counter", "Jobs finished by workers, by status"),
+    "worker_job_duration_seconds": ("histogram", "Wall time of jobs processed by workers"),
+    "upstream_request_duration_seconds": ("histogram", "Upstream call latency including retries"),
+    "upstream_requests_total": ("counter", "Upstream calls by provider and operation"),
+    "upstream_errors_total": ("counter", "Upstream calls that failed after retries"),
+    "upstream_retries_total": ("counter", "Upstream call retries"),
+    "upstream_tokens_total": ("counter", "Tokens reported by upstream providers"),
+    "upstream_cost_usd_total": ("counter", "Estimated upstream spend in USD"),
+    "cache_requests_total": ("counter", "Research cache lookups by kind and result"),
+    "rate_limit_waits_total": ("counter", "Upstream requests that waited for the rate limiter"),
+    "rate_limit_wait_seconds_total": ("counter", "Time spent waiting for the rate limiter"),
+    "jobs": ("gauge", "Jobs in the database by status"),
+    "queue_depth": ("gauge", "Pending jobs waiting for a worker"),
+    "executor_in_flight": ("gauge", "Jobs running or queued in this API's local executor"),
+    "cache_hit_ratio": ("gauge", "Research cache hit ratio by kind, across API and workers"),
+    "workers_reporting": ("gauge", "Worker processes whose snapshots are included"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, Any]]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+
+class MetricsRegistry:
+    """Labelled counters and histograms for one process. Thread-safe."""
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, value: float = 1.0) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def _histogram(self, name: str, labels: Labels, buckets: Iterable[float]) -> Histogram:
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            return histogram
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None, buckets: Iterable[float] = SECONDS_BUCKETS) -> None:
+        self._histogram(name, _labels(labels), buckets).observe(value)
+
+    @contextmanager
+    def time(self, name: str, labels: Optional[Dict[str, Any]] = None):
+        """Observe the block's duration in seconds."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, labels)
+
+    def merge(self, snapshot: Dict[str, Any], sign: int = 1) -> None:
+        """Add a snapshot() (e.g. from another process) into this registry (sign=-1 subtracts it)."""
+        for name, labels, value in snapshot.get("counters", []):
+            self.inc(name, labels, sign * value)
+        for name, labels, state in snapshot.get("histograms", []):
+            if sign < 0:
+                state = dict(state, counts=[-count for count in state["counts"]], sum=-state["sum"], count=-state["count"])
+            self._histogram(name, _labels(labels), state["buckets"]).merge(state)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-ready counters and raw histogram states."""
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+        return {
+            "counters": [[name, dict(labels), value] for (name, labels), value in counters],
+            "histograms": [[name, dict(labels), histogram.state()] for (name, labels), histogram in histograms],
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+@lru_cache(maxsize=1)
+def get_metrics_registry() -> MetricsRegistry:
+    """Process-wide metrics registry."""
+    return MetricsRegistry()
+
+
+def _difference(snapshot: Dict[str, Any], base: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """snapshot minus an earlier snapshot of the same process."""
+    registry = MetricsRegistry()
+    registry.merge(snapshot)
+    if base:
+        registry.merge(base, sign=-1)
+    return registry.snapshot()
+
+
+# This process's pushes: the cumulative snapshot its row was last given, and
+# how much of it is in the aggregate row because the row was folded
+_push_lock = threading.Lock()
+_pushed: Optional[Dict[str, Any]] = None
+_folded: Optional[Dict[str, Any]] = None
+
+
+def _reset_after_fork() -> None:
+    # Process-pool workers must not re-report the parent's numbers
+    global _pushed, _folded
+    get_metrics_registry().clear()
+    reset_upstream_stats()
+    _worker_id.cache_clear()
+    _pushed = _folded = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def collect_process_metrics() -> Dict[str, Any]:
+    """
+    Snapshot of everything this process has measured: the registry plus
+    upstream telemetry, research cache and rate limiter counters.
+    """
+    from app.cache import get_research_cache
+    from app.rate_limit import get_rate_limit_stats
+
+    registry = MetricsRegistry()
+    registry.merge(get_metrics_registry().snapshot())
+
+    for key, stats in get_upstream_histograms().items():
+        provider, operation = key.split(".", 1)
+        labels = {"provider": provider, "operation": operation}
+        latency = stats["latency_ms"]
+        registry.merge({"histograms": [["upstream_request_duration_seconds", labels, {
+            "buckets": [bound / 1000 for bound in latency["buckets"]],
+            "counts": latency["counts"],
+            "sum": latency["sum"] / 1000,
+            "count": latency["count"],
+        }]]})
+        registry.inc("upstream_requests_total", labels, stats["calls"])
+        registry.inc("upstream_errors_total", labels, stats["errors"])
+        registry.inc("upstream_retries_total", labels, stats["retries"])
+        registry.inc("upstream_cost_usd_total", labels, stats["cost_usd"])
+        for kind in ("prompt", "completion"):
+            registry.inc("upstream_tokens_total", dict(labels, type=kind), stats[f"{kind}_tokens"]["sum"])
+
+    cache = get_research_cache()
+    if cache is not None:
+        stats = cache.stats()
+        for kind in cache.KINDS:
+            registry.inc("cache_requests_total", {"kind": kind, "result": "hit"}, stats[kind]["hits"])
+            registry.inc("cache_requests_total", {"kind": kind, "result": "miss"}, stats[kind]["misses"])
+
+    for provider, stats in get_rate_limit_stats().items():
+        registry.inc("rate_limit_waits_total", {"provider": provider}, stats["waits"])
+        registry.inc("rate_limit_wait_seconds_total", {"provider": provider}, stats["wait_seconds"])
+
+    return registry.snapshot()
+
+
+@lru_cache(maxsize=1)
+def _worker_id() -> str:
+    from app.job_queue import default_worker_id
+    return default_worker_id()
+
+
+def push_worker_metrics() -> bool:
+    """
+    Upsert this process's cumulative snapshot into code_research_worker_metrics
+    (less whatever was already folded into the aggregate row).
+
+    Never raises; metrics must not fail a job.
+
+    Returns:
+        True if pushed
+    """
+    global _pushed, _folded
+    if not METRICS_PUSH:
+        return False
+    try:
+        from app.db import JobDB
+        with _push_lock:
+            snapshot = collect_process_metrics()
+            if _pushed is None:
+                JobDB.save_worker_metrics(_worker_id(), _difference(snapshot, _folded))
+            elif not JobDB.update_worker_metrics(_worker_id(), _difference(snapshot, _folded)):
+                # Folded while idle: the aggregate row holds everything we had pushed
+                _folded = _pushed
+                JobDB.save_worker_metrics(_worker_id(), _difference(snapshot, _folded))
+            _pushed = snapshot
+        return True
+    except Exception as e:
+        print(f"[Metrics] Failed to push worker metrics: {e}", file=sys.stderr)
+        return False
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, Any], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = sorted(labels.items())
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def render_prometheus(snapshot: Dict[str, Any], gauges: Iterable[Tuple[str, Dict[str, Any], float]] = ()) -> str:
+    """
+    Prometheus text exposition (version 0.0.4) of a snapshot plus gauges.
+
+    Args:
+        snapshot: MetricsRegistry.snapshot() / collect_process_metrics() output
+        gauges: (name, labels, value) samples
+    """
+    families: Dict[str, List[str]] = {}
+
+    for name, labels, value in snapshot.get("counters", []):
+        families.setdefault(name, []).append(f"{PREFIX}{name}{_format_labels(labels)} {_format_value(value)}")
+
+    for name, labels, state in snapshot.get("histograms", []):
+        lines = families.setdefault(name, [])
+        running = 0
+        for bound, count in zip(list(state["buckets"]) + [float("inf")], state["counts"]):
+            running += count
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {running}")
+        lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {_format_value(state['sum'])}")
+        lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {state['count']}")
+
+    for name, labels, value in gauges:
+        families.setdefault(name, []).append(f"{PREFIX}{name}{_format_labels(labels)} {_format_value(value)}")
+
+    output = []
+    for name in sorted(families):
+        metric_type, help_text = METRICS.get(name, ("untyped", name))
+        output.append(f"# HELP {PREFIX}{name} {help_text}")
+        output.append(f"# TYPE {PREFIX}{name} {metric_type}")
+        output.extend(families[name])
+    return "\n".join(output) + "\n"
+
+
+def record_request(route: str, method: str, status_code: int, seconds: float) -> None:
+    """Observe one API request (called by the HTTP middleware)."""
+    get_metrics_registry().observe(
+        "http_request_duration_seconds",
+        seconds,
+        {"route": route, "method": method, "status": status_code}
+    )
+
+
+async def record_request_metrics(request, call_next):
+    """
+    HTTP middleware timing every request, labelled by route template
+    (e.g. /jobs/{job_id}) so label cardinality stays bounded.
+    """
+    start = time.monotonic()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        record_request(
+            getattr(route, "path", "unmatched"),
+            request.method,
+            status_code,
+            time.monotonic() - start
+        )
+
+
+def _updated_at(row: Dict[str, Any]) -> datetime:
+    updated_at = datetime.fromisoformat(row["updated_at"].replace("Z", "+00:00"))
+    return updated_at if updated_at.tzinfo else updated_at.replace(tzinfo=timezone.utc)
+
+
+def _fold_stale_rows(rows: List[Dict[str, Any]]) -> None:
+    """Fold rows not pushed for METRICS_WORKER_TTL_SECONDS into the aggregate row."""
+    from app.db import JobDB
+
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=METRICS_WORKER_TTL_SECONDS)
+    aggregate = next((row for row in rows if row["worker_id"] == FOLDED_WORKER_ID), None)
+    stale = [row for row in rows if row["worker_id"] != FOLDED_WORKER_ID and _updated_at(row) < stale_before]
+    # No aggregate row means migration 009 hasn't run; keep the rows
+    if aggregate is None or not stale:
+        return
+
+    folded = MetricsRegistry()
+    folded.merge(aggregate["snapshot"])
+    for row in stale:
+        folded.merge(row["snapshot"])
+    try:
+        if JobDB.fold_worker_metrics([row["worker_id"] for row in stale], stale_before.isoformat(), folded.snapshot(), aggregate["updated_at"]):
+            print(f"[Metrics] Folded {len(stale)} expired worker snapshots", file=sys.stderr)
+    except Exception as e:
+        print(f"[Metrics] Failed to fold worker metrics: {e}", file=sys.stderr)
+
+
+def render_metrics() -> str:
+    """
+    Everything GET /metrics reports: every worker metrics row (the aggregate
+    of expired ones included) plus what this process hasn't pushed yet, and
+    job/queue/cache gauges.
+    """
+    from app.db import JobDB
+
+    combined = MetricsRegistry()
+    gauges: List[Tuple[str, Dict[str, Any], float]] = []
+
+    # Rows and this process's pushed state are read together, so a push
+    # landing mid-scrape can't be counted twice or not at all
+    with _push_lock:
+        try:
+            rows = JobDB.list_worker_metrics()
+        except Exception as e:
+            print(f"[Metrics] Failed to read worker metrics: {e}", file=sys.stderr)
+            rows = []
+        combined.merge(_difference(collect_process_metrics(), _pushed))
+
+    own_id = _worker_id()
+    workers = 0
+    for row in rows:
+        combined.merge(row["snapshot"])
+        if row["worker_id"] not in (own_id, FOLDED_WORKER_ID):
+            workers += 1
+    gauges.append(("workers_reporting", {}, workers))
+    _fold_stale_rows(rows)
+
+    try:
+        counts = JobDB.count_jobs_by_status()
+        for job_status, jobs in sorted(counts.items()):
+            gauges.append(("jobs", {"status": job_status}, jobs))
+        gauges.append(("queue_depth", {}, counts.get("pending", 0)))
+    except Exception as e:
+        print(f"[Metrics] Failed to count jobs: {e}", file=sys.stderr)
+
+    from app.executors import get_job_executor
+    executor = get_job_executor()
+    if hasattr(executor, "in_flight"):
+        gauges.append(("executor_in_flight", {}, executor.in_flight()))
+
+    snapshot = combined.snapshot()
+    cache = {}
+    for name, labels, value in snapshot["counters"]:
+        if name == "cache_requests_total":
+            cache.setdefault(labels["kind"], {"hit": 0.0, "miss": 0.0})[labels["result"]] += value
+    for kind, counts in sorted(cache.items()):
+        total = counts["hit"] + counts["miss"]
+        gauges.append(("cache_hit_ratio", {"kind": kind}, counts["hit"] / total if total else 0.0))
+
+    return render_prometheus(snapshot, gauges)
@@ -35,7 +35,7 @@ image = (
     timeout=600,  # 10 minutes max
     retries=0  # Don't retry automatically (jobs are idempotent)
 )
-def process_research_job(job_id: str, address: str, llm_provider: str = "openai"):
+def process_research_job(job_id: str, address: str, llm_provider: str = "openai", resume: bool = False):
     """
     Modal function: Process a research job in the background.
     
@@ -46,6 +46,7 @@ def process_research_job(job_id: str, address: str, llm_provider: str = "openai"
         job_id: UUID of the job to process
         address: US address to research  
         llm_provider: LLM provider ('openai' or 'gemini')
+        resume: Research only the sections missing from a previous attempt
     
     Returns:
         Dict with status and results
@@ -61,13 +62,74 @@ def process_research_job(job_id: str, address: str, llm_provider: str = "openai"
     print(f"[Modal] Processing job {job_id}", file=sys.stderr)
     
     # Execute worker logic
-    result = worker_process(job_id, address, llm_provider)
+    result = worker_process(job_id, address, llm_provider, resume=resume)
     
     print(f"[Modal] Job {job_id} finished with status: {result['status']}", file=sys.stderr)
     
     return result
 
 
+@app.function(
+    image=image,
+    secrets=[secrets],
+    timeout=7200,  # Large portfolios: jurisdiction pass + one research run per municipality
+    retries=0
+)
+def process_research_batch(job_ids: list, llm_provider: str = "openai"):
+    """
+    Modal function: Process a batch's jobs grouped by jurisdiction.
+    
+    Invoked by POST /jobs/batch. Each municipality's sections are researched
+    once and saved to every job in it.
+    
+    Args:
+        job_ids: UUIDs of the batch's jobs
+        llm_provider: LLM provider ('openai' or 'gemini')
+    
+    Returns:
+        Dict with batch counts
+    """
+    import sys
+    
+    sys.path.insert(0, "/root/app")
+    
+    from worker_logic import process_research_batch as worker_process_batch
+    
+    print(f"[Modal] Processing batch of {len(job_ids)} jobs", file=sys.stderr)
+    
+    result = worker_process_batch(job_ids, llm_provider)
+    
+    print(f"[Modal] Batch finished with status: {result['status']}", file=sys.stderr)
+    
+    return result
+
+
+@app.function(
+    image=image,
+    secrets=[secrets],
+    schedule=modal.Period(minutes=1),
+    timeout=120,
+    retries=0
+)
+def recover_expired_jobs():
+    """
+    Modal function: Requeue jobs whose worker died and spawn them again.
+    
+    Runs on a schedule so jobs are recovered even while no API process is
+    up (the API lifespan runs the same sweep).
+    
+    Returns:
+        Number of jobs requeued
+    """
+    import sys
+    
+    sys.path.insert(0, "/root/app")
+    
+    from executors import ModalExecutor
+    
+    return ModalExecutor().recover()
+
+
 # Local testing function
 @app.local_entrypoint()
 def test_job():
@@ -0,0 +1,363 @@
+"""
+Upstream Rate Limiting
+
+Token-bucket limiters per provider (perplexity, openai, gemini), shared by
+every client and agent in the process:
+
+- requests bucket: requests per minute (RPM)
+- tokens bucket: estimated tokens per minute (TPM), settled against the
+  usage the provider reports
+- concurrency cap: requests in flight at once
+
+With RATE_LIMIT_BACKEND=supabase the buckets live in the database
+(migrations/007_create_rate_limits.sql and 011), so the limits hold across all API
+processes and workers sharing an API key.
+
+Limits are configured through RateLimitSettings, which app.config.Settings
+extends; a limit of 0 disables it.
+"""
+import asyncio
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from pydantic_settings import BaseSettings
+
+PROVIDERS = ("perplexity", "openai", "gemini")
+
+# Longest single sleep while waiting, so waiters re-check a shared bucket
+MAX_WAIT_SLICE = 5.0
+# Poll interval for async waiters on the concurrency cap
+ASYNC_SLOT_POLL = 0.02
+
+
+class RateLimitSettings(BaseSettings):
+    """Upstream rate limits (extended by app.config.Settings)."""
+
+    # memory (per process), supabase (shared across processes) or none
+    rate_limit_backend: str = "memory"
+    # Tokens reserved for a completion before the provider reports real usage
+    rate_limit_completion_tokens: int = 1000
+
+    perplexity_rpm: int = 50
+    perplexity_tpm: int = 0
+    perplexity_max_concurrency: int = 10
+
+    openai_rpm: int = 500
+    openai_tpm: int = 30000
+    openai_max_concurrency: int = 20
+
+    gemini_rpm: int = 150
+    gemini_tpm: int = 0
+    gemini_max_concurrency: int = 20
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+        extra = "ignore"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for rate limiting (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    In-process token bucket refilled at rate_per_minute, holding at most
+    capacity tokens (default: one minute's worth). Thread-safe.
+    """
+
+    # take() is cheap; async callers needn't move it off the event loop
+    blocking_io = False
+
+    def __init__(self, name: str, rate_per_minute: float, capacity: Optional[float] = None):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, tokens: float) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            0 if taken, otherwise seconds until enough tokens will be available
+        """
+        # A request larger than the bucket waits for a full bucket
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def refund(self, tokens: float) -> None:
+        """Return unused tokens (negative values charge extra usage)."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+
+class SupabaseTokenBucket:
+    """
+    Token bucket stored in code_research_rate_limits and updated atomically
+    by take_rate_limit_tokens(), shared by every process using it. Like
+    TokenBucket, a charge above the balance leaves it negative.
+    """
+
+    blocking_io = True
+
+    def __init__(self, name: str, rate_per_minute: float, capacity: Optional[float] = None):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+
+    def _call(self, tokens: float, force: bool = False) -> float:
+        from app.db import JobDB
+        result = JobDB._get_client().rpc("take_rate_limit_tokens", {
+            "bucket": self.name,
+            "amount": tokens,
+            "rate_per_second": self.rate,
+            "bucket_capacity": self.capacity,
+            "force": force
+        }).execute()
+        return float(result.data or 0)
+
+    def take(self, tokens: float) -> float:
+        try:
+            return self._call(min(tokens, self.capacity))
+        except Exception as e:
+            # Don't fail research because the limiter table is unreachable
+            print(f"[RateLimit] Shared bucket {self.name} unavailable: {e}", file=sys.stderr)
+            return 0.0
+
+    def refund(self, tokens: float) -> None:
+        """Return unused tokens (negative values charge extra usage)."""
+        try:
+            # Forced: usage above the reservation is charged even if the
+            # bucket goes negative (migrations/011_rate_limit_forced_charge.sql)
+            self._call(-tokens, force=True)
+        except Exception as e:
+            print(f"[RateLimit] Shared bucket {self.name} unavailable: {e}", file=sys.stderr)
+
+
+class ProviderLimiter:
+    """
+    Requests/tokens buckets plus a concurrency cap for one provider.
+
+    Example:
+        with limiter.limit(tokens=estimate) as reservation:
+            response = call_provider()
+            reservation.settle(response.usage.total_tokens)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests: Optional[Any] = None,
+        tokens: Optional[Any] = None,
+        max_concurrency: int = 0,
+        completion_tokens: int = 1000
+    ):
+        self.name = name
+        self.requests = requests
+        self.tokens = tokens
+        self.max_concurrency = max_concurrency
+        self.completion_tokens = completion_tokens
+        self._in_flight = 0
+        self._slot = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._waits = 0
+        self._wait_seconds = 0.0
+
+    def estimate(self, prompt: str) -> int:
+        """Tokens to reserve for a request: prompt estimate plus a completion allowance."""
+        return estimate_tokens(prompt) + self.completion_tokens
+
+    # Concurrency cap
+
+    def _try_enter(self) -> bool:
+        with self._slot:
+            if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                return False
+            self._in_flight += 1
+            return True
+
+    def _enter(self) -> None:
+        with self._slot:
+            while self.max_concurrency and self._in_flight >= self.max_concurrency:
+                self._slot.wait()
+            self._in_flight += 1
+
+    def _exit(self) -> None:
+        with self._slot:
+            self._in_flight -= 1
+            self._slot.notify()
+
+    # Buckets
+
+    def _record_wait(self, seconds: float) -> None:
+        # Ignore lock/bookkeeping overhead; count only real throttling
+        if seconds >= 0.01:
+            with self._stats_lock:
+                self._waits += 1
+                self._wait_seconds += seconds
+
+    def _acquire(self, tokens: int) -> float:
+        waited = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is None or amount <= 0:
+                continue
+            while True:
+                wait = bucket.take(amount)
+                if wait <= 0:
+                    break
+                wait = min(wait, MAX_WAIT_SLICE)
+                time.sleep(wait)
+                waited += wait
+        return waited
+
+    async def _aacquire(self, tokens: int) -> float:
+        waited = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is None or amount <= 0:
+                continue
+            while True:
+                if bucket.blocking_io:
+                    wait = await asyncio.to_thread(bucket.take, amount)
+                else:
+                    wait = bucket.take(amount)
+                if wait <= 0:
+                    break
+                wait = min(wait, MAX_WAIT_SLICE)
+                await asyncio.sleep(wait)
+                waited += wait
+        return waited
+
+    @contextmanager
+    def limit(self, tokens: int = 0):
+        """
+        Block until a request slot and budget are available.
+
+        Args:
+            tokens: Estimated tokens for the request (prompt + completion)
+
+        Yields:
+            Reservation; call settle(actual_tokens) once usage is known
+        """
+        start = time.monotonic()
+        self._enter()
+        try:
+            self._acquire(tokens)
+            self._record_wait(time.monotonic() - start)
+            yield _Reservation(self, tokens)
+        finally:
+            self._exit()
+
+    @asynccontextmanager
+    async def alimit(self, tokens: int = 0):
+        """Async variant of limit(); waits without blocking the event loop."""
+        start = time.monotonic()
+        while not self._try_enter():
+            await asyncio.sleep(ASYNC_SLOT_POLL)
+        try:
+            await self._aacquire(tokens)
+            self._record_wait(time.monotonic() - start)
+            yield _Reservation(self, tokens)
+        finally:
+            self._exit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests that had to wait, total time spent waiting, and in-flight count."""
+        with self._stats_lock:
+            return {
+                "waits": self._waits,
+                "wait_seconds": round(self._wait_seconds, 3),
+                "in_flight": self._in_flight,
+            }
+
+
+class _Reservation:
+    def __init__(self, limiter: ProviderLimiter, tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+
+    def settle(self, actual_tokens: Optional[int]) -> None:
+        """Correct the token bucket by the difference between estimate and usage."""
+        if actual_tokens is None or self.limiter.tokens is None or self.tokens <= 0:
+            return
+        difference = self.tokens - actual_tokens
+        if difference:
+            self.limiter.tokens.refund(difference)
+
+
+@lru_cache(maxsize=1)
+def get_rate_limit_settings() -> RateLimitSettings:
+    """Rate limit configuration from the environment / .env."""
+    return RateLimitSettings()
+
+
+def create_provider_limiter(provider: str, settings: RateLimitSettings) -> ProviderLimiter:
+    """Build a provider's limiter from settings."""
+    backend = settings.rate_limit_backend.lower()
+    if backend not in ("memory", "supabase", "none"):
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    if backend == "none":
+        return ProviderLimiter(provider, completion_tokens=settings.rate_limit_completion_tokens)
+
+    bucket_cls = SupabaseTokenBucket if backend == "supabase" else TokenBucket
+    rpm = getattr(settings, f"{provider}_rpm")
+    tpm = getattr(settings, f"{provider}_tpm")
+    return ProviderLimiter(
+        provider,
+        requests=bucket_cls(f"{provider}:requests", rpm) if rpm > 0 else None,
+        tokens=bucket_cls(f"{provider}:tokens", tpm) if tpm > 0 else None,
+        max_concurrency=getattr(settings, f"{provider}_max_concurrency"),
+        completion_tokens=settings.rate_limit_completion_tokens
+    )
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> ProviderLimiter:
+    """Process-wide limiter for a provider ('perplexity', 'openai' or 'gemini')."""
+    provider = provider.lower()
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider: {provider}")
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = create_provider_limiter(provider, get_rate_limit_settings())
+        return limiter
+
+
+def configure_rate_limits(settings: RateLimitSettings) -> None:
+    """Rebuild all limiters from settings (e.g. app.config.settings at API startup)."""
+    with _limiters_lock:
+        _limiters.clear()
+        for provider in PROVIDERS:
+            _limiters[provider] = create_provider_limiter(provider, settings)
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """stats() for every limiter created so far."""
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
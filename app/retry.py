@@ -0,0 +1,276 @@
+"""
+Upstream Errors and Retries
+
+Typed errors for Perplexity / OpenAI / Gemini failures, and the retry
+policy the clients apply to each call:
+
+- RateLimitError (429), UpstreamServerError (5xx) and UpstreamTimeoutError
+  (timeouts, dropped connections) are retried
+- UpstreamClientError (other 4xx) and ExtractionError (unparseable
+  output) are not
+
+Retries back off exponentially with full jitter, honour Retry-After, and
+draw from a RetryBudget shared by every call of one job so a degraded
+upstream can't multiply a job's runtime. Because retries wrap single client
+calls, only the failing section is retried.
+
+Per-provider policy: <PROVIDER>_RETRY_MAX_ATTEMPTS, _RETRY_BASE_DELAY and
+_RETRY_MAX_DELAY, falling back to RETRY_MAX_ATTEMPTS / RETRY_BASE_DELAY /
+RETRY_MAX_DELAY. JOB_RETRY_BUDGET caps retries per job.
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1.0"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30.0"))
+# Longest Retry-After we honour; longer waits fail the call instead
+RETRY_AFTER_MAX = float(os.getenv("RETRY_AFTER_MAX", "120"))
+JOB_RETRY_BUDGET = int(os.getenv("JOB_RETRY_BUDGET", "20"))
+
+
+class UpstreamError(Exception):
+    """An upstream API call failed."""
+
+    retryable = False
+
+    def __init__(
+        self,
+        message: str,
+        provider: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class RateLimitError(UpstreamError):
+    """429 Too Many Requests (or provider quota exhausted)."""
+    retryable = True
+
+
+class UpstreamServerError(UpstreamError):
+    """5xx from the provider."""
+    retryable = True
+
+
+class UpstreamTimeoutError(UpstreamError):
+    """Timeout or connection failure before a response arrived."""
+    retryable = True
+
+
+class UpstreamClientError(UpstreamError):
+    """Non-retryable 4xx: bad request, auth, not found."""
+
+
+class ExtractionError(UpstreamError):
+    """The provider answered but the output couldn't be used."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    # requests/httpx errors carry .response; openai errors .status_code;
+    # google.api_core errors an int .code
+    response = getattr(exc, "response", None)
+    for candidate in (
+        getattr(exc, "status_code", None),
+        getattr(response, "status_code", None),
+        getattr(exc, "code", None),
+    ):
+        if isinstance(candidate, int) and 100 <= candidate < 600:
+            return candidate
+    return None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+    except Exception:
+        return None
+
+
+def _is_timeout(exc: BaseException) -> bool:
+    import requests
+    import httpx
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError, httpx.TimeoutException, httpx.TransportError, TimeoutError)):
+        return True
+    # openai.APITimeoutError / APIConnectionError, google DeadlineExceeded
+    return type(exc).__name__ in ("APITimeoutError", "APIConnectionError", "DeadlineExceeded", "ServiceUnavailable")
+
+
+def classify_error(provider: str, exc: BaseException, context: str) -> UpstreamError:
+    """
+    Wrap a provider/transport exception in the matching UpstreamError.
+
+    Args:
+        provider: 'perplexity', 'openai' or 'gemini'
+        exc: The original exception
+        context: Message prefix, e.g. "Error calling Perplexity API"
+    """
+    if isinstance(exc, UpstreamError):
+        return exc
+
+    message = f"{context}: {exc}"
+    status = _status_code(exc)
+    retry_after = _retry_after(exc)
+
+    if status == 429 or type(exc).__name__ in ("RateLimitError", "ResourceExhausted"):
+        return RateLimitError(message, provider, status or 429, retry_after)
+    if status is not None and status >= 500:
+        return UpstreamServerError(message, provider, status, retry_after)
+    if status is not None and status >= 400:
+        return UpstreamClientError(message, provider, status)
+    if _is_timeout(exc):
+        return UpstreamTimeoutError(message, provider)
+    return ExtractionError(message, provider, status)
+
+
+class RetryBudget:
+    """Retries left for one job, shared by all its calls. Thread-safe."""
+
+    def __init__(self, max_retries: int = JOB_RETRY_BUDGET):
+        self.max_retries = max_retries
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.max_retries - self._used)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._used >= self.max_retries:
+                return False
+            self._used += 1
+            return True
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring Retry-After."""
+
+    def __init__(
+        self,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        retry_after_max: float = RETRY_AFTER_MAX
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_after_max = retry_after_max
+
+    def delay(self, attempt: int, error: UpstreamError) -> Optional[float]:
+        """
+        Seconds to wait before retry number `attempt` (1-based), or None if
+        the server asked for a longer wait than retry_after_max.
+        """
+        if error.retry_after is not None:
+            return error.retry_after if error.retry_after <= self.retry_after_max else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _next_delay(self, attempt: int, error: UpstreamError, budget: Optional[RetryBudget]) -> Optional[float]:
+        if not error.retryable or attempt >= self.max_attempts:
+            return None
+        delay = self.delay(attempt, error)
+        if delay is None:
+            return None
+        if budget is not None and not budget.try_spend():
+            print(f"[Retry] Job retry budget exhausted; giving up on {error.provider}", file=sys.stderr)
+            return None
+        print(f"[Retry] {type(error).__name__} from {error.provider} "
+              f"(attempt {attempt}/{self.max_attempts}), retrying in {delay:.1f}s", file=sys.stderr)
+        return delay
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        budget: Optional[RetryBudget] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> T:
+        """
+        Run fn(), retrying retryable UpstreamErrors.
+
+        Once cancel is set (e.g. the other request of a hedge won), the last
+        error is raised instead of retrying, and a pending backoff ends early.
+        """
+        attempt = 1
+        while True:
+            try:
+                return fn()
+            except UpstreamError as error:
+                delay = None if cancel is not None and cancel.is_set() else self._next_delay(attempt, error, budget)
+                if delay is None:
+                    raise
+                if cancel is not None and cancel.wait(delay):
+                    raise
+            if cancel is None:
+                time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], budget: Optional[RetryBudget] = None) -> T:
+        """Async variant of call()."""
+        attempt = 1
+        while True:
+            try:
+                return await fn()
+            except UpstreamError as error:
+                delay = self._next_delay(attempt, error, budget)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+_policies: Dict[str, RetryPolicy] = {}
+
+
+def get_retry_policy(provider: str) -> RetryPolicy:
+    """Retry policy for a provider, from <PROVIDER>_RETRY_* or the global defaults."""
+    provider = provider.lower()
+    policy = _policies.get(provider)
+    if policy is None:
+        prefix = provider.upper()
+        policy = _policies[provider] = RetryPolicy(
+            max_attempts=int(os.getenv(f"{prefix}_RETRY_MAX_ATTEMPTS", RETRY_MAX_ATTEMPTS)),
+            base_delay=float(os.getenv(f"{prefix}_RETRY_BASE_DELAY", RETRY_BASE_DELAY)),
+            max_delay=float(os.getenv(f"{prefix}_RETRY_MAX_DELAY", RETRY_MAX_DELAY))
+        )
+    return policy
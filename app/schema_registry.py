@@ -0,0 +1,244 @@
+"""
+Structured Output Schemas
+
+Provider-ready response formats for the extraction models, compiled once per
+model and shared by every LLM call in the process:
+
+- openai: the strict json_schema response_format that
+  chat.completions.parse() would otherwise rebuild from the model (and its
+  ResearchedField generics) on every call. Built here from
+  model_json_schema(), so it doesn't depend on SDK internals
+- gemini: a GenerationConfig whose response_schema is already a
+  protos.Schema, so generate_content() doesn't convert it per call
+
+get_schema_registry().warm() compiles every CodeCheckForm section model (and
+the batch extraction composites) up front; workers do this in the background
+when they pick up their first job. The API doesn't, so its cold start never
+imports the SDKs. Any other model is compiled on first use.
+
+Environment variables:
+- SCHEMA_PRECOMPILE: Warm the registry in worker processes (default: true)
+"""
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from pydantic import BaseModel
+
+from .models import CodeCheckForm
+
+SCHEMA_PRECOMPILE = os.getenv("SCHEMA_PRECOMPILE", "true").lower() in ("1", "true", "yes")
+
+# JSON schema keywords the Gemini Schema proto understands (besides
+# properties/items, which are converted recursively)
+_GEMINI_SCHEMA_KEYS = ("description", "enum", "nullable")
+
+_warm_thread: Optional[threading.Thread] = None
+_warm_lock = threading.Lock()
+
+
+def openai_schema(schema: Dict[str, Any], root: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Make a pydantic JSON schema strict for OpenAI structured outputs.
+
+    Objects get additionalProperties: false and list every property as
+    required, None defaults are dropped (the field stays nullable), and $refs
+    with sibling keywords are inlined; other $refs and $defs are kept.
+    """
+    if root is None:
+        root = schema
+    strict = dict(schema)
+    for key in ("$defs", "definitions"):
+        if isinstance(schema.get(key), dict):
+            strict[key] = {name: openai_schema(value, root) for name, value in schema[key].items()}
+    if strict.get("type") == "object":
+        strict.setdefault("additionalProperties", False)
+    if isinstance(schema.get("properties"), dict):
+        strict["required"] = list(schema["properties"])
+        strict["properties"] = {name: openai_schema(value, root) for name, value in schema["properties"].items()}
+    if isinstance(schema.get("items"), dict):
+        strict["items"] = openai_schema(schema["items"], root)
+    if isinstance(schema.get("anyOf"), list):
+        strict["anyOf"] = [openai_schema(option, root) for option in schema["anyOf"]]
+    if isinstance(schema.get("allOf"), list):
+        if len(schema["allOf"]) == 1:
+            del strict["allOf"]
+            strict.update(openai_schema(schema["allOf"][0], root))
+        else:
+            strict["allOf"] = [openai_schema(entry, root) for entry in schema["allOf"]]
+    if "default" in strict and strict["default"] is None:
+        del strict["default"]
+
+    # A $ref can't have sibling keywords (a description, say): inline it
+    ref = strict.get("$ref")
+    if ref and len(strict) > 1:
+        if not ref.startswith("#/"):
+            raise ValueError(f"Unsupported $ref: {ref}")
+        resolved = root
+        for key in ref[2:].split("/"):
+            resolved = resolved[key]
+        inlined = {**resolved, **strict}
+        del inlined["$ref"]
+        return openai_schema(inlined, root)
+    return strict
+
+
+def openai_response_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """The strict json_schema response_format chat.completions.parse() sends for a model."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "schema": openai_schema(model.model_json_schema()),
+            "name": model.__name__,
+            "strict": True,
+        },
+    }
+
+
+def gemini_schema(schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Convert a pydantic JSON schema to the fields of a Gemini protos.Schema.
+
+    $refs are inlined, Optional[...] becomes nullable, and keywords Gemini
+    rejects (default, title, additionalProperties...) are dropped.
+    """
+    if defs is None:
+        defs = schema.get("$defs", {})
+    if "$ref" in schema:
+        return gemini_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        if len(options) != 1:
+            raise ValueError("Gemini response schemas only support Optional[...] unions")
+        converted = gemini_schema(options[0], defs)
+        if len(options) < len(schema["anyOf"]):
+            converted["nullable"] = True
+        return converted
+
+    converted = {key: schema[key] for key in _GEMINI_SCHEMA_KEYS if key in schema}
+    if "properties" in schema:
+        converted["type_"] = "OBJECT"
+        converted["properties"] = {name: gemini_schema(value, defs) for name, value in schema["properties"].items()}
+    elif "type" in schema:
+        converted["type_"] = schema["type"].upper()
+    if "items" in schema:
+        converted["items"] = gemini_schema(schema["items"], defs)
+    return converted
+
+
+class CompiledSchema:
+    """Response formats for one extraction model."""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.openai: Dict[str, Any] = openai_response_format(model)
+        self._gemini = None
+        self._lock = threading.Lock()
+
+    @property
+    def gemini(self):
+        """GenerationConfig for Gemini (built on first use, so OpenAI-only processes skip the SDK)."""
+        if self._gemini is None:
+            with self._lock:
+                if self._gemini is None:
+                    import google.generativeai as genai
+                    self._gemini = genai.protos.GenerationConfig(
+                        response_mime_type="application/json",
+                        response_schema=genai.protos.Schema(gemini_schema(self.model.model_json_schema()))
+                    )
+        return self._gemini
+
+
+def section_models() -> List[Type[BaseModel]]:
+    """Every CodeCheckForm section model, plus the batch extraction composites."""
+    from .agent import SECTION_GROUPS, composite_model
+
+    models = [
+        field.annotation for field in CodeCheckForm.model_fields.values()
+        if isinstance(field.annotation, type) and issubclass(field.annotation, BaseModel)
+    ]
+    return models + [composite_model(group) for group in SECTION_GROUPS]
+
+
+class SchemaRegistry:
+    """Compiled response formats per model. Thread-safe."""
+
+    def __init__(self):
+        self._compiled: Dict[Type[BaseModel], CompiledSchema] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: Type[BaseModel]) -> CompiledSchema:
+        """Compiled formats for a model (compiled now if it wasn't yet)."""
+        compiled = self._compiled.get(model)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(model)
+                if compiled is None:
+                    compiled = self._compiled[model] = CompiledSchema(model)
+        return compiled
+
+    def warm(self, models: Optional[Iterable[Type[BaseModel]]] = None, gemini: bool = False) -> int:
+        """
+        Compile models ahead of their first call.
+
+        Args:
+            models: Models to compile (default: section_models())
+            gemini: Also build the Gemini configs
+
+        Returns:
+            Number of models compiled
+        """
+        start = time.monotonic()
+        models = list(models if models is not None else section_models())
+        for model in models:
+            compiled = self.get(model)
+            if gemini:
+                compiled.gemini
+        print(f"[Schemas] Compiled {len(models)} response formats in {time.monotonic() - start:.2f}s", file=sys.stderr)
+        return len(models)
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+
+@lru_cache(maxsize=1)
+def get_schema_registry() -> SchemaRegistry:
+    """
+    Get the process-wide schema registry.
+
+    Uses lru_cache to ensure a single instance per process.
+    """
+    return SchemaRegistry()
+
+
+def warm_in_background(gemini: bool = False) -> Optional[threading.Thread]:
+    """
+    Warm the process-wide registry on a daemon thread, once per process.
+    Workers call this as they start a job, so its extractions don't pay for
+    compiling - or for importing the SDKs - and the job isn't delayed either.
+
+    Args:
+        gemini: Also build the Gemini configs (first call decides)
+
+    Returns:
+        The warm-up thread, or None when SCHEMA_PRECOMPILE is off
+    """
+    global _warm_thread
+    if not SCHEMA_PRECOMPILE:
+        return None
+
+    def warm():
+        try:
+            get_schema_registry().warm(gemini=gemini)
+        except Exception as e:
+            # Models are compiled on first use instead
+            print(f"[Schemas] Warm-up failed: {e}", file=sys.stderr)
+
+    with _warm_lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=warm, name="schema-warmup", daemon=True)
+            _warm_thread.start()
+    return _warm_thread
@@ -0,0 +1,60 @@
+"""
+Request Coalescing
+
+Single-flight deduplication for identical research requests: concurrent
+callers with the same key attach to one running computation and share
+its result instead of each running the full 13-step pipeline.
+
+In-process coalescing uses AsyncSingleFlight. Across API processes and
+workers, POST /jobs coalesces through the partial unique index on
+code_research_jobs.dedupe_key (see JobDB.create_or_attach_job).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .address import normalize_address
+
+
+def research_dedupe_key(address: str, llm_provider: str) -> str:
+    """
+    Key identifying identical research requests: same provider and same
+    normalized address.
+    """
+    return f"{llm_provider.lower()}:{normalize_address(address)}"
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent async calls by key.
+
+    The first caller for a key starts the computation; callers arriving while
+    it is in flight await the same task. The key is released as soon as the
+    computation finishes, so later calls start fresh.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once for all concurrent callers with the same key.
+
+        Args:
+            key: Deduplication key
+            fn: Zero-argument coroutine function producing the shared result
+
+        Returns:
+            The result of the (shared) computation. Exceptions propagate to
+            every attached caller.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield() so one caller disconnecting doesn't cancel the others' result
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """Number of distinct computations currently running."""
+        return len(self._in_flight)
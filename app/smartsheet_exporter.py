@@ -1,4 +1,3 @@
-import smartsheet
 import logging
 from typing import Optional
 from .models import CodeCheckForm
@@ -21,6 +20,9 @@ def export_to_smartsheet(
     Returns:
         dict with sheet_url and sheet_id
     """
+    # The SDK is only needed by this endpoint; import it on first export
+    import smartsheet
+
     smart = smartsheet.Smartsheet(access_token)
     smart.errors_as_exceptions(True)
 
@@ -182,6 +184,8 @@ def _get_or_create_folder(smart, folder_name: str, parent_id: int, parent_type:
     If not found, creates it.
     Returns the Folder ID.
     """
+    import smartsheet
+
     found_id = None
 
     if parent_type == 'workspace':
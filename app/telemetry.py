@@ -0,0 +1,421 @@
+"""
+Upstream Call Telemetry
+
+Latency, tokens, payload sizes, retries and estimated cost of every
+Perplexity / OpenAI / Gemini call, attributed to the research section that
+made it.
+
+- Process-wide histograms per provider and operation (get_upstream_stats)
+- JobTelemetry: per-section totals for one job, stored by the worker in
+  the job's metadata JSONB column under "telemetry" (merge_job_telemetry
+  adds up a resumed job's attempts)
+- aggregate_job_telemetry: histograms across many jobs' stored telemetry
+  (GET /jobs/telemetry)
+
+Costs use per-million-token prices from <PROVIDER>_PROMPT_PRICE and
+<PROVIDER>_COMPLETION_PRICE (USD).
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000, 300000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+# USD per million tokens (prompt, completion); override per provider
+DEFAULT_PRICES = {
+    "perplexity": (3.0, 15.0),
+    "openai": (2.5, 10.0),
+    "gemini": (1.25, 5.0),
+}
+
+# Section (form field name) the current thread/task is researching
+_current_section: ContextVar[Optional[str]] = ContextVar("current_section", default=None)
+
+
+def current_section() -> Optional[str]:
+    return _current_section.get()
+
+
+@contextmanager
+def section_scope(name: str):
+    """Attribute upstream calls made inside the block to a section."""
+    token = _current_section.set(name)
+    try:
+        yield
+    finally:
+        _current_section.reset(token)
+
+
+def _price(provider: str) -> tuple:
+    prompt, completion = DEFAULT_PRICES.get(provider, (0.0, 0.0))
+    prefix = provider.upper()
+    return (
+        float(os.getenv(f"{prefix}_PROMPT_PRICE", prompt)),
+        float(os.getenv(f"{prefix}_COMPLETION_PRICE", completion)),
+    )
+
+
+def estimate_cost(provider: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of a call."""
+    prompt_price, completion_price = _price(provider)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def _as_int(value: Any) -> int:
+    # SDK usage fields may be missing or None
+    return int(value) if isinstance(value, (int, float)) else 0
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus-style upper bounds). Thread-safe."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def state(self) -> Dict[str, Any]:
+        """Raw per-bucket counts (last one is +Inf), for merging across processes."""
+        with self._lock:
+            return {"buckets": list(self.buckets), "counts": list(self._counts), "sum": self._sum, "count": self._count}
+
+    def merge(self, state: Dict[str, Any]) -> None:
+        """Add another histogram's state() (same buckets) into this one."""
+        if tuple(state["buckets"]) != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        with self._lock:
+            self._counts = [a + b for a, b in zip(self._counts, state["counts"])]
+            self._sum += state["sum"]
+            self._count += state["count"]
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None when empty)."""
+        with self._lock:
+            if not self._count:
+                return None
+            rank = q * self._count
+            seen = 0
+            for bound, count in zip(self.buckets, self._counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+            return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count, sum, cumulative bucket counts and p50/p95/p99 estimates."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = [], 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            cumulative.append(["+Inf" if bound == float("inf") else bound, running])
+        return {
+            "count": count,
+            "sum": round(total, 3),
+            "buckets": cumulative,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class UpstreamCall:
+    """One logical upstream call (all its retry attempts)."""
+
+    def __init__(self, provider: str, operation: str, request_chars: int = 0):
+        self.provider = provider
+        self.operation = operation
+        self.section = current_section()
+        self.request_chars = request_chars
+        self.response_chars = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.attempts = 0
+        self.latency_ms = 0.0
+        self.error: Optional[str] = None
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    @property
+    def cost_usd(self) -> float:
+        return estimate_cost(self.provider, self.prompt_tokens, self.completion_tokens)
+
+    def attempt(self) -> None:
+        self.attempts += 1
+
+    def record_response(self, text: Any = None, prompt_tokens: Any = None, completion_tokens: Any = None) -> None:
+        """Response payload (text) and token usage reported by the provider."""
+        self.response_chars = len(text) if isinstance(text, str) else 0
+        self.prompt_tokens = _as_int(prompt_tokens)
+        self.completion_tokens = _as_int(completion_tokens)
+
+
+class _ProviderStats:
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.completion_tokens = Histogram(TOKEN_BUCKETS)
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.cost_usd = 0.0
+
+    def add(self, call: UpstreamCall) -> None:
+        self.latency_ms.observe(call.latency_ms)
+        if call.error is None:
+            self.prompt_tokens.observe(call.prompt_tokens)
+            self.completion_tokens.observe(call.completion_tokens)
+        # Counters are updated under _stats_lock
+        self.calls += 1
+        self.retries += call.retries
+        self.errors += call.error is not None
+        self.cost_usd += call.cost_usd
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "errors": self.errors,
+            "cost_usd": round(self.cost_usd, 6),
+            "latency_ms": self.latency_ms.snapshot(),
+            "prompt_tokens": self.prompt_tokens.snapshot(),
+            "completion_tokens": self.completion_tokens.snapshot(),
+        }
+
+
+_provider_stats: Dict[str, _ProviderStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _record_process(call: UpstreamCall) -> None:
+    key = f"{call.provider}.{call.operation}"
+    with _stats_lock:
+        stats = _provider_stats.get(key)
+        if stats is None:
+            stats = _provider_stats[key] = _ProviderStats()
+        stats.add(call)
+
+
+def get_upstream_histograms() -> Dict[str, Dict[str, Any]]:
+    """Raw latency/token histograms and counters per provider.operation (for /metrics)."""
+    with _stats_lock:
+        return {
+            key: {
+                "calls": stats.calls,
+                "retries": stats.retries,
+                "errors": stats.errors,
+                "cost_usd": stats.cost_usd,
+                "latency_ms": stats.latency_ms.state(),
+                "prompt_tokens": stats.prompt_tokens.state(),
+                "completion_tokens": stats.completion_tokens.state(),
+            }
+            for key, stats in _provider_stats.items()
+        }
+
+
+def reset_upstream_stats() -> None:
+    """Forget process-wide stats (e.g. in a forked worker process)."""
+    with _stats_lock:
+        _provider_stats.clear()
+
+
+def get_upstream_stats() -> Dict[str, Dict[str, Any]]:
+    """Histograms and counters for every provider.operation seen by this process."""
+    with _stats_lock:
+        return {key: stats.snapshot() for key, stats in _provider_stats.items()}
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {
+        "calls": 0, "retries": 0, "errors": 0,
+        "upstream_ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+        "request_chars": 0, "response_chars": 0, "cost_usd": 0.0,
+    }
+
+
+def _add_call(totals: Dict[str, Any], call: UpstreamCall) -> None:
+    totals["calls"] += 1
+    totals["retries"] += call.retries
+    totals["errors"] += call.error is not None
+    totals["upstream_ms"] += call.latency_ms
+    totals["prompt_tokens"] += call.prompt_tokens
+    totals["completion_tokens"] += call.completion_tokens
+    totals["request_chars"] += call.request_chars
+    totals["response_chars"] += call.response_chars
+    totals["cost_usd"] += call.cost_usd
+
+
+class JobTelemetry:
+    """
+    Per-section totals for one job's upstream calls. Thread-safe.
+
+    Example:
+        with telemetry.section("wall_signs"):
+            agent.research_section(...)
+        metadata["telemetry"] = telemetry.summary()
+    """
+
+    def __init__(self):
+        self._started = time.monotonic()
+        self._sections: Dict[str, Dict[str, Any]] = {}
+        self._providers: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _section_totals(self, name: str) -> Dict[str, Any]:
+        totals = self._sections.get(name)
+        if totals is None:
+            totals = self._sections[name] = dict(_empty_totals(), wall_ms=0.0)
+        return totals
+
+    def add(self, call: UpstreamCall) -> None:
+        with self._lock:
+            _add_call(self._section_totals(call.section or "other"), call)
+            key = f"{call.provider}.{call.operation}"
+            _add_call(self._providers.setdefault(key, _empty_totals()), call)
+
+    @contextmanager
+    def section(self, name: str):
+        """Attribute calls in the block to a section and record its wall time."""
+        start = time.monotonic()
+        with section_scope(name):
+            try:
+                yield
+            finally:
+                elapsed = (time.monotonic() - start) * 1000
+                with self._lock:
+                    self._section_totals(name)["wall_ms"] += elapsed
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-ready totals for the job, per section and per provider."""
+        with self._lock:
+            sections = {name: _rounded(totals) for name, totals in self._sections.items()}
+            providers = {key: _rounded(totals) for key, totals in self._providers.items()}
+        job = _empty_totals()
+        for totals in providers.values():
+            for field in job:
+                job[field] += totals[field]
+        return dict(
+            _rounded(job),
+            wall_ms=round((time.monotonic() - self._started) * 1000, 1),
+            sections=sections,
+            providers=providers
+        )
+
+
+def _rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        field: round(value, 6 if field == "cost_usd" else 1) if isinstance(value, float) else value
+        for field, value in totals.items()
+    }
+
+
+def merge_job_telemetry(*summaries: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Add up JobTelemetry summaries (a job's attempts, or the agents that
+    worked on it) into one: every total, per section and per provider.
+    """
+    merged: Dict[str, Any] = {}
+
+    def add(into: Dict[str, Any], summary: Dict[str, Any]) -> None:
+        for field, value in summary.items():
+            if isinstance(value, dict):
+                add(into.setdefault(field, {}), value)
+            elif isinstance(value, (int, float)):
+                into[field] = into.get(field, 0) + value
+
+    def rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+        return _rounded({field: rounded(value) if isinstance(value, dict) else value for field, value in totals.items()})
+
+    for summary in summaries:
+        if summary:
+            add(merged, summary)
+    return rounded(merged)
+
+
+@contextmanager
+def upstream_call(provider: str, operation: str, telemetry: Optional[JobTelemetry] = None, request_chars: int = 0):
+    """
+    Time an upstream call and record it process-wide and, when given, on
+    the job's telemetry.
+
+    Yields:
+        UpstreamCall; call attempt() per try and record_response() on success
+    """
+    call = UpstreamCall(provider, operation, request_chars)
+    start = time.monotonic()
+    try:
+        yield call
+    except BaseException as e:
+        # Includes CancelledError (e.g. the losing request of a hedge): a
+        # call that never answered isn't a success
+        call.error = type(e).__name__
+        raise
+    finally:
+        call.latency_ms = (time.monotonic() - start) * 1000
+        _record_process(call)
+        if telemetry is not None:
+            telemetry.add(call)
+
+
+def aggregate_job_telemetry(summaries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Histograms across jobs from stored JobTelemetry summaries.
+
+    Returns:
+        Dict with 'jobs', job-level histograms and, per section, histograms
+        of wall time, upstream time and tokens plus retry/error totals
+    """
+    job_wall = Histogram(LATENCY_BUCKETS_MS)
+    job_cost: List[float] = []
+    sections: Dict[str, Dict[str, Any]] = {}
+    jobs = 0
+
+    for summary in summaries:
+        if not summary:
+            continue
+        jobs += 1
+        job_wall.observe(summary.get("wall_ms", 0))
+        job_cost.append(summary.get("cost_usd", 0.0))
+        for name, totals in (summary.get("sections") or {}).items():
+            section = sections.get(name)
+            if section is None:
+                section = sections[name] = {
+                    "wall_ms": Histogram(LATENCY_BUCKETS_MS),
+                    "upstream_ms": Histogram(LATENCY_BUCKETS_MS),
+                    "prompt_tokens": Histogram(TOKEN_BUCKETS),
+                    "completion_tokens": Histogram(TOKEN_BUCKETS),
+                    "calls": 0, "retries": 0, "errors": 0, "cost_usd": 0.0,
+                }
+            for field in ("wall_ms", "upstream_ms", "prompt_tokens", "completion_tokens"):
+                section[field].observe(totals.get(field, 0))
+            for field in ("calls", "retries", "errors", "cost_usd"):
+                section[field] += totals.get(field, 0)
+
+    return {
+        "jobs": jobs,
+        "wall_ms": job_wall.snapshot(),
+        "cost_usd": round(sum(job_cost), 6),
+        "sections": {
+            name: {
+                field: value.snapshot() if isinstance(value, Histogram) else round(value, 6)
+                for field, value in section.items()
+            }
+            for name, section in sections.items()
+        },
+    }
@@ -5,31 +5,140 @@ Extracted from Modal worker for testability.
 This module contains pure functions that can be tested without Modal.
 """
 import os
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 import sys
+import threading
+import time
 
-def process_research_job(job_id: str, address: str, llm_provider: str = "openai") -> Dict[str, Any]:
+# Sections saved per job, in CodeCheckForm order
+SECTION_NAMES = [
+    "location_information",
+    "wall_signs",
+    "projecting_signs",
+    "freestanding_signs",
+    "directionals_regulatory",
+    "informational_signs",
+    "awnings",
+    "undercanopy_signs",
+    "window_signs",
+    "temporary_signs",
+    "approval_process",
+    "permit_requirements",
+    "variance_procedures"
+]
+
+def _job_metadata(*agents, previous: Optional[Dict[str, Any]] = None, wall_ms: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Job fields recording which LLM provider served each section and the
+    upstream telemetry (latency, tokens, retries per section) of the agents
+    that worked on the job.
+    
+    Merged into the job's previous metadata, so a resumed job keeps its
+    earlier attempts' providers and telemetry.
+    
+    Args:
+        agents: Agents whose work the job used (None entries are skipped)
+        previous: The job's stored metadata
+        wall_ms: The job's wall time, when it isn't the agents' own (batches)
+    """
+    from app.telemetry import JobTelemetry, merge_job_telemetry
+    
+    providers = {}
+    summaries = []
+    for agent in agents:
+        section_providers = getattr(agent, "section_providers", None)
+        if isinstance(section_providers, dict):
+            providers.update(section_providers)
+        telemetry = getattr(agent, "telemetry", None)
+        if isinstance(telemetry, JobTelemetry):
+            summaries.append(telemetry.summary())
+    if summaries and wall_ms is not None:
+        summaries = [dict(summary, wall_ms=0) for summary in summaries]
+        summaries[0]["wall_ms"] = wall_ms
+    
+    metadata = dict(previous or {})
+    if providers:
+        metadata["section_providers"] = {**metadata.get("section_providers", {}), **providers}
+    if summaries:
+        metadata["telemetry"] = merge_job_telemetry(metadata.get("telemetry"), *summaries)
+    return {"metadata": metadata} if metadata else {}
+
+def _record_job(status: str, started: float) -> None:
+    """Count a finished job and its wall time for /metrics."""
+    from app.metrics import get_metrics_registry
+    
+    registry = get_metrics_registry()
+    registry.inc("worker_jobs_total", {"status": status})
+    registry.observe("worker_job_duration_seconds", time.monotonic() - started)
+
+def process_research_job(
+    job_id: str,
+    address: str,
+    llm_provider: str = "openai",
+    resume: bool = False,
+    claimed: bool = False
+) -> Dict[str, Any]:
     """
     Process a research job: execute agent and save results to database.
     
     This is the core worker logic that runs in Modal.
     Separated for unit testing without Modal dependency.
     
+    Unless the caller already holds the job (the local executor claims from
+    the queue), the job is claimed by id with a lease first and the lease is
+    heartbeated while it runs, so it is never processed twice and a worker
+    that dies leaves an expired lease instead of a job stuck in 'processing'.
+    
     Args:
         job_id: UUID of the job to process
         address: US address to research
         llm_provider: LLM provider ('openai' or 'gemini')
+        resume: Continue a failed/timed-out job: keep the sections already
+            stored for it, reuse its stored location_information and research
+            only the missing sections
+        claimed: The caller already leased the job and heartbeats it
     
     Returns:
-        Dict with 'status', 'sections_completed', and optional 'error'
+        Dict with 'status' ('completed', 'failed' or 'skipped' when another
+        worker holds the job), 'sections_completed', and optional 'error'
     
     Raises:
         Exception: If critical error occurs (caught by Modal wrapper)
     """
-    from app.db import JobDB
+    if claimed:
+        return _run_research_job(job_id, address, llm_provider, resume)
+    
+    from app.job_queue import JobQueue
+    
+    queue = JobQueue()
+    jobs = queue.claim_jobs([job_id])
+    if not jobs:
+        print(f"[Worker] Job {job_id} is not pending (claimed elsewhere or finished); skipping", file=sys.stderr)
+        return {"status": "skipped", "job_id": job_id}
+    # Claimed before: an earlier worker was interrupted, continue from its sections
+    resume = resume or (jobs[0].get("attempts") or 0) > 1
+    
+    with queue.hold_leases(lambda: [job_id]):
+        return _run_research_job(job_id, address, llm_provider, resume)
+
+def _run_research_job(job_id: str, address: str, llm_provider: str, resume: bool) -> Dict[str, Any]:
+    """Research a job this worker holds and save its sections (see process_research_job)."""
+    from app.db import JobDB, SectionResultWriter
     from app.agent import CodeCheckAgent
+    from app.clients import get_client_registry
+    from app.models import LocationInformation
+    from app.schema_registry import warm_in_background
+    
+    from app.metrics import push_worker_metrics
+    
+    # Response formats compile while the first sections are researched
+    warm_in_background(gemini=llm_provider == "gemini")
     
+    writer = None
+    agent = None
+    previous_metadata = None
+    started = time.monotonic()
     try:
         print(f"[Worker] Starting job {job_id} for address: {address}", file=sys.stderr)
         
@@ -41,61 +150,60 @@ def process_research_job(job_id: str, address: str, llm_provider: str = "openai"
         )
         print(f"[Worker] Job {job_id} status updated to processing", file=sys.stderr)
         
-        # Initialize agent
-        agent = CodeCheckAgent(llm_provider=llm_provider)
+        # Initialize agent; SDK clients are shared with the container's other jobs
+        agent = CodeCheckAgent(llm_provider=llm_provider, clients=get_client_registry())
         print(f"[Worker] Agent initialized with provider: {llm_provider}", file=sys.stderr)
         
+        # Checkpoint: pick up the sections a previous attempt already stored
+        saved_sections = []
+        location_info = None
+        remaining_sections = None
+        if resume:
+            # Earlier attempts' providers and telemetry are kept in the job's metadata
+            previous_metadata = (JobDB.get_job(job_id) or {}).get("metadata")
+            for stored in JobDB.get_job_results(job_id):
+                saved_sections.append(stored["section_name"])
+                if stored["section_name"] == "location_information":
+                    location_info = LocationInformation.model_validate(stored["section_data"])
+            remaining_sections = [name for name in SECTION_NAMES[1:] if name not in saved_sections]
+            print(f"[Worker] Resuming job {job_id}: {len(saved_sections)}/13 sections already saved", file=sys.stderr)
+        
+        # Persist sections while the agent runs, batched so a job costs a few
+        # inserts/updates instead of two round trips per section
+        writer = SectionResultWriter(job_id, total_sections=len(SECTION_NAMES), saved=saved_sections)
+        
+        def save_section(section_name, section_data):
+            if not section_data:
+                return
+            # Convert Pydantic model to dict
+            section_dict = section_data.model_dump() if hasattr(section_data, 'model_dump') else section_data
+            if writer.add(section_name, section_dict):
+                print(f"[Worker] Queued section: {section_name}", file=sys.stderr)
+        
         # Execute research (this takes 2-3 minutes)
-        result = agent.run(address)
+        result = agent.run(
+            address,
+            on_section=save_section,
+            location_info=location_info,
+            field_names=remaining_sections
+        )
         print(f"[Worker] Research completed for job {job_id}", file=sys.stderr)
         
-        # Save all section results to database
-        sections_saved = 0
-        section_names = [
-            "location_information",
-            "wall_signs",
-            "projecting_signs",
-            "freestanding_signs",
-            "directionals_regulatory",
-            "informational_signs",
-            "awnings",
-            "undercanopy_signs",
-            "window_signs",
-            "temporary_signs",
-            "approval_process",
-            "permit_requirements",
-            "variance_procedures"
-        ]
-        
-        for section_name in section_names:
+        # Save any sections the agent returned without reporting them
+        for section_name in SECTION_NAMES:
             if hasattr(result, section_name):
-                section_data = getattr(result, section_name)
-                if section_data:
-                    # Convert Pydantic model to dict
-                    section_dict = section_data.model_dump() if hasattr(section_data, 'model_dump') else section_data
-                    
-                    JobDB.save_section_result(
-                        job_id=job_id,
-                        section_name=section_name,
-                        section_data=section_dict
-                    )
-                    sections_saved += 1
-                    
-                    # Update progress
-                    JobDB.update_job(
-                        job_id,
-                        progress=f"{sections_saved}/13 sections"
-                    )
-                    print(f"[Worker] Saved section: {section_name} ({sections_saved}/13)", file=sys.stderr)
+                save_section(section_name, getattr(result, section_name))
         
-        # Mark job as completed
-        JobDB.update_job(
-            job_id,
+        # Write the last batch and mark job as completed in one update
+        writer.flush(
             status="completed",
             completed_at=datetime.utcnow().isoformat(),
-            progress=f"{sections_saved}/13 sections"
+            **_job_metadata(agent, previous=previous_metadata)
         )
+        sections_saved = writer.saved_count
         print(f"[Worker] Job {job_id} completed successfully. Saved {sections_saved} sections.", file=sys.stderr)
+        _record_job("completed", started)
+        push_worker_metrics()
         
         return {
             "status": "completed",
@@ -107,19 +215,143 @@ def process_research_job(job_id: str, address: str, llm_provider: str = "openai"
         error_msg = f"Job processing failed: {str(e)}"
         print(f"[Worker] ERROR in job {job_id}: {error_msg}", file=sys.stderr)
         
-        # Mark job as failed
+        # Mark job as failed, keeping any sections still buffered
+        failed_updates = dict(
+            status="failed",
+            error_message=error_msg,
+            completed_at=datetime.utcnow().isoformat(),
+            **_job_metadata(agent, previous=previous_metadata)
+        )
         try:
-            JobDB.update_job(
-                job_id,
-                status="failed",
-                error_message=error_msg,
-                completed_at=datetime.utcnow().isoformat()
-            )
+            if writer is not None:
+                try:
+                    writer.flush(**failed_updates)
+                    failed_updates = None
+                except Exception as flush_error:
+                    writer.close()
+                    print(f"[Worker] Failed to save buffered sections: {flush_error}", file=sys.stderr)
+            if failed_updates:
+                JobDB.update_job(job_id, **failed_updates)
         except Exception as db_error:
             print(f"[Worker] Failed to update job status: {db_error}", file=sys.stderr)
+        _record_job("failed", started)
+        push_worker_metrics()
         
         return {
             "status": "failed",
             "error": error_msg,
             "job_id": job_id
         }
+
+
+def process_research_batch(
+    job_ids: List[str],
+    llm_provider: str = "openai"
+) -> Dict[str, Any]:
+    """
+    Process a batch's jobs with the jurisdiction-aware scheduler.
+    
+    Claims the jobs that are still pending (others were picked up by
+    regular workers), groups them by jurisdiction and researches each
+    group's sections once, saving every section to every job in the group.
+    Leases are heartbeated until each job finishes.
+    
+    Args:
+        job_ids: UUIDs of the batch's jobs
+        llm_provider: LLM provider ('openai' or 'gemini')
+    
+    Returns:
+        Dict with 'status', 'jobs', 'groups', 'completed' and 'failed'
+    """
+    from app.db import JobDB, SectionResultWriter
+    from app.agent import CodeCheckAgent
+    from app.batch_scheduler import BatchScheduler
+    from app.clients import get_client_registry
+    from app.job_queue import JobQueue
+    from app.retry import JOB_RETRY_BUDGET, RetryBudget
+    from app.schema_registry import warm_in_background
+    from app.metrics import push_worker_metrics
+    
+    started = time.monotonic()
+    warm_in_background(gemini=llm_provider == "gemini")
+    
+    queue = JobQueue()
+    jobs = queue.claim_jobs(job_ids)
+    print(f"[Worker] Batch: claimed {len(jobs)}/{len(job_ids)} jobs", file=sys.stderr)
+    if not jobs:
+        return {"status": "completed", "jobs": 0, "groups": 0, "completed": 0, "failed": 0}
+    
+    # No flush timer: thousands of writers would mean thousands of timer
+    # threads; each job flushes on batch size and when it finishes
+    writers = {
+        job["id"]: SectionResultWriter(job["id"], total_sections=len(SECTION_NAMES), flush_interval=0)
+        for job in jobs
+    }
+    # Jobs not finished yet; batch threads discard from it while the
+    # heartbeat thread reads it, so both go through active_lock
+    active = set(writers)
+    active_lock = threading.Lock()
+    
+    def active_jobs():
+        with active_lock:
+            return list(active)
+    
+    def finish(job, **updates):
+        metadata = _job_metadata(
+            *job_agents[job["id"]],
+            previous=job.get("metadata"),
+            wall_ms=round((time.monotonic() - started) * 1000, 1)
+        )
+        try:
+            writers[job["id"]].flush(completed_at=datetime.utcnow().isoformat(), **updates, **metadata)
+        except Exception as db_error:
+            print(f"[Worker] Failed to finish job {job['id']}: {db_error}", file=sys.stderr)
+        with active_lock:
+            active.discard(job["id"])
+        _record_job(updates["status"], started)
+    
+    def on_error(job, error):
+        finish(job, status="failed", error_message=f"Job processing failed: {str(error)}")
+    
+    # One retry budget covers every job. Each jurisdiction lookup and each
+    # group's research gets its own agent (sharing the budget and SDK
+    # clients), so a job's metadata holds the telemetry of the work it used
+    retry_budget = RetryBudget(JOB_RETRY_BUDGET * len(jobs))
+    job_agents = {job["id"]: [] for job in jobs}
+    
+    def agent_for(for_jobs):
+        agent = CodeCheckAgent(llm_provider=llm_provider, retry_budget=retry_budget, clients=get_client_registry())
+        for job in for_jobs:
+            job_agents[job["id"]].append(agent)
+        return agent
+    
+    scheduler = BatchScheduler(agent_for([]), agent_for=agent_for)
+    
+    with queue.hold_leases(active_jobs):
+        try:
+            stats = scheduler.run(
+                jobs,
+                on_location=lambda job, loc: writers[job["id"]].add("location_information", loc.model_dump()),
+                on_section=lambda job, name, data: writers[job["id"]].add(name, data.model_dump()),
+                on_done=lambda job: finish(job, status="completed"),
+                on_error=on_error
+            )
+        except Exception as e:
+            print(f"[Worker] Batch scheduler failed: {e}", file=sys.stderr)
+            unfinished = set(active_jobs())
+            for job in jobs:
+                if job["id"] in unfinished:
+                    on_error(job, e)
+            return {"status": "failed", "jobs": len(jobs), "error": str(e)}
+        finally:
+            push_worker_metrics()
+    
+    print(f"[Worker] Batch finished: {stats['jobs']} jobs, {stats['groups']} jurisdiction groups, "
+          f"{stats['failed']} failed", file=sys.stderr)
+    return {
+        "status": "completed",
+        "jobs": stats["jobs"],
+        "groups": stats["groups"],
+        "completed": stats["jobs"] - stats["failed"],
+        "failed": stats["failed"]
+    }
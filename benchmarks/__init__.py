@@ -0,0 +1,9 @@
+"""
+Offline Benchmarks
+
+In-process stand-ins for Perplexity, OpenAI, Supabase and Smartsheet
+(benchmarks.fakes) and the scenarios that drive CodeCheckAgent, the worker
+and the job API against them (benchmarks.run), plus cold start
+(benchmarks.startup) and schema compilation (benchmarks.schemas)
+measurements.
+"""
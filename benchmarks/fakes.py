@@ -0,0 +1,825 @@
+"""
+Local Stand-ins for Upstream Services
+
+In-process fakes for every external dependency of a research job, plugged
+in below the application code so the real clients, retries, rate limits,
+telemetry and JobDB queries all run:
+
+- Perplexity: a requests transport adapter and an httpx MockTransport
+  answering POST /chat/completions
+- OpenAI: a client exposing chat.completions.create (sync and async)
+- Supabase: an in-memory table store with the PostgREST query builder
+  subset JobDB uses, plus the job queue / metrics RPCs
+- Smartsheet: a module object replacing the SDK
+
+Each fake draws a latency from a LatencyModel (lognormal from a median and
+p95) and fails a configurable fraction of calls with a retryable error
+(503 / 429). offline_upstreams() wires them all in for the duration of a
+block.
+"""
+import asyncio
+import copy
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import types
+import uuid
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+# z-score of the 95th percentile of a standard normal distribution
+_Z95 = 1.6449
+
+
+class LatencyModel:
+    """
+    Per-call latency and failure rate of a fake upstream. Thread-safe.
+
+    Latencies are lognormal with the given median and 95th percentile
+    (p95_ms defaults to the median, i.e. a constant latency).
+    """
+
+    def __init__(
+        self,
+        median_ms: float = 0.0,
+        p95_ms: Optional[float] = None,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        if median_ms < 0:
+            raise ValueError("median_ms must be non-negative")
+        if p95_ms is not None and p95_ms < median_ms:
+            raise ValueError("p95_ms must be at least median_ms")
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.median_ms = median_ms
+        self.p95_ms = p95_ms if p95_ms is not None else median_ms
+        self.error_rate = error_rate
+        self._sigma = math.log(self.p95_ms / median_ms) / _Z95 if median_ms > 0 else 0.0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        """
+        Build from a "median_ms[:p95_ms[:error_rate]]" string,
+        e.g. "900:2500:0.02".
+        """
+        parts = [float(part) for part in spec.split(":")]
+        if not 1 <= len(parts) <= 3:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+        median = parts[0]
+        p95 = parts[1] if len(parts) > 1 else None
+        error_rate = parts[2] if len(parts) > 2 else 0.0
+        return cls(median, p95, error_rate, seed)
+
+    def sample(self) -> float:
+        """One latency, in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        with self._lock:
+            z = self._random.gauss(0.0, 1.0)
+        return self.median_ms * math.exp(self._sigma * z) / 1000
+
+    def fails(self) -> bool:
+        """Whether the next call should fail."""
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class FakeService:
+    """Latency, failure injection and call counting shared by the fakes."""
+
+    name = "fake"
+
+    def __init__(self, latency: Optional[LatencyModel] = None, time_scale: float = 1.0):
+        """
+        Args:
+            latency: Latency distribution and error rate (default: instant, no errors)
+            time_scale: Multiplier applied to every sampled latency, e.g. 0.01
+                to replay a production-shaped distribution 100x faster
+        """
+        self.latency = latency or LatencyModel()
+        self.time_scale = time_scale
+        self._calls = 0
+        self._errors = 0
+        self._lock = threading.Lock()
+
+    def _begin(self) -> tuple:
+        """Count a call; returns (seconds to wait, whether to fail)."""
+        fail = self.latency.fails()
+        with self._lock:
+            self._calls += 1
+            if fail:
+                self._errors += 1
+        return self.latency.sample() * self.time_scale, fail
+
+    def wait(self) -> bool:
+        """Block for one call's latency; returns True if the call should fail."""
+        delay, fail = self._begin()
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    async def await_(self) -> bool:
+        delay, fail = self._begin()
+        if delay:
+            await asyncio.sleep(delay)
+        return fail
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self._calls, "errors": self._errors}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls = 0
+            self._errors = 0
+
+
+# ============================================================
+# Perplexity
+# ============================================================
+
+_WORDS = ("sign", "permit", "zoning", "district", "setback", "illuminated", "square", "feet",
+          "frontage", "variance", "ordinance", "maximum", "height", "approval", "review")
+
+
+class FakePerplexity(FakeService):
+    """
+    Perplexity chat completions: a few paragraphs of text with numbered
+    citations. Failures alternate between 503 and 429 (with Retry-After: 0).
+    """
+
+    name = "perplexity"
+
+    def __init__(self, latency: Optional[LatencyModel] = None, time_scale: float = 1.0, response_chars: int = 3000):
+        super().__init__(latency, time_scale)
+        self.response_chars = response_chars
+        self._failures = itertools.count()
+
+    def _content(self, query: str) -> str:
+        rng = random.Random(query)
+        words = []
+        length = 0
+        while length < self.response_chars:
+            word = rng.choice(_WORDS)
+            if rng.random() < 0.05:
+                word += f" [{rng.randint(1, 3)}]"
+            words.append(word)
+            length += len(word) + 1
+        return " ".join(words)[:self.response_chars]
+
+    def respond(self, payload: Dict[str, Any], fail: bool) -> tuple:
+        """(status code, headers, JSON body) for a request payload."""
+        if fail:
+            if next(self._failures) % 2:
+                return 429, {"Retry-After": "0"}, {"error": {"message": "rate limited (fake)"}}
+            return 503, {}, {"error": {"message": "service unavailable (fake)"}}
+        query = payload["messages"][-1]["content"]
+        content = self._content(query)
+        prompt_tokens = sum(len(message["content"]) for message in payload["messages"]) // 4
+        completion_tokens = len(content) // 4
+        return 200, {}, {
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "citations": [f"https://codes.example.com/{uuid.uuid5(uuid.NAMESPACE_URL, query).hex[:8]}/{i}" for i in range(1, 4)],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def session(self) -> requests.Session:
+        """A requests.Session whose every request is answered by this fake."""
+        session = requests.Session()
+        adapter = _PerplexityAdapter(self)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def async_client(self) -> httpx.AsyncClient:
+        """An httpx.AsyncClient whose every request is answered by this fake."""
+        async def handle(request: httpx.Request) -> httpx.Response:
+            fail = await self.await_()
+            status, headers, body = self.respond(json.loads(request.content), fail)
+            return httpx.Response(status, headers=headers, json=body, request=request)
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+
+class _PerplexityAdapter(BaseAdapter):
+    def __init__(self, service: FakePerplexity):
+        super().__init__()
+        self.service = service
+
+    def send(self, request, **kwargs):
+        fail = self.service.wait()
+        status, headers, body = self.service.respond(json.loads(request.body), fail)
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json", **headers})
+        response._content = json.dumps(body).encode()
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+# ============================================================
+# OpenAI
+# ============================================================
+
+class FakeAPIError(Exception):
+    """Shaped like an openai.APIStatusError (status_code, response.headers)."""
+
+    def __init__(self, status_code: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"Error code: {status_code} (fake)")
+        self.status_code = status_code
+        self.response = types.SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class FakeOpenAI(FakeService):
+    """
+    OpenAI structured outputs: chat.completions.create() answers with a
+    JSON object shaped like the requested json_schema (every leaf null) and
+    token usage sized from the prompt. Failures alternate between 503 and 429.
+    """
+
+    name = "openai"
+
+    def __init__(self, latency: Optional[LatencyModel] = None, time_scale: float = 1.0):
+        super().__init__(latency, time_scale)
+        self._failures = itertools.count()
+
+    def _error(self) -> FakeAPIError:
+        if next(self._failures) % 2:
+            return FakeAPIError(429, {"retry-after": "0"})
+        return FakeAPIError(503)
+
+    @classmethod
+    def _skeleton(cls, schema: Dict[str, Any], defs: Dict[str, Any]) -> Any:
+        if "$ref" in schema:
+            return cls._skeleton(defs[schema["$ref"].split("/")[-1]], defs)
+        if "properties" in schema:
+            return {name: cls._skeleton(value, defs) for name, value in schema["properties"].items()}
+        return None
+
+    @classmethod
+    def _completion(cls, messages: List[Dict[str, str]], response_format: Dict[str, Any]) -> Any:
+        schema = response_format["json_schema"]["schema"]
+        content = json.dumps(cls._skeleton(schema, schema.get("$defs", {})))
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        completion_tokens = len(content) // 4
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content, refusal=None))],
+            usage=types.SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+
+    def create(self, model: str, messages: List[Dict[str, str]], response_format: Dict[str, Any], **kwargs):
+        if self.wait():
+            raise self._error()
+        return self._completion(messages, response_format)
+
+    async def acreate(self, model: str, messages: List[Dict[str, str]], response_format: Dict[str, Any], **kwargs):
+        if await self.await_():
+            raise self._error()
+        return self._completion(messages, response_format)
+
+    def client(self, **kwargs) -> Any:
+        """Stand-in for openai.OpenAI(...)."""
+        return types.SimpleNamespace(chat=types.SimpleNamespace(
+            completions=types.SimpleNamespace(create=self.create)
+        ))
+
+    def async_client(self, **kwargs) -> Any:
+        """Stand-in for openai.AsyncOpenAI(...)."""
+        return types.SimpleNamespace(chat=types.SimpleNamespace(
+            completions=types.SimpleNamespace(create=self.acreate)
+        ))
+
+
+# ============================================================
+# Supabase
+# ============================================================
+
+# Columns filled in on insert, like the migrations' DEFAULTs
+_TABLE_DEFAULTS = {
+    "code_research_jobs": {
+        "status": "pending",
+        "llm_provider": "openai",
+        "progress": None,
+        "error_message": None,
+        "started_at": None,
+        "completed_at": None,
+        "metadata": {},
+        "dedupe_key": None,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "heartbeat_at": None,
+        "attempts": 0,
+    },
+}
+_PRIMARY_KEYS = {"code_research_worker_metrics": "worker_id", "code_research_batch_jobs": "job_id", "code_research_cache": "cache_key"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _lookup(row: Dict[str, Any], path: str) -> Any:
+    # "metadata->telemetry" style JSON paths
+    value = row
+    for key in path.split("->"):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key.strip())
+    return value
+
+
+class _Query:
+    """The PostgREST builder subset JobDB uses: one table, filters, execute()."""
+
+    def __init__(self, store: "FakeSupabase", table: str):
+        self.store = store
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.filters: List[tuple] = []
+        self.ordering: List[tuple] = []
+        self.row_limit: Optional[int] = None
+        self.row_offset = 0
+        self._negate = False
+
+    # Actions
+    def select(self, columns: str = "*", **kwargs) -> "_Query":
+        if self.action == "select":
+            self.columns = columns
+        return self
+
+    def insert(self, rows, **kwargs) -> "_Query":
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, **kwargs) -> "_Query":
+        self.action, self.payload = "upsert", rows
+        return self
+
+    def update(self, values: Dict[str, Any], **kwargs) -> "_Query":
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs) -> "_Query":
+        self.action = "delete"
+        return self
+
+    # Filters
+    def _filter(self, test) -> "_Query":
+        negate, self._negate = self._negate, False
+        self.filters.append((test, negate))
+        return self
+
+    @property
+    def not_(self) -> "_Query":
+        self._negate = True
+        return self
+
+    def eq(self, column: str, value: Any) -> "_Query":
+        return self._filter(lambda row: _lookup(row, column) == value)
+
+    def neq(self, column: str, value: Any) -> "_Query":
+        return self._filter(lambda row: _lookup(row, column) != value)
+
+    def in_(self, column: str, values) -> "_Query":
+        values = list(values)
+        return self._filter(lambda row: _lookup(row, column) in values)
+
+    def gte(self, column: str, value: Any) -> "_Query":
+        return self._filter(lambda row: _lookup(row, column) is not None and _lookup(row, column) >= value)
+
+    def lt(self, column: str, value: Any) -> "_Query":
+        return self._filter(lambda row: _lookup(row, column) is not None and _lookup(row, column) < value)
+
+    def is_(self, column: str, value: Any) -> "_Query":
+        expected = None if value in (None, "null") else value
+        return self._filter(lambda row: _lookup(row, column) is expected or _lookup(row, column) == expected)
+
+    def order(self, column: str, desc: bool = False, **kwargs) -> "_Query":
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, count: int, **kwargs) -> "_Query":
+        self.row_limit = count
+        return self
+
+    def offset(self, count: int) -> "_Query":
+        self.row_offset = count
+        return self
+
+    def range(self, start: int, end: int) -> "_Query":
+        self.row_offset, self.row_limit = start, end - start + 1
+        return self
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        return all(test(row) != negate for test, negate in self.filters)
+
+    def execute(self):
+        return self.store.execute(self)
+
+
+class FakeSupabase(FakeService):
+    """
+    In-memory Supabase client: table(name) query builders and rpc() for the
+    functions in migrations/. Failures raise postgrest APIError (503).
+    """
+
+    name = "supabase"
+
+    def __init__(self, latency: Optional[LatencyModel] = None, time_scale: float = 1.0):
+        super().__init__(latency, time_scale)
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self._data_lock = threading.RLock()
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def from_(self, name: str) -> _Query:
+        return self.table(name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        return types.SimpleNamespace(execute=lambda: self._call_rpc(name, params or {}))
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        """Copy of a table's rows (for assertions and reports)."""
+        with self._data_lock:
+            return copy.deepcopy(self.tables.get(table, []))
+
+    def _check(self) -> None:
+        if self.wait():
+            from postgrest.exceptions import APIError
+            raise APIError({"message": "service unavailable (fake)", "code": "503", "hint": None, "details": None})
+
+    def _new_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        new = copy.deepcopy(_TABLE_DEFAULTS.get(table, {}))
+        if table not in _PRIMARY_KEYS:
+            new["id"] = str(uuid.uuid4())
+        new["created_at"] = _now()
+        new.update(copy.deepcopy(row))
+        return new
+
+    @staticmethod
+    def _project(row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+        if columns.strip() == "*":
+            return copy.deepcopy(row)
+        projected = {}
+        for column in columns.split(","):
+            alias, _, path = column.strip().rpartition(":")
+            key = alias or path.split("->")[-1].strip()
+            projected[key] = copy.deepcopy(_lookup(row, path))
+        return projected
+
+    def execute(self, query: _Query):
+        self._check()
+        with self._data_lock:
+            rows = self.tables.setdefault(query.table, [])
+            if query.action == "insert":
+                payload = query.payload if isinstance(query.payload, list) else [query.payload]
+                created = [self._new_row(query.table, row) for row in payload]
+                rows.extend(created)
+                data = copy.deepcopy(created)
+            elif query.action == "upsert":
+                key = _PRIMARY_KEYS.get(query.table, "id")
+                payload = query.payload if isinstance(query.payload, list) else [query.payload]
+                data = []
+                for row in payload:
+                    existing = next((r for r in rows if key in row and r.get(key) == row[key]), None)
+                    if existing is None:
+                        existing = self._new_row(query.table, row)
+                        rows.append(existing)
+                    else:
+                        existing.update(copy.deepcopy(row))
+                    data.append(copy.deepcopy(existing))
+            elif query.action == "update":
+                data = []
+                for row in rows:
+                    if query.matches(row):
+                        row.update(copy.deepcopy(query.payload))
+                        data.append(copy.deepcopy(row))
+            elif query.action == "delete":
+                data = [copy.deepcopy(row) for row in rows if query.matches(row)]
+                rows[:] = [row for row in rows if not query.matches(row)]
+            else:
+                selected = [row for row in rows if query.matches(row)]
+                for column, desc in reversed(query.ordering):
+                    selected.sort(key=lambda row: (_lookup(row, column) is None, _lookup(row, column) or ""), reverse=desc)
+                end = None if query.row_limit is None else query.row_offset + query.row_limit
+                data = [self._project(row, query.columns) for row in selected[query.row_offset:end]]
+        return types.SimpleNamespace(data=data, count=None)
+
+    # RPCs (see migrations/)
+    def _lease(self, row: Dict[str, Any], worker_id: str, lease_seconds: int) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        row.update(
+            status="processing",
+            lease_owner=worker_id,
+            lease_expires_at=(now + timedelta(seconds=lease_seconds)).isoformat(),
+            heartbeat_at=now.isoformat(),
+            attempts=(row.get("attempts") or 0) + 1
+        )
+        return copy.deepcopy(row)
+
+    def _take_rate_limit_tokens(
+        self,
+        bucket: str,
+        amount: float,
+        rate_per_second: float,
+        bucket_capacity: float,
+        force: bool = False
+    ) -> float:
+        now = datetime.now(timezone.utc)
+        rows = self.tables.setdefault("code_research_rate_limits", [])
+        row = next((row for row in rows if row["bucket_name"] == bucket), None)
+        if row is None:
+            row = {"bucket_name": bucket, "tokens": bucket_capacity, "updated_at": now.isoformat()}
+            rows.append(row)
+        elapsed = (now - datetime.fromisoformat(row["updated_at"])).total_seconds()
+        available = min(bucket_capacity, row["tokens"] + elapsed * rate_per_second)
+        row["updated_at"] = now.isoformat()
+        if force or amount <= available or amount < 0:
+            row["tokens"] = min(bucket_capacity, available - amount)
+            return 0.0
+        row["tokens"] = available
+        return (amount - available) / rate_per_second
+
+    def _call_rpc(self, name: str, params: Dict[str, Any]):
+        self._check()
+        with self._data_lock:
+            jobs = self.tables.setdefault("code_research_jobs", [])
+            if name == "claim_code_research_job":
+                pending = sorted((job for job in jobs if job["status"] == "pending"), key=lambda job: job["created_at"])
+                data = [self._lease(pending[0], params["worker_id"], params["lease_seconds"])] if pending else []
+            elif name == "claim_code_research_jobs":
+                wanted = set(params["job_ids"])
+                data = [
+                    self._lease(job, params["worker_id"], params["lease_seconds"])
+                    for job in jobs if job["id"] in wanted and job["status"] == "pending"
+                ]
+            elif name == "heartbeat_code_research_jobs":
+                wanted = set(params["job_ids"])
+                data = []
+                for job in jobs:
+                    if job["id"] in wanted and job["status"] == "processing" and job.get("lease_owner") == params["worker_id"]:
+                        job["lease_expires_at"] = (datetime.now(timezone.utc) + timedelta(seconds=params["lease_seconds"])).isoformat()
+                        data.append(job["id"])
+            elif name == "requeue_expired_code_research_jobs":
+                now = datetime.now(timezone.utc)
+                data = []
+                for job in jobs:
+                    lease = job.get("lease_expires_at")
+                    if job["status"] != "processing" or not lease or datetime.fromisoformat(lease) >= now:
+                        continue
+                    job.update(lease_owner=None, lease_expires_at=None)
+                    if job.get("attempts", 0) >= params["max_attempts"]:
+                        job.update(status="failed", error_message=f"Worker lease expired after {job['attempts']} attempts")
+                    else:
+                        job["status"] = "pending"
+                        data.append(copy.deepcopy(job))
+            elif name == "code_research_job_counts":
+                counts: Dict[str, int] = {}
+                for job in jobs:
+                    counts[job["status"]] = counts.get(job["status"], 0) + 1
+                data = [{"status": status, "jobs": count} for status, count in counts.items()]
+            elif name == "code_research_batch_progress":
+                member_ids = {row["job_id"] for row in self.tables.get("code_research_batch_jobs", []) if row["batch_id"] == params["target_batch_id"]}
+                counts = {}
+                for job in jobs:
+                    if job["id"] in member_ids:
+                        counts[job["status"]] = counts.get(job["status"], 0) + 1
+                data = [{"status": status, "jobs": count} for status, count in counts.items()]
+            elif name == "take_rate_limit_tokens":
+                data = self._take_rate_limit_tokens(**params)
+            elif name == "prune_code_research_cache":
+                data = 0
+            elif name == "fold_code_research_worker_metrics":
+                rows = self.tables.setdefault("code_research_worker_metrics", [])
+                aggregate = next((row for row in rows if row["worker_id"] == "_folded"), None)
+                wanted = set(params["worker_ids"])
+                stale = [row for row in rows if row["worker_id"] in wanted and row["updated_at"] < params["stale_before"]]
+                data = aggregate is not None and aggregate["updated_at"] == params["folded_updated_at"] and len(stale) == len(wanted)
+                if data:
+                    rows[:] = [row for row in rows if row["worker_id"] not in wanted]
+                    aggregate.update(snapshot=copy.deepcopy(params["folded_snapshot"]), updated_at=_now())
+            else:
+                raise NotImplementedError(f"FakeSupabase has no RPC {name}")
+        return types.SimpleNamespace(data=data, count=None)
+
+
+# ============================================================
+# Smartsheet
+# ============================================================
+
+class _SmartsheetModel:
+    def __init__(self, props: Optional[Dict[str, Any]] = None):
+        self.__dict__.update(props or {})
+        self.cells: List[Dict[str, Any]] = []
+
+
+class FakeSmartsheet(FakeService):
+    """
+    The smartsheet SDK surface used by app.smartsheet_exporter. module() is
+    installed as sys.modules['smartsheet']; workspaces, folders and sheets
+    live in memory. Failures raise an error with a 503 status_code.
+    """
+
+    name = "smartsheet"
+
+    def __init__(self, latency: Optional[LatencyModel] = None, time_scale: float = 1.0, workspaces=("Code Research",)):
+        super().__init__(latency, time_scale)
+        self._ids = itertools.count(1000)
+        self._lock_data = threading.Lock()
+        self.workspaces = {name: next(self._ids) for name in workspaces}
+        # parent id -> {folder name: folder id}
+        self.folders: Dict[int, Dict[str, int]] = {}
+        self.sheets: Dict[int, Dict[str, Any]] = {}
+
+    def _call(self, value: Any = None) -> Any:
+        if self.wait():
+            raise FakeAPIError(503)
+        return value
+
+    def _list_folders(self, parent_id: int, **kwargs):
+        with self._lock_data:
+            folders = self.folders.get(parent_id, {})
+            data = [types.SimpleNamespace(name=name, id=folder_id) for name, folder_id in folders.items()]
+        return self._call(types.SimpleNamespace(data=data))
+
+    def _create_folder(self, parent_id: int, spec: _SmartsheetModel):
+        with self._lock_data:
+            folders = self.folders.setdefault(parent_id, {})
+            folder_id = folders.setdefault(spec.name, next(self._ids))
+        return self._call(types.SimpleNamespace(result=types.SimpleNamespace(id=folder_id, name=spec.name)))
+
+    def _create_sheet(self, folder_id: int, spec: _SmartsheetModel):
+        with self._lock_data:
+            sheet_id = next(self._ids)
+            columns = [types.SimpleNamespace(id=next(self._ids), **column) for column in spec.columns]
+            self.sheets[sheet_id] = {"name": spec.name, "folder_id": folder_id, "rows": []}
+        sheet = types.SimpleNamespace(
+            id=sheet_id,
+            name=spec.name,
+            columns=columns,
+            permalink=f"https://app.smartsheet.example/sheets/{sheet_id}"
+        )
+        return self._call(types.SimpleNamespace(result=sheet))
+
+    def _add_rows(self, sheet_id: int, rows: List[_SmartsheetModel]):
+        with self._lock_data:
+            self.sheets[sheet_id]["rows"].extend(row.cells for row in rows)
+        return self._call(types.SimpleNamespace(result=rows))
+
+    def client(self, access_token: str = "", **kwargs) -> Any:
+        """Stand-in for smartsheet.Smartsheet(access_token)."""
+        list_workspaces = lambda **kw: self._call(types.SimpleNamespace(
+            data=[types.SimpleNamespace(name=name, id=ws_id) for name, ws_id in self.workspaces.items()]
+        ))
+        return types.SimpleNamespace(
+            errors_as_exceptions=lambda enabled=True: None,
+            Workspaces=types.SimpleNamespace(
+                list_workspaces=list_workspaces,
+                list_folders=self._list_folders,
+                create_folder_in_workspace=self._create_folder
+            ),
+            Folders=types.SimpleNamespace(
+                list_folders=self._list_folders,
+                create_folder_in_folder=self._create_folder,
+                create_sheet_in_folder=self._create_sheet
+            ),
+            Sheets=types.SimpleNamespace(add_rows=self._add_rows)
+        )
+
+    def module(self) -> types.ModuleType:
+        """A module object to install as sys.modules['smartsheet']."""
+        module = types.ModuleType("smartsheet")
+        module.Smartsheet = self.client
+        module.models = types.SimpleNamespace(Sheet=_SmartsheetModel, Row=_SmartsheetModel, Folder=_SmartsheetModel)
+        return module
+
+
+# ============================================================
+# Wiring
+# ============================================================
+
+class OfflineUpstreams:
+    """The fakes in use by an offline_upstreams() block."""
+
+    def __init__(self, perplexity: FakePerplexity, openai: FakeOpenAI, supabase: FakeSupabase, smartsheet: FakeSmartsheet):
+        self.perplexity = perplexity
+        self.openai = openai
+        self.supabase = supabase
+        self.smartsheet = smartsheet
+
+    @property
+    def services(self) -> List[FakeService]:
+        return [self.perplexity, self.openai, self.supabase, self.smartsheet]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {service.name: service.stats() for service in self.services}
+
+    def reset(self) -> None:
+        for service in self.services:
+            service.reset()
+
+
+def _restore_module(name: str, module: Optional[types.ModuleType]) -> None:
+    if module is None:
+        sys.modules.pop(name, None)
+    else:
+        sys.modules[name] = module
+
+
+@contextmanager
+def offline_upstreams(
+    perplexity: Optional[LatencyModel] = None,
+    openai: Optional[LatencyModel] = None,
+    supabase: Optional[LatencyModel] = None,
+    smartsheet: Optional[LatencyModel] = None,
+    time_scale: float = 1.0
+):
+    """
+    Route every upstream call in the block to local fakes.
+
+    Patches the shared HTTP session/async client (Perplexity), the OpenAI
+    client factories, JobDB's Supabase client and the smartsheet module, sets
+    placeholder API keys and disables rate limiting (so throughput reflects
+    the fakes' latency rather than production quotas).
+
+    Example:
+        with offline_upstreams(perplexity=LatencyModel(900, 2500, 0.02)) as upstreams:
+            CodeCheckAgent(cache=False).run("1 Main St, Springfield, IL")
+            print(upstreams.stats())
+
+    Yields:
+        OfflineUpstreams
+    """
+    upstreams = OfflineUpstreams(
+        FakePerplexity(perplexity, time_scale),
+        FakeOpenAI(openai, time_scale),
+        FakeSupabase(supabase, time_scale),
+        FakeSmartsheet(smartsheet, time_scale)
+    )
+    session = upstreams.perplexity.session()
+    async_clients: Dict[int, httpx.AsyncClient] = {}
+
+    def async_http_client() -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = async_clients.get(id(loop))
+        if client is None:
+            client = async_clients[id(loop)] = upstreams.perplexity.async_client()
+        return client
+
+    with ExitStack() as stack:
+        # Placeholders only: nothing reaches the real services
+        stack.enter_context(patch.dict(os.environ, {
+            "PERPLEXITY_API_KEY": "offline",
+            "OPENAI_API_KEY": "offline",
+            "API_KEY": "offline",
+            "SUPABASE_URL": "https://offline.supabase.co",
+            "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.e30.offline",
+        }))
+        from app import clients, rate_limit
+        from app.db import JobDB
+
+        stack.enter_context(patch.object(clients, "get_http_session", lambda: session))
+        stack.enter_context(patch.object(clients, "get_async_http_client", async_http_client))
+        stack.enter_context(patch.object(clients.LLMClient, "_create_openai_client", lambda client: upstreams.openai.client()))
+        stack.enter_context(patch.object(clients.AsyncLLMClient, "_create_openai_client", lambda client: upstreams.openai.async_client()))
+        stack.enter_context(patch.object(JobDB, "_get_client", lambda: upstreams.supabase))
+        # Only this key: patch.dict(sys.modules) would also unload every module imported in the block
+        stack.callback(_restore_module, "smartsheet", sys.modules.get("smartsheet"))
+        sys.modules["smartsheet"] = upstreams.smartsheet.module()
+        stack.enter_context(patch.dict(rate_limit._limiters, {
+            provider: rate_limit.ProviderLimiter(provider) for provider in rate_limit.PROVIDERS
+        }, clear=True))
+        yield upstreams
@@ -0,0 +1,292 @@
+"""
+Offline Benchmark Runner
+
+Runs research jobs against the local fakes in benchmarks.fakes and reports
+throughput (jobs/min), job latency (p50/p95/p99) and upstream calls per job.
+No network access or API keys are needed.
+
+Scenarios:
+- agent: CodeCheckAgent.run() per job
+- agent-async: CodeCheckAgent.arun() per job
+- worker: JobDB.create_job() + process_research_job() per job
+- api: POST /jobs through the job routes, run by a LocalExecutor, polled
+  with GET /jobs/{id} until finished, then GET /jobs/{id}/results
+- export: CodeCheckAgent.run() + export_to_smartsheet() per job
+
+Latencies are "median_ms[:p95_ms[:error_rate]]" per upstream; --time-scale
+shrinks them (and retry backoff) so production-shaped runs finish quickly.
+The usual knobs (AGENT_MAX_CONCURRENCY, AGENT_BATCH_EXTRACTION, ...) apply.
+
+Usage:
+    python -m benchmarks.run --scenario worker --jobs 50 --concurrency 8 --time-scale 0.01
+    python -m benchmarks.run --scenario api --perplexity 6000:15000:0.05 --json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+from benchmarks.fakes import LatencyModel, OfflineUpstreams, offline_upstreams
+
+SCENARIOS = ("agent", "agent-async", "worker", "api", "export")
+
+# Rough production shape per upstream: median_ms:p95_ms:error_rate
+DEFAULT_LATENCIES = {
+    "perplexity": "6000:15000:0.01",
+    "openai": "2500:8000:0.01",
+    "supabase": "40:150:0",
+    "smartsheet": "400:1200:0",
+}
+
+# Seconds between GET /jobs/{id} polls in the api scenario (before time scaling)
+API_POLL_INTERVAL = 1.0
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0-100) of a list of values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def _address(index: int) -> str:
+    # Distinct addresses, so jobs are never deduplicated or cached
+    return f"{100 + index} Benchmark Ave, Springfield, IL 62701"
+
+
+def _scaled_retry_policy(time_scale: float) -> Callable:
+    from app.retry import RetryPolicy, get_retry_policy
+
+    def policy(provider: str) -> RetryPolicy:
+        base = get_retry_policy(provider)
+        return RetryPolicy(
+            max_attempts=base.max_attempts,
+            base_delay=base.base_delay * time_scale,
+            max_delay=base.max_delay * time_scale,
+            retry_after_max=base.retry_after_max
+        )
+
+    return policy
+
+
+def _run_agent(index: int, upstreams: OfflineUpstreams) -> bool:
+    from app.agent import CodeCheckAgent
+    CodeCheckAgent().run(_address(index))
+    return True
+
+
+def _run_agent_async(index: int, upstreams: OfflineUpstreams) -> bool:
+    from app.agent import CodeCheckAgent
+    asyncio.run(CodeCheckAgent().arun(_address(index)))
+    return True
+
+
+def _run_worker(index: int, upstreams: OfflineUpstreams) -> bool:
+    from app.db import JobDB
+    from app.worker_logic import process_research_job
+    job = JobDB.create_job(_address(index))
+    return process_research_job(job["id"], job["address"])["status"] == "completed"
+
+
+def _run_export(index: int, upstreams: OfflineUpstreams) -> bool:
+    from app.agent import CodeCheckAgent
+    from app.smartsheet_exporter import export_to_smartsheet
+    form = CodeCheckAgent().run(_address(index))
+    return export_to_smartsheet(form, access_token="offline")["rows_created"] > 0
+
+
+class _ApiScenario:
+    """Drives the job routes with one TestClient per benchmark thread."""
+
+    def __init__(self, concurrency: int, time_scale: float):
+        from fastapi import FastAPI
+        from app import job_routes
+        from app.executors import LocalExecutor
+
+        self.app = FastAPI()
+        self.app.include_router(job_routes.router)
+        self.poll_interval = max(0.005, API_POLL_INTERVAL * time_scale)
+        self.executor = LocalExecutor(max_workers=concurrency, queue_depth=0, poll_interval=self.poll_interval)
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def running(self):
+        with patch("app.job_routes.get_job_executor", lambda: self.executor):
+            self.executor.start()
+            try:
+                yield self
+            finally:
+                self.executor.stop()
+
+    def _client(self):
+        from fastapi.testclient import TestClient
+        if not hasattr(self._local, "client"):
+            self._local.client = TestClient(self.app, headers={"X-API-Key": "offline"})
+        return self._local.client
+
+    def __call__(self, index: int, upstreams: OfflineUpstreams) -> bool:
+        client = self._client()
+        response = client.post("/jobs", json={"address": _address(index), "llm_provider": "openai"})
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        while True:
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] in ("completed", "failed"):
+                break
+            time.sleep(self.poll_interval)
+        client.get(f"/jobs/{job_id}/results").raise_for_status()
+        return job["status"] == "completed"
+
+
+def run_benchmark(
+    scenario: str = "worker",
+    jobs: int = 20,
+    concurrency: int = 4,
+    latencies: Optional[Dict[str, LatencyModel]] = None,
+    time_scale: float = 1.0,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """
+    Run `jobs` jobs of a scenario, `concurrency` at a time, against the fakes.
+
+    Args:
+        scenario: One of SCENARIOS
+        jobs: Number of jobs to run
+        concurrency: Jobs in flight at once
+        latencies: LatencyModel per upstream ('perplexity', 'openai',
+            'supabase', 'smartsheet'); missing ones answer instantly
+        time_scale: Multiplier for fake latencies and retry backoff
+        verbose: Keep the application's stderr logging
+
+    Returns:
+        Report dict: jobs, failed, elapsed_s, jobs_per_min, latency_s
+        (p50/p95/p99/max), upstream_calls_per_job and upstream_errors_per_job
+        per service, and the first few job errors
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario: {scenario}")
+    if jobs < 1 or concurrency < 1:
+        raise ValueError("jobs and concurrency must be at least 1")
+    latencies = latencies or {}
+
+    with contextlib.ExitStack() as stack:
+        upstreams = stack.enter_context(offline_upstreams(time_scale=time_scale, **latencies))
+        # Only OpenAI is faked: no Gemini hedging; no cache, so every job does the full work
+        stack.enter_context(patch("app.agent.fallback_provider", lambda provider: None))
+        stack.enter_context(patch("app.agent.get_research_cache", lambda: None))
+        stack.enter_context(patch("app.clients.get_retry_policy", _scaled_retry_policy(time_scale)))
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stderr(io.StringIO()))
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+
+        if scenario == "api":
+            run_one = stack.enter_context(_ApiScenario(concurrency, time_scale).running())
+        else:
+            run_one = {
+                "agent": _run_agent,
+                "agent-async": _run_agent_async,
+                "worker": _run_worker,
+                "export": _run_export,
+            }[scenario]
+
+        durations: List[float] = []
+        errors: List[str] = []
+        failed = 0
+        lock = threading.Lock()
+
+        def timed(index: int) -> None:
+            nonlocal failed
+            start = time.perf_counter()
+            try:
+                ok = run_one(index, upstreams)
+            except Exception as e:
+                ok = False
+                with lock:
+                    errors.append(f"job {index}: {type(e).__name__}: {e}")
+            with lock:
+                durations.append(time.perf_counter() - start)
+                failed += not ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="benchmark") as pool:
+            list(pool.map(timed, range(jobs)))
+        elapsed = time.perf_counter() - started
+        stats = upstreams.stats()
+
+    return {
+        "scenario": scenario,
+        "jobs": jobs,
+        "failed": failed,
+        "concurrency": concurrency,
+        "time_scale": time_scale,
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_min": round(jobs / elapsed * 60, 2) if elapsed else None,
+        "latency_s": {
+            "p50": percentile(durations, 50),
+            "p95": percentile(durations, 95),
+            "p99": percentile(durations, 99),
+            "max": max(durations),
+        },
+        "upstream_calls_per_job": {
+            name: round(counts["calls"] / jobs, 2) for name, counts in stats.items()
+        },
+        "upstream_errors_per_job": {
+            name: round(counts["errors"] / jobs, 2) for name, counts in stats.items()
+        },
+        # First few exceptions raised by failed jobs
+        "errors": errors[:5],
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Human-readable summary of a run_benchmark() report."""
+    latency = report["latency_s"]
+    calls = report["upstream_calls_per_job"]
+    errors = report["upstream_errors_per_job"]
+    lines = [
+        f"scenario {report['scenario']}: {report['jobs']} jobs ({report['failed']} failed), "
+        f"concurrency {report['concurrency']}, time scale {report['time_scale']}",
+        f"  throughput   {report['jobs_per_min']:.1f} jobs/min ({report['elapsed_s']:.2f}s)",
+        f"  latency      p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  "
+        f"p99 {latency['p99']:.3f}s  max {latency['max']:.3f}s",
+        "  calls/job    " + "  ".join(f"{name} {calls[name]:g} ({errors[name]:g} errors)" for name in calls),
+    ]
+    lines.extend(f"  error        {error}" for error in report["errors"])
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline throughput/latency benchmark (no live APIs)")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="worker")
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--time-scale", type=float, default=0.01,
+                        help="Multiplier for fake latencies and retry backoff (default: 0.01)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latencies and injected errors")
+    for name, spec in DEFAULT_LATENCIES.items():
+        parser.add_argument(f"--{name}", default=spec, metavar="MEDIAN[:P95[:ERROR_RATE]]",
+                            help=f"{name} latency in ms and error rate (default: {spec})")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep application logging")
+    args = parser.parse_args(argv)
+
+    latencies = {
+        name: LatencyModel.parse(getattr(args, name), None if args.seed is None else args.seed + i)
+        for i, name in enumerate(DEFAULT_LATENCIES)
+    }
+    report = run_benchmark(args.scenario, args.jobs, args.concurrency, latencies, args.time_scale, args.verbose)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
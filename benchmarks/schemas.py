@@ -0,0 +1,146 @@
+"""
+Structured Output Schema Micro-Benchmark
+
+CPU spent building the provider response format for each extraction call,
+with and without the schema registry, while `threads` threads extract
+concurrently (a busy worker or API process):
+
+- per_call: the format is rebuilt from the section model on every call.
+  This is the registry's own conversion, uncached (for OpenAI, the same
+  work chat.completions.parse() does per call)
+- registry: get_schema_registry().get(model), compiled once
+
+Reported per provider: mean CPU per call (thread CPU time, so waiting for
+the GIL doesn't count), calls/s across all threads, and the CPU saved per
+call. No network access or API keys are needed.
+
+Usage:
+    python -m benchmarks.schemas
+    python -m benchmarks.schemas --threads 32 --calls 20 --provider openai --json
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+PROVIDERS = ("openai", "gemini")
+
+
+def _per_call(provider: str) -> Callable[[Type[BaseModel]], Any]:
+    if provider == "openai":
+        from app.schema_registry import openai_response_format
+        return openai_response_format
+
+    import google.generativeai as genai
+    from app.schema_registry import gemini_schema
+
+    def build(model: Type[BaseModel]):
+        return genai.protos.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=genai.protos.Schema(gemini_schema(model.model_json_schema()))
+        )
+
+    return build
+
+
+def _registry(provider: str) -> Callable[[Type[BaseModel]], Any]:
+    from app.schema_registry import get_schema_registry
+    registry = get_schema_registry()
+    registry.warm(gemini=provider == "gemini")
+    return lambda model: getattr(registry.get(model), provider)
+
+
+def _measure(build: Callable[[Type[BaseModel]], Any], models: List[Type[BaseModel]], threads: int, calls: int) -> Dict[str, float]:
+    """Run `calls` passes over every model on each of `threads` threads."""
+    cpu: List[float] = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        start = time.thread_time()
+        for _ in range(calls):
+            for model in models:
+                build(model)
+        with lock:
+            cpu.append(time.thread_time() - start)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    total = threads * calls * len(models)
+    return {
+        "cpu_us_per_call": round(sum(cpu) / total * 1e6, 2),
+        "calls_per_s": round(total / elapsed, 1),
+    }
+
+
+def run_schema_benchmark(threads: int = 16, calls: int = 10, providers=PROVIDERS) -> List[Dict[str, Any]]:
+    """
+    Per-call CPU for building response formats, per provider.
+
+    Returns:
+        One dict per provider: provider, models, threads, calls (total),
+        per_call and registry measurements (cpu_us_per_call, calls_per_s),
+        cpu_saved_us_per_call and speedup (per_call / registry CPU)
+    """
+    if threads < 1 or calls < 1:
+        raise ValueError("threads and calls must be at least 1")
+    from app.schema_registry import section_models
+    models = section_models()
+
+    results = []
+    for provider in providers:
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown provider: {provider}")
+        registry = _measure(_registry(provider), models, threads, calls)
+        per_call = _measure(_per_call(provider), models, threads, calls)
+        results.append({
+            "provider": provider,
+            "models": len(models),
+            "threads": threads,
+            "calls": threads * calls * len(models),
+            "per_call": per_call,
+            "registry": registry,
+            "cpu_saved_us_per_call": round(per_call["cpu_us_per_call"] - registry["cpu_us_per_call"], 2),
+            "speedup": round(per_call["cpu_us_per_call"] / max(registry["cpu_us_per_call"], 0.01), 1),
+        })
+    return results
+
+
+def format_results(results: List[Dict[str, Any]]) -> str:
+    """Table of run_schema_benchmark() results."""
+    lines = [f"{'provider':<8} {'calls':>7} {'per-call CPU':>14} {'registry CPU':>14} {'saved/call':>12} {'per-call/s':>11} {'registry/s':>11}"]
+    for result in results:
+        lines.append(
+            f"{result['provider']:<8} {result['calls']:>7} "
+            f"{result['per_call']['cpu_us_per_call']:>12.1f}us {result['registry']['cpu_us_per_call']:>12.1f}us "
+            f"{result['cpu_saved_us_per_call']:>10.1f}us {result['per_call']['calls_per_s']:>11.0f} {result['registry']['calls_per_s']:>11.0f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="CPU per call for structured-output response formats")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent extracting threads (default: 16)")
+    parser.add_argument("--calls", type=int, default=10, help="Passes over the section models per thread (default: 10)")
+    parser.add_argument("--provider", action="append", dest="providers", choices=PROVIDERS,
+                        help="Provider to measure (repeatable; default: both)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run_schema_benchmark(args.threads, args.calls, args.providers or PROVIDERS)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
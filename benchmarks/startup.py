@@ -0,0 +1,143 @@
+"""
+Cold Start Benchmark
+
+Measures what a serverless cold start costs per route: each run is a fresh
+Python process that imports app.main and serves one request (against the
+offline fakes, so no credentials or network are needed). Reported per
+route, as the median of --runs processes:
+
+- import_s: time to import app.main
+- first_request_s: time to start the app (lifespan) and serve the first
+  request, including anything imported lazily on the way
+- cold_start_s: import_s + first_request_s, what a serverless instance
+  pays before its first response
+- process_s: process start to exit, including interpreter startup and the
+  probe's own imports (TestClient, fakes)
+- heavy_modules: SDKs loaded by the end of the request (should be none for
+  light routes)
+
+Light routes should cold start in under TARGET_COLD_START_S; --check exits
+non-zero when one doesn't. The fakes stand in for the Supabase client, so
+the supabase SDK import a database-backed route pays on its first query in
+production is not included.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --route /health --route /metrics --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# Light routes: no upstream research, at most a few database reads
+LIGHT_ROUTES = ("/", "/health", "/metrics", "/jobs", "/jobs/00000000-0000-0000-0000-000000000000")
+TARGET_COLD_START_S = 1.0
+
+# SDKs a light route should never have to import
+HEAVY_MODULES = ("openai", "google.generativeai", "supabase", "postgrest", "smartsheet", "modal")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process: python -c _PROBE <route>
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+from benchmarks.fakes import offline_upstreams
+with offline_upstreams():
+    ready = time.perf_counter()
+    with TestClient(app.main.app) as client:
+        response = client.get(sys.argv[1], headers={"X-API-Key": "offline"})
+        served = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "first_request_s": served - ready,
+    "status": response.status_code,
+    "heavy_modules": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+def probe(route: str, python: str = sys.executable) -> Dict[str, Any]:
+    """One cold start: a fresh process imports app.main and serves `route`."""
+    env = dict(os.environ)
+    # Placeholder settings so app.config loads; nothing reaches real services
+    env.update(API_KEY="offline", PERPLEXITY_API_KEY="offline", OPENAI_API_KEY="offline", PYTHONWARNINGS="ignore")
+    # The API process on its own; a local executor would make it a worker too
+    env["JOB_EXECUTOR"] = "modal"
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [python, "-c", _PROBE, route, json.dumps(HEAVY_MODULES)],
+        cwd=_ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Probe for {route} failed:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["cold_start_s"] = result["import_s"] + result["first_request_s"]
+    result["process_s"] = elapsed
+    return result
+
+
+def run_startup_benchmark(routes=LIGHT_ROUTES, runs: int = 3) -> List[Dict[str, Any]]:
+    """
+    Cold start cost per route (median of `runs` fresh processes).
+
+    Returns:
+        One dict per route: route, status, import_s, first_request_s,
+        cold_start_s, process_s, heavy_modules and within_target
+    """
+    if runs < 1:
+        raise ValueError("runs must be at least 1")
+    results = []
+    for route in routes:
+        samples = [probe(route) for _ in range(runs)]
+        result = {"route": route, "status": samples[-1]["status"]}
+        for field in ("import_s", "first_request_s", "cold_start_s", "process_s"):
+            result[field] = round(statistics.median(sample[field] for sample in samples), 3)
+        result["heavy_modules"] = sorted({name for sample in samples for name in sample["heavy_modules"]})
+        result["within_target"] = result["cold_start_s"] < TARGET_COLD_START_S
+        results.append(result)
+    return results
+
+
+def format_results(results: List[Dict[str, Any]]) -> str:
+    """Table of run_startup_benchmark() results."""
+    lines = [f"{'route':<48} {'status':>6} {'import':>8} {'request':>8} {'cold':>8} {'process':>8}  heavy modules"]
+    for result in results:
+        flag = "" if result["within_target"] else f"  (over {TARGET_COLD_START_S:g}s target)"
+        lines.append(
+            f"{result['route']:<48} {result['status']:>6} {result['import_s']:>7.3f}s "
+            f"{result['first_request_s']:>7.3f}s {result['cold_start_s']:>7.3f}s {result['process_s']:>7.3f}s  "
+            f"{', '.join(result['heavy_modules']) or '-'}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cold start time per route")
+    parser.add_argument("--route", action="append", dest="routes", help="Route to probe (repeatable; default: light routes)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per route (default: 3)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a route misses the cold start target")
+    args = parser.parse_args(argv)
+
+    results = run_startup_benchmark(args.routes or LIGHT_ROUTES, args.runs)
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    if args.check and not all(result["within_target"] and not result["heavy_modules"] for result in results):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
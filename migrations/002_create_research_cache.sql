@@ -0,0 +1,66 @@
+-- Migration 002: Create Research Cache Table
+-- Shared section result cache (RESEARCH_CACHE_BACKEND=supabase)
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Research Cache Table
+-- ============================================================
+-- Stores extracted section models keyed by jurisdiction, zoning,
+-- section name and schema version
+CREATE TABLE IF NOT EXISTS code_research_cache (
+    cache_key TEXT PRIMARY KEY,
+
+    -- Extracted section model as JSON
+    value JSONB NOT NULL,
+
+    -- Expiry (TTL) and recency (LRU eviction)
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    last_accessed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- ============================================================
+-- Indexes for Performance
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_code_research_cache_expires_at
+    ON code_research_cache(expires_at);
+
+CREATE INDEX IF NOT EXISTS idx_code_research_cache_last_accessed
+    ON code_research_cache(last_accessed_at DESC);
+
+-- ============================================================
+-- LRU Pruning
+-- ============================================================
+-- Deletes expired entries, then everything beyond the max_entries
+-- most recently used. Called periodically by SupabaseCacheBackend.
+CREATE OR REPLACE FUNCTION prune_code_research_cache(max_entries INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    deleted INTEGER;
+BEGIN
+    DELETE FROM code_research_cache WHERE expires_at < NOW();
+
+    DELETE FROM code_research_cache
+    WHERE cache_key IN (
+        SELECT cache_key FROM code_research_cache
+        ORDER BY last_accessed_at DESC
+        OFFSET max_entries
+    );
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+
+    RETURN deleted;
+END;
+$$;
+
+-- ============================================================
+-- Comments for Documentation
+-- ============================================================
+
+COMMENT ON TABLE code_research_cache IS 'Cached section research results shared across jobs';
+COMMENT ON COLUMN code_research_cache.cache_key IS 'section:v<version>:<schema hash>:<jurisdiction>|<zoning>|<section>';
+COMMENT ON COLUMN code_research_cache.value IS 'Extracted section data as JSON (Pydantic model)';
+
+SELECT 'Migration 002 complete! Research cache table created.' AS status;
@@ -0,0 +1,24 @@
+-- Migration 003: Job Request Coalescing
+-- Adds a dedupe key so identical concurrent job submissions share one job
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Dedupe Key Column
+-- ============================================================
+-- '<llm_provider>:<normalized address>', set by POST /jobs
+ALTER TABLE code_research_jobs
+    ADD COLUMN IF NOT EXISTS dedupe_key TEXT;
+
+-- ============================================================
+-- Lock Row: at most one active job per dedupe key
+-- ============================================================
+-- A second insert for the same key while a job is pending/processing
+-- fails with unique_violation (23505); the API then attaches the caller
+-- to the existing job instead of starting another pipeline.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_code_research_jobs_active_dedupe_key
+    ON code_research_jobs(dedupe_key)
+    WHERE status IN ('pending', 'processing');
+
+COMMENT ON COLUMN code_research_jobs.dedupe_key IS 'Request coalescing key: <llm_provider>:<normalized address>';
+
+SELECT 'Migration 003 complete! Job dedupe key added.' AS status;
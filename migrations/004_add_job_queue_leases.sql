@@ -0,0 +1,116 @@
+-- Migration 004: Durable Job Queue
+-- Adds lease columns and queue functions so several workers can pull
+-- jobs from code_research_jobs without double-processing or losing them
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Lease Columns
+-- ============================================================
+-- A claimed job is 'processing' and owned by lease_owner until
+-- lease_expires_at. Workers extend the lease with heartbeats; an expired
+-- lease means the worker died and the job is requeued.
+ALTER TABLE code_research_jobs
+    ADD COLUMN IF NOT EXISTS lease_owner TEXT,
+    ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+
+-- ============================================================
+-- Indexes for Performance
+-- ============================================================
+-- Claims scan idx_code_research_jobs_status_created (migration 001) for the
+-- oldest pending row. Expiry sweeps only look at leased processing rows.
+CREATE INDEX IF NOT EXISTS idx_code_research_jobs_lease_expires
+    ON code_research_jobs(lease_expires_at)
+    WHERE status = 'processing' AND lease_expires_at IS NOT NULL;
+
+-- ============================================================
+-- Claim: oldest pending job, atomically
+-- ============================================================
+-- FOR UPDATE SKIP LOCKED lets concurrent claimers each take a different
+-- row instead of blocking on (or both taking) the same one.
+CREATE OR REPLACE FUNCTION claim_code_research_job(worker_id TEXT, lease_seconds INTEGER)
+RETURNS SETOF code_research_jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE code_research_jobs AS j
+    SET status = 'processing',
+        lease_owner = worker_id,
+        lease_expires_at = NOW() + make_interval(secs => lease_seconds),
+        heartbeat_at = NOW(),
+        attempts = j.attempts + 1
+    WHERE j.id = (
+        SELECT id FROM code_research_jobs
+        WHERE status = 'pending'
+        ORDER BY status, created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+END;
+$$;
+
+-- ============================================================
+-- Heartbeat: extend the leases a worker still owns
+-- ============================================================
+-- Returns the ids whose lease was extended; a missing id means the lease
+-- was lost (expired and requeued, or the job was finished elsewhere).
+CREATE OR REPLACE FUNCTION heartbeat_code_research_jobs(job_ids UUID[], worker_id TEXT, lease_seconds INTEGER)
+RETURNS SETOF UUID
+LANGUAGE sql
+AS $$
+    UPDATE code_research_jobs
+    SET lease_expires_at = NOW() + make_interval(secs => lease_seconds),
+        heartbeat_at = NOW()
+    WHERE id = ANY(job_ids)
+      AND status = 'processing'
+      AND lease_owner = worker_id
+    RETURNING id;
+$$;
+
+-- ============================================================
+-- Requeue: recover jobs whose worker stopped heartbeating
+-- ============================================================
+-- Jobs under max_attempts go back to 'pending' (the next worker resumes
+-- from their stored sections); the rest are failed.
+CREATE OR REPLACE FUNCTION requeue_expired_code_research_jobs(max_attempts INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    requeued INTEGER;
+BEGIN
+    UPDATE code_research_jobs
+    SET status = 'failed',
+        error_message = 'Worker lease expired after ' || attempts || ' attempts',
+        completed_at = NOW(),
+        lease_owner = NULL,
+        lease_expires_at = NULL
+    WHERE status = 'processing'
+      AND lease_expires_at < NOW()
+      AND attempts >= max_attempts;
+
+    UPDATE code_research_jobs
+    SET status = 'pending',
+        lease_owner = NULL,
+        lease_expires_at = NULL
+    WHERE status = 'processing'
+      AND lease_expires_at < NOW();
+    GET DIAGNOSTICS requeued = ROW_COUNT;
+
+    RETURN requeued;
+END;
+$$;
+
+-- ============================================================
+-- Comments for Documentation
+-- ============================================================
+
+COMMENT ON COLUMN code_research_jobs.lease_owner IS 'Worker currently holding the job (JobQueue.worker_id)';
+COMMENT ON COLUMN code_research_jobs.lease_expires_at IS 'Job is requeued if not heartbeated before this time';
+COMMENT ON COLUMN code_research_jobs.heartbeat_at IS 'Last heartbeat from lease_owner';
+COMMENT ON COLUMN code_research_jobs.attempts IS 'Number of times the job has been claimed';
+
+SELECT 'Migration 004 complete! Job queue leases added.' AS status;
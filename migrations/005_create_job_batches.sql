@@ -0,0 +1,65 @@
+-- Migration 005: Create Job Batches
+-- Portfolio submissions through POST /jobs/batch
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Batches Table
+-- ============================================================
+CREATE TABLE IF NOT EXISTS code_research_batches (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+
+    llm_provider VARCHAR(20) DEFAULT 'openai'
+        CHECK (llm_provider IN ('openai', 'gemini')),
+
+    -- Submitted addresses (including duplicates) and distinct jobs
+    total_addresses INTEGER NOT NULL DEFAULT 0,
+    total_jobs INTEGER NOT NULL DEFAULT 0,
+
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+
+    -- Optional metadata (JSON for flexibility)
+    metadata JSONB DEFAULT '{}'::jsonb
+);
+
+-- ============================================================
+-- Batch Membership
+-- ============================================================
+-- One row per distinct job in the batch. Jobs the batch attached to
+-- (already in flight from another request) are members too, so a job can
+-- belong to several batches.
+CREATE TABLE IF NOT EXISTS code_research_batch_jobs (
+    batch_id UUID NOT NULL REFERENCES code_research_batches(id) ON DELETE CASCADE,
+    job_id UUID NOT NULL REFERENCES code_research_jobs(id) ON DELETE CASCADE,
+    PRIMARY KEY (batch_id, job_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_code_research_batch_jobs_job_id
+    ON code_research_batch_jobs(job_id);
+
+-- ============================================================
+-- Aggregate Progress
+-- ============================================================
+-- Job counts per status for a batch, computed in one query instead of
+-- shipping every job row to the API.
+CREATE OR REPLACE FUNCTION code_research_batch_progress(target_batch_id UUID)
+RETURNS TABLE (status VARCHAR, jobs BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT j.status, COUNT(*)
+    FROM code_research_batch_jobs b
+    JOIN code_research_jobs j ON j.id = b.job_id
+    WHERE b.batch_id = target_batch_id
+    GROUP BY j.status;
+$$;
+
+-- ============================================================
+-- Comments for Documentation
+-- ============================================================
+
+COMMENT ON TABLE code_research_batches IS 'Batch job submissions (POST /jobs/batch)';
+COMMENT ON COLUMN code_research_batches.total_addresses IS 'Addresses submitted, including duplicates';
+COMMENT ON COLUMN code_research_batches.total_jobs IS 'Distinct jobs the batch maps to (created + attached)';
+COMMENT ON TABLE code_research_batch_jobs IS 'Jobs belonging to each batch';
+
+SELECT 'Migration 005 complete! Job batches created.' AS status;
@@ -0,0 +1,27 @@
+-- Migration 006: Claim a Batch's Jobs
+-- Lets the batch scheduler lease a known set of pending jobs at once
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Claim: specific pending jobs, atomically
+-- ============================================================
+-- Same lease semantics as claim_code_research_job (migration 004). Jobs
+-- another worker already claimed are skipped, so a batch never runs a job
+-- the regular queue is running and vice versa.
+CREATE OR REPLACE FUNCTION claim_code_research_jobs(job_ids UUID[], worker_id TEXT, lease_seconds INTEGER)
+RETURNS SETOF code_research_jobs
+LANGUAGE sql
+AS $$
+    UPDATE code_research_jobs
+    SET status = 'processing',
+        started_at = COALESCE(started_at, NOW()),
+        lease_owner = worker_id,
+        lease_expires_at = NOW() + make_interval(secs => lease_seconds),
+        heartbeat_at = NOW(),
+        attempts = attempts + 1
+    WHERE id = ANY(job_ids)
+      AND status = 'pending'
+    RETURNING *;
+$$;
+
+SELECT 'Migration 006 complete! Batch job claim added.' AS status;
@@ -0,0 +1,67 @@
+-- Migration 007: Create Shared Rate Limit Buckets
+-- Token buckets for upstream APIs shared by all processes
+-- (RATE_LIMIT_BACKEND=supabase)
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Rate Limit Buckets Table
+-- ============================================================
+-- One row per bucket, e.g. 'openai:requests' or 'openai:tokens'
+CREATE TABLE IF NOT EXISTS code_research_rate_limits (
+    bucket_name TEXT PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+-- ============================================================
+-- Take Tokens
+-- ============================================================
+-- Refills the bucket for the time elapsed, then takes the tokens if
+-- available. Returns 0 when taken, otherwise the seconds to wait before
+-- retrying. Negative tokens are refunds and always succeed. The row lock
+-- serializes concurrent callers.
+CREATE OR REPLACE FUNCTION take_rate_limit_tokens(
+    bucket TEXT,
+    amount DOUBLE PRECISION,
+    rate_per_second DOUBLE PRECISION,
+    bucket_capacity DOUBLE PRECISION
+)
+RETURNS DOUBLE PRECISION
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    available DOUBLE PRECISION;
+    last_update TIMESTAMPTZ;
+    now_ts TIMESTAMPTZ := clock_timestamp();
+BEGIN
+    INSERT INTO code_research_rate_limits (bucket_name, tokens, updated_at)
+    VALUES (bucket, bucket_capacity, now_ts)
+    ON CONFLICT (bucket_name) DO NOTHING;
+
+    SELECT r.tokens, r.updated_at INTO available, last_update
+    FROM code_research_rate_limits r
+    WHERE r.bucket_name = bucket
+    FOR UPDATE;
+
+    available := LEAST(
+        bucket_capacity,
+        available + EXTRACT(EPOCH FROM (now_ts - last_update)) * rate_per_second
+    );
+
+    IF amount <= available OR amount < 0 THEN
+        UPDATE code_research_rate_limits
+        SET tokens = LEAST(bucket_capacity, available - amount), updated_at = now_ts
+        WHERE bucket_name = bucket;
+        RETURN 0;
+    END IF;
+
+    UPDATE code_research_rate_limits
+    SET tokens = available, updated_at = now_ts
+    WHERE bucket_name = bucket;
+    RETURN (amount - available) / rate_per_second;
+END;
+$$;
+
+COMMENT ON TABLE code_research_rate_limits IS 'Shared token buckets for upstream API rate limits';
+
+SELECT 'Migration 007 complete! Shared rate limit buckets created.' AS status;
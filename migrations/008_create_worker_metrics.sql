@@ -0,0 +1,40 @@
+-- Migration 008: Worker Metrics and Job Counts for /metrics
+-- Workers push cumulative metric snapshots here; the API sums them
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Table: code_research_worker_metrics
+-- ============================================================
+-- One row per worker process, overwritten on every push. Snapshots are
+-- cumulative since the process started, so summing rows gives totals
+-- across all workers.
+CREATE TABLE IF NOT EXISTS code_research_worker_metrics (
+    worker_id TEXT PRIMARY KEY,
+    snapshot JSONB NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_worker_metrics_updated_at
+    ON code_research_worker_metrics(updated_at);
+
+-- ============================================================
+-- Jobs per status (aggregated in the database)
+-- ============================================================
+CREATE OR REPLACE FUNCTION code_research_job_counts()
+RETURNS TABLE (status VARCHAR, jobs BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT j.status, COUNT(*)
+    FROM code_research_jobs j
+    GROUP BY j.status;
+$$;
+
+-- ============================================================
+-- Comments for Documentation
+-- ============================================================
+
+COMMENT ON TABLE code_research_worker_metrics IS 'Cumulative metric snapshots pushed by workers (GET /metrics)';
+COMMENT ON COLUMN code_research_worker_metrics.worker_id IS 'Worker process identifier (host:pid:random)';
+
+SELECT 'Migration 008 complete! Worker metrics created.' AS status;
@@ -0,0 +1,73 @@
+-- Migration 009: Fold Expired Worker Metrics
+-- Keeps code_research_worker_metrics to live workers plus one aggregate row,
+-- without /metrics counters ever going down
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Aggregate row: what workers that stopped pushing had counted
+-- ============================================================
+-- GET /metrics folds rows older than METRICS_WORKER_TTL_SECONDS into this
+-- row and deletes them. Its snapshot only ever grows, so totals keep what
+-- finished Modal containers and restarted processes counted.
+INSERT INTO code_research_worker_metrics (worker_id, snapshot, updated_at)
+VALUES ('_folded', '{"counters": [], "histograms": []}'::jsonb, NOW())
+ON CONFLICT (worker_id) DO NOTHING;
+
+-- ============================================================
+-- Fold: replace the aggregate and delete the folded rows, atomically
+-- ============================================================
+-- The caller merges the stale snapshots into the aggregate it read and
+-- passes the result. Nothing changes (FALSE) if another caller folded
+-- since (the aggregate's updated_at moved) or one of the workers pushed
+-- again in the meantime (its row is no longer stale).
+CREATE OR REPLACE FUNCTION fold_code_research_worker_metrics(
+    worker_ids TEXT[],
+    stale_before TIMESTAMP WITH TIME ZONE,
+    folded_snapshot JSONB,
+    folded_updated_at TIMESTAMP WITH TIME ZONE
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    current_updated_at TIMESTAMP WITH TIME ZONE;
+    stale_rows INTEGER;
+BEGIN
+    SELECT m.updated_at INTO current_updated_at
+    FROM code_research_worker_metrics m
+    WHERE m.worker_id = '_folded'
+    FOR UPDATE;
+    IF current_updated_at IS DISTINCT FROM folded_updated_at THEN
+        RETURN FALSE;
+    END IF;
+
+    SELECT COUNT(*) INTO stale_rows FROM (
+        SELECT 1
+        FROM code_research_worker_metrics m
+        WHERE m.worker_id = ANY(worker_ids)
+          AND m.worker_id <> '_folded'
+          AND m.updated_at < stale_before
+        FOR UPDATE
+    ) locked;
+    IF stale_rows <> cardinality(worker_ids) THEN
+        RETURN FALSE;
+    END IF;
+
+    DELETE FROM code_research_worker_metrics m
+    WHERE m.worker_id = ANY(worker_ids);
+
+    UPDATE code_research_worker_metrics
+    SET snapshot = folded_snapshot,
+        updated_at = clock_timestamp()
+    WHERE worker_id = '_folded';
+    RETURN TRUE;
+END;
+$$;
+
+-- ============================================================
+-- Comments for Documentation
+-- ============================================================
+
+COMMENT ON FUNCTION fold_code_research_worker_metrics IS 'Fold expired worker snapshots into the _folded aggregate row (GET /metrics)';
+
+SELECT 'Migration 009 complete! Worker metrics folding added.' AS status;
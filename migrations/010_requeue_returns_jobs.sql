@@ -0,0 +1,46 @@
+-- Migration 010: Requeue Returns Jobs
+-- requeue_expired_code_research_jobs returns the requeued rows instead of a
+-- count, so the caller can dispatch them again (a Modal worker only runs
+-- the job it was spawned for; nothing else would pick them up)
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Requeue: recover jobs whose worker stopped heartbeating
+-- ============================================================
+-- Same rules as migration 004: jobs under max_attempts go back to
+-- 'pending', the rest are failed. Only the requeued jobs are returned.
+DROP FUNCTION IF EXISTS requeue_expired_code_research_jobs(INTEGER);
+
+CREATE OR REPLACE FUNCTION requeue_expired_code_research_jobs(max_attempts INTEGER)
+RETURNS SETOF code_research_jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE code_research_jobs
+    SET status = 'failed',
+        error_message = 'Worker lease expired after ' || attempts || ' attempts',
+        completed_at = NOW(),
+        lease_owner = NULL,
+        lease_expires_at = NULL
+    WHERE status = 'processing'
+      AND lease_expires_at < NOW()
+      AND attempts >= max_attempts;
+
+    RETURN QUERY
+    UPDATE code_research_jobs AS j
+    SET status = 'pending',
+        lease_owner = NULL,
+        lease_expires_at = NULL
+    WHERE j.status = 'processing'
+      AND j.lease_expires_at < NOW()
+    RETURNING j.*;
+END;
+$$;
+
+-- ============================================================
+-- Comments for Documentation
+-- ============================================================
+
+COMMENT ON FUNCTION requeue_expired_code_research_jobs IS 'Requeue (or fail) jobs with expired leases; returns the requeued jobs for re-dispatch';
+
+SELECT 'Migration 010 complete! Requeue now returns the requeued jobs.' AS status;
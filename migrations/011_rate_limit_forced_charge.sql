@@ -0,0 +1,59 @@
+-- Migration 011: Forced Rate Limit Charges
+-- Usage reported above a reservation is charged even when the shared bucket
+-- can't cover it, like the in-process TokenBucket: the balance goes negative
+-- and later callers wait it off (RATE_LIMIT_BACKEND=supabase)
+-- Run this in Supabase SQL Editor
+
+-- ============================================================
+-- Take Tokens (replaces the migration 007 version)
+-- ============================================================
+-- As before, plus force: apply the amount unconditionally (settling a
+-- reservation). A forced charge may leave the bucket below zero; refunds
+-- are still capped at bucket_capacity. Dropped first so callers that omit
+-- force don't match two overloads.
+DROP FUNCTION IF EXISTS take_rate_limit_tokens(TEXT, DOUBLE PRECISION, DOUBLE PRECISION, DOUBLE PRECISION);
+
+CREATE OR REPLACE FUNCTION take_rate_limit_tokens(
+    bucket TEXT,
+    amount DOUBLE PRECISION,
+    rate_per_second DOUBLE PRECISION,
+    bucket_capacity DOUBLE PRECISION,
+    force BOOLEAN DEFAULT FALSE
+)
+RETURNS DOUBLE PRECISION
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    available DOUBLE PRECISION;
+    last_update TIMESTAMPTZ;
+    now_ts TIMESTAMPTZ := clock_timestamp();
+BEGIN
+    INSERT INTO code_research_rate_limits (bucket_name, tokens, updated_at)
+    VALUES (bucket, bucket_capacity, now_ts)
+    ON CONFLICT (bucket_name) DO NOTHING;
+
+    SELECT r.tokens, r.updated_at INTO available, last_update
+    FROM code_research_rate_limits r
+    WHERE r.bucket_name = bucket
+    FOR UPDATE;
+
+    available := LEAST(
+        bucket_capacity,
+        available + EXTRACT(EPOCH FROM (now_ts - last_update)) * rate_per_second
+    );
+
+    IF force OR amount <= available OR amount < 0 THEN
+        UPDATE code_research_rate_limits
+        SET tokens = LEAST(bucket_capacity, available - amount), updated_at = now_ts
+        WHERE bucket_name = bucket;
+        RETURN 0;
+    END IF;
+
+    UPDATE code_research_rate_limits
+    SET tokens = available, updated_at = now_ts
+    WHERE bucket_name = bucket;
+    RETURN (amount - available) / rate_per_second;
+END;
+$$;
+
+SELECT 'Migration 011 complete! Rate limit charges can be forced.' AS status;
@@ -0,0 +1,159 @@
+"""
+Agent Tests: CodeCheckAgent orchestration
+
+Unit tests for the research pipeline with Perplexity and LLM clients mocked.
+No API keys or network access required.
+"""
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+
+from app.models import CodeCheckForm, LocationInformation, WallSigns, VarianceProcedures
+
+
+def _make_agent(max_concurrency=1, search_delay=0.0):
+    """Build an agent whose clients are mocks that echo the section model."""
+    from app.agent import CodeCheckAgent
+
+    with patch('app.agent.PerplexityClient'), patch('app.agent.LLMClient'):
+        agent = CodeCheckAgent(llm_provider="openai", max_concurrency=max_concurrency)
+
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def search(query, *args, **kwargs):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(search_delay)
+        with lock:
+            state["active"] -= 1
+        return {"content": query, "citations": ["https://example.gov/code"]}
+
+    agent.perplexity.search.side_effect = search
+    agent.llm.extract_data.side_effect = lambda content, schema, instructions="": schema()
+    return agent, state
+
+
+def test_run_populates_every_section_sequentially():
+    """
+    Test 1: Sequential mode researches jurisdiction plus all 12 sections
+    """
+    from app.agent import SECTIONS
+
+    agent, state = _make_agent(max_concurrency=1)
+    form = agent.run("123 Main St, Miami, FL")
+
+    assert isinstance(form, CodeCheckForm)
+    assert isinstance(form.location_information, LocationInformation)
+    assert isinstance(form.wall_signs, WallSigns)
+    assert agent.perplexity.search.call_count == len(SECTIONS) + 1
+    assert state["peak"] == 1
+
+
+def test_concurrent_mode_respects_fan_out_limit():
+    """
+    Test 2: Concurrent mode runs sections in parallel, bounded by max_concurrency
+    """
+    agent, state = _make_agent(max_concurrency=4, search_delay=0.05)
+    agent.run("123 Main St, Miami, FL")
+
+    assert 1 < state["peak"] <= 4
+
+
+def test_concurrent_mode_keeps_section_order():
+    """
+    Test 3: Results land in the right CodeCheckForm fields regardless of completion order
+    """
+    from app.agent import SECTIONS
+
+    agent, _ = _make_agent(max_concurrency=12)
+    location = LocationInformation()
+
+    # Make early sections finish last
+    def search(query, *args, **kwargs):
+        for index, (name, _, _) in enumerate(SECTIONS):
+            if f"'{name}'" in query:
+                time.sleep(0.01 * (len(SECTIONS) - index))
+        return {"content": query, "citations": []}
+
+    agent.perplexity.search.side_effect = search
+    results = agent.research_sections("123 Main St", location)
+
+    assert list(results.keys()) == [field for _, _, field in SECTIONS]
+    assert isinstance(results["wall_signs"], WallSigns)
+    assert isinstance(results["variance_procedures"], VarianceProcedures)
+
+
+def test_invalid_concurrency_rejected():
+    """
+    Test 4: max_concurrency below 1 is a configuration error
+    """
+    from app.agent import CodeCheckAgent
+
+    with patch('app.agent.PerplexityClient'), patch('app.agent.LLMClient'):
+        with pytest.raises(ValueError):
+            CodeCheckAgent(max_concurrency=0)
+
+
+@pytest.mark.asyncio
+async def test_arun_matches_run_without_blocking():
+    """
+    Test 5: arun() uses the async clients and fills the form in section order
+    """
+    from app.agent import CodeCheckAgent, SECTIONS
+    from unittest.mock import AsyncMock
+
+    with patch('app.agent.PerplexityClient'), patch('app.agent.LLMClient'), \
+         patch('app.agent.AsyncPerplexityClient') as mock_async_pplx, \
+         patch('app.agent.AsyncLLMClient') as mock_async_llm:
+        mock_async_pplx.return_value.search = AsyncMock(
+            return_value={"content": "Sign code text", "citations": []}
+        )
+        mock_async_llm.return_value.extract_data = AsyncMock(
+            side_effect=lambda content, schema, instructions="": schema()
+        )
+
+        agent = CodeCheckAgent(max_concurrency=3)
+        form = await agent.arun("123 Main St, Miami, FL")
+
+    assert isinstance(form, CodeCheckForm)
+    assert isinstance(form.wall_signs, WallSigns)
+    assert mock_async_pplx.return_value.search.await_count == len(SECTIONS) + 1
+    agent.perplexity.search.assert_not_called()
+
+
+def test_batch_extraction_uses_one_llm_call_per_group():
+    """
+    Test 6: Batch extraction mode cuts LLM calls to one per section group and splits the result
+    """
+    from app.agent import CodeCheckAgent, SECTIONS, SECTION_GROUPS
+
+    with patch('app.agent.PerplexityClient'), patch('app.agent.LLMClient'):
+        agent = CodeCheckAgent(max_concurrency=4, batch_extraction=True)
+    agent.perplexity.search.return_value = {"content": "Sign code text", "citations": []}
+    agent.llm.extract_data.side_effect = lambda content, schema, instructions="": schema()
+
+    form = agent.run("123 Main St, Miami, FL")
+
+    assert sorted(field for group in SECTION_GROUPS for field in group) == sorted(field for _, _, field in SECTIONS)
+    assert agent.llm.extract_data.call_count == len(SECTION_GROUPS) + 1
+    assert agent.perplexity.search.call_count == len(SECTIONS) + 1
+    assert isinstance(form.wall_signs, WallSigns)
+    assert isinstance(form.variance_procedures, VarianceProcedures)
+
+
+def test_run_reports_each_section_through_callback():
+    """
+    Test 7: on_section receives location_information and every section as it completes
+    """
+    from app.agent import SECTIONS
+
+    agent, _ = _make_agent(max_concurrency=4)
+    reported = []
+
+    agent.run("123 Main St, Miami, FL", on_section=lambda name, data: reported.append(name))
+
+    assert reported[0] == "location_information"
+    assert sorted(reported[1:]) == sorted(field for _, _, field in SECTIONS)
@@ -0,0 +1,139 @@
+"""
+Batch Scheduler Tests
+
+Jurisdiction grouping and fan-out with a fake agent (no network).
+"""
+import threading
+from collections import defaultdict
+from unittest.mock import Mock, patch
+
+from app.batch_scheduler import BatchScheduler, jurisdiction_group_key
+from app.models import LocationInformation, WallSigns
+from app.telemetry import JobTelemetry, UpstreamCall
+
+CITIES = {
+    "Miami": "City of Miami",
+    "Austin": "City of Austin",
+}
+
+
+def _location(jurisdiction, zoning="C-1"):
+    return LocationInformation.model_validate({
+        "jurisdiction": {"value": jurisdiction},
+        "zoning": {"value": zoning},
+    })
+
+
+class FakeAgent:
+    """Counts research calls; sections are shared WallSigns instances."""
+
+    def __init__(self):
+        self.lookups = 0
+        self.section_runs = []
+        self.telemetry = JobTelemetry()
+        self._lock = threading.Lock()
+
+    def _call(self, section):
+        with self.telemetry.section(section):
+            self.telemetry.add(UpstreamCall("perplexity", "search"))
+
+    def research_jurisdiction(self, address):
+        with self._lock:
+            self.lookups += 1
+        self._call("location_information")
+        if "Nowhere" in address:
+            raise Exception("Perplexity timed out")
+        city = next((name for key, name in CITIES.items() if key in address), None)
+        return _location(city)
+
+    def research_sections(self, address, location_info, on_section=None, field_names=None):
+        with self._lock:
+            self.section_runs.append(location_info.jurisdiction.value)
+        self._call("wall_signs")
+        for field_name in ("wall_signs", "awnings"):
+            on_section(field_name, WallSigns())
+        return {}
+
+
+def _run(jobs):
+    agent = FakeAgent()
+    calls = defaultdict(list)
+    stats = BatchScheduler(agent, lookup_concurrency=4).run(
+        jobs,
+        on_location=lambda job, loc: calls["location"].append(job["id"]),
+        on_section=lambda job, name, data: calls[job["id"]].append(name),
+        on_done=lambda job: calls["done"].append(job["id"]),
+        on_error=lambda job, e: calls["error"].append(job["id"])
+    )
+    return agent, calls, stats
+
+
+def test_sections_researched_once_per_jurisdiction():
+    """
+    Test 1: Research calls scale with jurisdictions, not addresses
+    """
+    jobs = [{"id": f"m{i}", "address": f"{i} Main St, Miami, FL"} for i in range(4)]
+    jobs += [{"id": f"a{i}", "address": f"{i} Congress Ave, Austin, TX"} for i in range(3)]
+
+    agent, calls, stats = _run(jobs)
+
+    assert agent.lookups == 7
+    assert sorted(agent.section_runs) == ["City of Austin", "City of Miami"]
+    assert stats == {"jobs": 7, "groups": 2, "failed": 0}
+    for job in jobs:
+        assert calls[job["id"]] == ["wall_signs", "awnings"]
+    assert sorted(calls["done"]) == sorted(job["id"] for job in jobs)
+
+
+def test_unknown_and_failed_jurisdictions():
+    """
+    Test 2: Unidentified jurisdictions run alone; failed lookups fail only their job
+    """
+    jobs = [
+        {"id": "m1", "address": "1 Main St, Miami, FL"},
+        {"id": "u1", "address": "1 Rural Rd"},
+        {"id": "u2", "address": "2 Rural Rd"},
+        {"id": "x1", "address": "1 Nowhere Ln"},
+    ]
+
+    agent, calls, stats = _run(jobs)
+
+    assert stats == {"jobs": 4, "groups": 3, "failed": 1}
+    assert calls["error"] == ["x1"]
+    assert len(agent.section_runs) == 3
+    assert jurisdiction_group_key(_location(None)) is None
+    assert jurisdiction_group_key(_location("City of Miami", "C-1")) == jurisdiction_group_key(_location("city of miami ", "c-1"))
+
+
+@patch('app.agent.CodeCheckAgent')
+@patch('app.job_queue.JobQueue')
+@patch('app.db.JobDB')
+def test_process_research_batch_saves_shared_sections_per_job(mock_job_db, mock_queue_class, mock_agent_class):
+    """
+    Test 3: The batch worker claims jobs, saves every shared section to each
+    job and completes them
+    """
+    from app.worker_logic import process_research_batch
+
+    jobs = [{"id": f"m{i}", "address": f"{i} Main St, Miami, FL"} for i in range(3)]
+    queue = mock_queue_class.return_value
+    queue.claim_jobs.return_value = jobs
+    queue.hold_leases.return_value.__enter__ = Mock(return_value=None)
+    queue.hold_leases.return_value.__exit__ = Mock(return_value=False)
+    mock_agent_class.side_effect = lambda **kwargs: FakeAgent()
+
+    result = process_research_batch(["m0", "m1", "m2", "gone"], "openai")
+
+    assert result == {"status": "completed", "jobs": 3, "groups": 1, "completed": 3, "failed": 0}
+    saved = defaultdict(list)
+    for call in mock_job_db.save_section_results.call_args_list:
+        saved[call[0][0]].extend(call[0][1])
+    for job in jobs:
+        assert saved[job["id"]] == ["location_information", "wall_signs", "awnings"]
+    completed = [call for call in mock_job_db.update_job.call_args_list if call[1].get("status") == "completed"]
+    assert sorted(call[0][0] for call in completed) == ["m0", "m1", "m2"]
+    # Every job records the telemetry of its own lookup plus its group's research
+    for call in completed:
+        telemetry = call[1]["metadata"]["telemetry"]
+        assert telemetry["sections"]["location_information"]["calls"] == 1
+        assert telemetry["sections"]["wall_signs"]["calls"] == 1
@@ -0,0 +1,82 @@
+"""
+Benchmark Harness Tests
+
+The offline fakes and the benchmark runner (no network).
+"""
+import pytest
+
+from benchmarks.fakes import FakeSupabase, LatencyModel, offline_upstreams
+from benchmarks.run import percentile, run_benchmark
+
+
+def test_latency_model_distribution():
+    """
+    Test 1: Sampled latencies follow the configured median/p95; errors hit the configured rate
+    """
+    model = LatencyModel.parse("100:300:0.1", seed=7)
+    samples = [model.sample() * 1000 for _ in range(5000)]
+    failures = sum(model.fails() for _ in range(5000))
+
+    assert 90 < percentile(samples, 50) < 110
+    assert 270 < percentile(samples, 95) < 330
+    assert 400 < failures < 600
+    assert LatencyModel().sample() == 0.0
+    with pytest.raises(ValueError):
+        LatencyModel(100, 50)
+
+
+def test_fake_supabase_query_builder():
+    """
+    Test 2: The in-memory store supports the filters, ordering and RPCs JobDB uses
+    """
+    db = FakeSupabase()
+    first = db.table("code_research_jobs").insert({"address": "1 Main St"}).execute().data[0]
+    db.table("code_research_jobs").insert([{"address": "2 Main St"}, {"address": "3 Main St", "metadata": {"telemetry": {"wall_ms": 5}}}]).execute()
+
+    assert first["status"] == "pending" and first["id"]
+    claimed = db.rpc("claim_code_research_job", {"worker_id": "w1", "lease_seconds": 60}).execute().data[0]
+    assert claimed["id"] == first["id"] and claimed["attempts"] == 1
+
+    pending = db.table("code_research_jobs").select("*").eq("status", "pending").order("created_at", desc=True).limit(1).execute().data
+    assert [job["address"] for job in pending] == ["3 Main St"]
+    telemetry = db.table("code_research_jobs").select("telemetry:metadata->telemetry").not_.is_("metadata->telemetry", "null").execute().data
+    assert telemetry == [{"telemetry": {"wall_ms": 5}}]
+    counts = {row["status"]: row["jobs"] for row in db.rpc("code_research_job_counts").execute().data}
+    assert counts == {"pending": 2, "processing": 1}
+
+
+def test_worker_benchmark_report():
+    """
+    Test 3: The worker scenario runs real jobs against the fakes, retrying injected errors
+    """
+    report = run_benchmark(
+        "worker",
+        jobs=4,
+        concurrency=2,
+        latencies={"perplexity": LatencyModel(error_rate=0.2, seed=1)},
+        time_scale=0
+    )
+
+    assert report["failed"] == 0
+    assert report["jobs_per_min"] > 0
+    assert report["latency_s"]["p50"] <= report["latency_s"]["p99"]
+    assert report["upstream_calls_per_job"]["openai"] == 13
+    assert report["upstream_calls_per_job"]["perplexity"] > 13
+    assert report["upstream_calls_per_job"]["supabase"] > 0
+
+
+def test_api_and_export_scenarios():
+    """
+    Test 4: Jobs submitted through the routes complete; exports reach the fake Smartsheet
+    """
+    api = run_benchmark("api", jobs=2, concurrency=2, time_scale=0)
+    export = run_benchmark("export", jobs=1, concurrency=1, time_scale=0)
+
+    assert api["failed"] == 0
+    assert export["failed"] == 0
+    assert export["upstream_calls_per_job"]["smartsheet"] >= 5
+
+    with offline_upstreams() as upstreams:
+        from app.db import JobDB
+        JobDB.create_job("1 Main St")
+        assert upstreams.stats()["supabase"]["calls"] == 1
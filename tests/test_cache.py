@@ -0,0 +1,136 @@
+"""
+Cache Tests: Research result caching
+
+Unit tests for the cache backends and the agent's use of them.
+No API keys or network access required.
+"""
+import time
+import pytest
+from unittest.mock import patch
+
+from app.models import LocationInformation, ResearchedField, WallSigns, Awnings
+
+
+def _location(jurisdiction="City of Miami", zoning="C-1"):
+    return LocationInformation(
+        jurisdiction=ResearchedField(value=jurisdiction),
+        zoning=ResearchedField(value=zoning)
+    )
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    from app.cache import create_cache_backend
+    return create_cache_backend(
+        request.param,
+        ttl_seconds=60,
+        max_entries=2,
+        sqlite_path=str(tmp_path / "cache.sqlite3")
+    )
+
+
+def test_backend_round_trip_and_lru_eviction(backend):
+    """
+    Test 1: Backends return stored values and evict the least recently used entry
+    """
+    backend.set("a", {"value": 1})
+    backend.set("b", {"value": 2})
+    assert backend.get("a") == {"value": 1}  # 'a' is now most recently used
+
+    backend.set("c", {"value": 3})
+
+    assert backend.get("b") is None
+    assert backend.get("a") == {"value": 1}
+    assert backend.get("c") == {"value": 3}
+
+
+def test_backend_expires_entries(backend):
+    """
+    Test 2: Entries older than the TTL are not served
+    """
+    backend.set("a", {"value": 1})
+    with patch("app.cache.time.time", return_value=time.time() + 120):
+        assert backend.get("a") is None
+
+
+def test_section_key_normalizes_and_versions():
+    """
+    Test 3: Keys ignore case/punctuation and differ per section schema
+    """
+    from app.cache import ResearchCache
+
+    key = ResearchCache.section_key(_location("City of Miami", "C-1"), "Wall Signs", WallSigns)
+    same = ResearchCache.section_key(_location("city of  MIAMI.", "c 1"), "wall signs", WallSigns)
+    other = ResearchCache.section_key(_location("City of Miami", "C-1"), "Wall Signs", Awnings)
+
+    assert key == same
+    assert key != other
+    assert ResearchCache.section_key(_location(None), "Wall Signs", WallSigns) is None
+
+
+def test_agent_skips_upstream_calls_on_cache_hit():
+    """
+    Test 4: A repeat jurisdiction is served from cache without Perplexity or LLM calls
+    """
+    from app.agent import CodeCheckAgent
+    from app.cache import MemoryCacheBackend, ResearchCache
+
+    cache = ResearchCache(MemoryCacheBackend())
+    with patch('app.agent.PerplexityClient'), patch('app.agent.LLMClient'):
+        agent = CodeCheckAgent(cache=cache)
+    agent.perplexity.search.return_value = {"content": "Wall sign rules", "citations": []}
+    agent.llm.extract_data.return_value = WallSigns(wall_signs_allowed=ResearchedField(value=True))
+
+    first = agent.research_section("Wall Signs", WallSigns, "1 Main St", _location())
+    second = agent.research_section("Wall Signs", WallSigns, "99 Other Rd", _location())
+
+    assert second == first
+    assert agent.perplexity.search.call_count == 1
+    assert agent.llm.extract_data.call_count == 1
+    assert cache.stats()["section"]["hits"] == 1
+
+
+def test_normalize_address_collapses_near_duplicates():
+    """
+    Test 5: Case, punctuation, suite numbers, ZIP+4 and abbreviations are normalized
+    """
+    from app.address import normalize_address
+
+    canonical = normalize_address("123 Main St, Miami, FL 33101")
+
+    assert normalize_address("123 MAIN STREET., Suite 400, Miami, Florida 33101-1234") == canonical
+    assert normalize_address("123 Main St #4B, miami fl 33101") == canonical
+    assert normalize_address("125 Main St, Miami, FL 33101") != canonical
+
+
+def test_agent_memoizes_jurisdiction_lookup():
+    """
+    Test 6: research_jurisdiction() is a cache lookup for a near-duplicate address
+    """
+    from app.agent import CodeCheckAgent
+    from app.cache import MemoryCacheBackend, ResearchCache
+
+    cache = ResearchCache(MemoryCacheBackend())
+    with patch('app.agent.PerplexityClient'), patch('app.agent.LLMClient'):
+        agent = CodeCheckAgent(cache=cache)
+    agent.perplexity.search.return_value = {"content": "Miami, zoned C-1", "citations": []}
+    agent.llm.extract_data.return_value = _location()
+
+    first = agent.research_jurisdiction("123 Main Street, Miami, FL")
+    second = agent.research_jurisdiction("123 main st., Suite 2, Miami, FL")
+
+    assert second == first
+    assert agent.perplexity.search.call_count == 1
+    assert cache.stats()["location"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_normalize_address_keeps_lookalike_words():
+    """
+    Test 7: Words that only look like unit designators or state names are kept
+    """
+    from app.address import normalize_address
+
+    assert normalize_address("100 Main St, Ste Genevieve, MO 63670") == "100 main st ste genevieve mo 63670"
+    assert normalize_address("12 Floor Ln, Austin, TX") == "12 floor ln austin tx"
+    assert normalize_address("500 Washington Ave, St Louis, MO") == "500 washington ave st louis mo"
+    assert normalize_address("1 Elm St Apt B, Seattle, Washington 98101") == "1 elm st seattle wa 98101"
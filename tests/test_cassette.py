@@ -0,0 +1,119 @@
+"""
+Cassette Tests
+
+Recording upstream responses and replaying them without network access.
+"""
+import gzip
+import json
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.cassette import Cassette, CassetteMissError
+from app.clients import LLMClient, PerplexityClient
+from app.models import LocationInformation
+from app.rate_limit import ProviderLimiter
+from app.retry import RetryPolicy
+from app.telemetry import JobTelemetry
+
+
+def _perplexity_response(content):
+    response = Mock()
+    response.json.return_value = {
+        "choices": [{"message": {"content": content}}],
+        "citations": ["https://example.gov/code"],
+        "usage": {"prompt_tokens": 50, "completion_tokens": 10, "total_tokens": 60},
+    }
+    return response
+
+
+def _perplexity(cassette, session):
+    return PerplexityClient(
+        api_key="test",
+        session=session,
+        rate_limiter=ProviderLimiter("perplexity"),
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0),
+        telemetry=JobTelemetry(),
+        cassette=cassette
+    )
+
+
+def test_perplexity_record_then_replay(tmp_path):
+    """
+    Test 1: Recorded searches replay without touching the network, with
+    zero or original latency
+    """
+    path = str(tmp_path / "upstream.jsonl.gz")
+    session = Mock()
+    session.post.side_effect = [_perplexity_response("wall signs: 10%"), _perplexity_response("awnings: allowed")]
+    recorder = _perplexity(Cassette(path, "record"), session)
+    recorded = [recorder.search("wall signs?"), recorder.search("awnings?")]
+
+    with gzip.open(path, "rt") as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry["op"] for entry in entries] == ["perplexity.search"] * 2
+    assert entries[0]["r"]["usage"]["total_tokens"] == 60
+
+    offline = Mock()
+    offline.post.side_effect = AssertionError("replay must not call upstream")
+    replayer = _perplexity(Cassette(path, "replay"), offline)
+    assert [replayer.search("wall signs?"), replayer.search("awnings?")] == recorded
+    assert replayer.telemetry.summary()["prompt_tokens"] == 100
+
+    entries[0]["ms"] = 1500
+    with gzip.open(path, "wt") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+    with patch("app.cassette.time.sleep") as mock_sleep:
+        _perplexity(Cassette(path, "replay", timing="original"), offline).search("wall signs?")
+    mock_sleep.assert_called_once_with(1.5)
+
+
+def test_extraction_replay_is_keyed_by_prompt_and_schema(tmp_path):
+    """
+    Test 2: LLM responses replay through the schema parser; an unrecorded
+    prompt fails immediately instead of calling the provider
+    """
+    path = str(tmp_path / "upstream.jsonl.gz")
+    parsed = LocationInformation.model_validate({"city": {"value": "Miami"}})
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=parsed.model_dump_json(), refusal=None))],
+        usage=SimpleNamespace(prompt_tokens=200, completion_tokens=40, total_tokens=240)
+    )
+    recorder = LLMClient(provider="openai", api_key="test", rate_limiter=ProviderLimiter("openai"), cassette=Cassette(path, "record"))
+    recorder.client = Mock()
+    recorder.client.chat.completions.create.return_value = completion
+    recorder.extract_data("Miami, FL research", LocationInformation)
+
+    replayer = LLMClient(
+        provider="openai",
+        api_key="test",
+        rate_limiter=ProviderLimiter("openai"),
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0),
+        cassette=Cassette(path, "replay")
+    )
+    replayer.client = Mock()
+    result = replayer.extract_data("Miami, FL research", LocationInformation)
+
+    assert result == parsed
+    with pytest.raises(CassetteMissError):
+        replayer.extract_data("Tampa, FL research", LocationInformation)
+    replayer.client.chat.completions.create.assert_not_called()
+
+
+async def test_async_replay_without_api_keys(tmp_path, monkeypatch):
+    """
+    Test 3: Replay works without API keys, and async clients share the cassette
+    """
+    from app.clients import AsyncPerplexityClient
+
+    path = str(tmp_path / "upstream.jsonl.gz")
+    session = Mock()
+    session.post.return_value = _perplexity_response("window signs: 25% of glass")
+    _perplexity(Cassette(path, "record"), session).search("window signs?")
+
+    monkeypatch.delenv("PERPLEXITY_API_KEY", raising=False)
+    client = AsyncPerplexityClient(rate_limiter=ProviderLimiter("perplexity"), cassette=Cassette(path, "replay"))
+
+    assert client.api_key == "replay"
+    assert (await client.search("window signs?"))["content"] == "window signs: 25% of glass"
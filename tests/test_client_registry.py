@@ -0,0 +1,97 @@
+"""
+Client Registry Tests
+
+Provider SDK clients and model handles shared across jobs (no network).
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.clients import AsyncLLMClient, ClientRegistry, LLMClient, close_async_http_client
+from app.models import WallSigns
+
+
+def test_openai_client_shared_per_key_across_threads_and_jobs(monkeypatch):
+    """
+    Test 1: Concurrent jobs get one SDK client per API key, each with its own telemetry
+    """
+    from app.agent import CodeCheckAgent
+
+    monkeypatch.setenv("OPENAI_API_KEY", "key-a")
+
+    registry = ClientRegistry()
+    clients = []
+    barrier = threading.Barrier(8)
+
+    def build():
+        barrier.wait()
+        clients.append(LLMClient(provider="openai", api_key="key-a", registry=registry).client)
+
+    threads = [threading.Thread(target=build) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in clients}) == 1
+    assert LLMClient(provider="openai", api_key="key-b", registry=registry).client is not clients[0]
+    assert len(registry) == 2
+
+    with patch("app.agent.fallback_provider", return_value=None), patch("app.agent.PerplexityClient"):
+        first = CodeCheckAgent(llm_provider="openai", cache=False, clients=registry)
+        second = CodeCheckAgent(llm_provider="openai", cache=False, clients=registry)
+    assert first.llm.client is second.llm.client
+    assert first.llm.telemetry is not second.llm.telemetry
+
+
+def test_gemini_model_handle_reused_between_extractions():
+    """
+    Test 2: extract_data() reuses one GenerativeModel instead of building one per call;
+    the process-global Gemini configuration refuses a second API key
+    """
+    genai = Mock()
+    genai.GenerativeModel.return_value.generate_content.return_value = SimpleNamespace(text="{}", usage_metadata=None)
+    registry = ClientRegistry()
+
+    with patch("app.clients._genai", return_value=genai), patch("app.clients._gemini_api_key", None):
+        for _ in range(3):
+            client = LLMClient(provider="gemini", api_key="gemini-key", registry=registry)
+            assert client.extract_data("Wall sign rules", WallSigns) == WallSigns()
+
+        with pytest.raises(ValueError, match="another API key"):
+            ClientRegistry().gemini_model("other-key", "gemini-1.5-pro-latest")
+
+    genai.configure.assert_called_once_with(api_key="gemini-key")
+    genai.GenerativeModel.assert_called_once_with("gemini-1.5-pro-latest")
+    assert genai.GenerativeModel.return_value.generate_content.call_count == 3
+
+
+def test_async_openai_client_shared_per_event_loop():
+    """
+    Test 3: Async clients are shared within an event loop, never across loops
+    """
+    registry = ClientRegistry()
+
+    async def job():
+        first = AsyncLLMClient(provider="openai", api_key="key-a", registry=registry).client
+        second = AsyncLLMClient(provider="openai", api_key="key-a", registry=registry).client
+        return first, second
+
+    first, second = asyncio.run(job())
+    other_loop, _ = asyncio.run(job())
+
+    assert first is second
+    assert other_loop is not first
+    # The first loop's client was pruned once that loop closed
+    assert len(registry) == 1
+
+    async def shutdown():
+        AsyncLLMClient(provider="openai", api_key="key-a", registry=registry)
+        with patch("app.clients.get_client_registry", return_value=registry):
+            await close_async_http_client()
+        return len(registry)
+
+    assert asyncio.run(shutdown()) == 0
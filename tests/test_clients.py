@@ -0,0 +1,79 @@
+"""
+Client Tests: Upstream API clients
+
+Unit tests for PerplexityClient and LLMClient with HTTP mocked.
+No API keys or network access required.
+"""
+import pytest
+from unittest.mock import Mock, patch
+
+
+def _perplexity_response(content="Sign code text", citations=None):
+    response = Mock()
+    response.raise_for_status.return_value = None
+    response.json.return_value = {
+        "choices": [{"message": {"content": content}}],
+        "citations": citations or []
+    }
+    return response
+
+
+def test_perplexity_clients_share_pooled_session():
+    """
+    Test 1: Every PerplexityClient in a process reuses one pooled session
+    """
+    from app.clients import PerplexityClient, get_http_session
+
+    first = PerplexityClient(api_key="test")
+    second = PerplexityClient(api_key="test")
+
+    assert first.session is second.session
+    assert first.session is get_http_session()
+
+
+def test_perplexity_search_uses_session_with_timeouts():
+    """
+    Test 2: search() goes through the session with connect/read timeouts set
+    """
+    from app.clients import PerplexityClient
+
+    session = Mock()
+    session.post.return_value = _perplexity_response("Wall signs allowed", ["https://example.gov"])
+    client = PerplexityClient(api_key="test", session=session, connect_timeout=3, read_timeout=30)
+
+    result = client.search("wall signs?")
+
+    assert result == {"content": "Wall signs allowed", "citations": ["https://example.gov"]}
+    assert session.post.call_args.kwargs["timeout"] == (3, 30)
+
+
+def test_pool_stats_reports_settings():
+    """
+    Test 3: Pool statistics expose pool size and per-host counters
+    """
+    from app.clients import PerplexityClient, HTTP_POOL_SIZE
+
+    stats = PerplexityClient(api_key="test").pool_stats()
+
+    assert stats["pool_size"] == HTTP_POOL_SIZE
+    assert isinstance(stats["hosts"], dict)
+
+
+def test_async_http_client_per_live_event_loop():
+    """
+    Test 4: Each event loop gets its own async HTTP client, and clients of
+    closed loops are dropped instead of piling up or being handed out again
+    """
+    import asyncio
+    from app import clients
+
+    async def client_for_loop():
+        first = clients.get_async_http_client()
+        assert clients.get_async_http_client() is first
+        return asyncio.get_running_loop(), first
+
+    first_loop, first = asyncio.run(client_for_loop())
+    second_loop, second = asyncio.run(client_for_loop())
+
+    assert second is not first
+    assert [loop for loop, _ in clients._async_http_clients.values()] == [second_loop]
@@ -0,0 +1,42 @@
+"""
+Cold Start Tests
+
+Importing the API must not load the upstream SDKs or connect to anything.
+"""
+import os
+import subprocess
+import sys
+
+from benchmarks.startup import probe
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_health_cold_start_skips_sdks():
+    """
+    Test 1: A fresh process serves /health without importing openai, genai,
+    supabase or smartsheet
+    """
+    result = probe("/health")
+
+    assert result["status"] == 200
+    assert result["heavy_modules"] == []
+
+
+def test_db_import_builds_no_client():
+    """
+    Test 2: app.db imports without Supabase settings; the client is built on first use
+    """
+    env = {key: value for key, value in os.environ.items() if not key.startswith("SUPABASE")}
+    code = (
+        "import sys, app.db\n"
+        "assert 'supabase' not in sys.modules\n"
+        "try:\n"
+        "    app.db.get_supabase_client()\n"
+        "except ValueError as e:\n"
+        "    print(e)\n"
+    )
+    completed = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+
+    assert completed.returncode == 0, completed.stderr
+    assert "SUPABASE_URL" in completed.stdout
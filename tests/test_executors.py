@@ -0,0 +1,229 @@
+"""
+Job Executor Tests
+
+Covers the local pool backend and dispatch failure handling without
+Modal or a database.
+"""
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.executors import LocalExecutor, create_job_executor
+
+
+class FakeQueue:
+    """In-memory stand-in for JobQueue."""
+
+    worker_id = "test-worker"
+    heartbeat_interval = 0
+
+    def __init__(self, jobs):
+        self.pending = list(jobs)
+        self.heartbeats = []
+
+    def claim(self):
+        return self.pending.pop(0) if self.pending else None
+
+    def heartbeat(self, job_ids):
+        self.heartbeats.append(sorted(job_ids))
+        return job_ids
+
+    def requeue_expired(self):
+        return []
+
+
+def _job(job_id, **fields):
+    return {"id": job_id, "address": f"{job_id} Main St", "llm_provider": "openai", "attempts": 1, **fields}
+
+
+def _wait_idle(executor):
+    deadline = time.time() + 5
+    while executor.in_flight() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_local_executor_bounds_concurrency():
+    """
+    Test 1: Claims stop at max_workers + queue_depth and no more than
+    max_workers jobs run at once
+    """
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def fake_run(job_id, address, llm_provider, resume):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        release.wait(5)
+        with lock:
+            running -= 1
+        return {"status": "completed", "job_id": job_id}
+
+    queue = FakeQueue([_job(f"job-{i}") for i in range(5)])
+    executor = LocalExecutor(max_workers=2, queue_depth=1, poll_interval=0, queue=queue)
+    with patch('app.executors._run_job', side_effect=fake_run) as run:
+        assert executor.poll_once() == 3
+        assert len(queue.pending) == 2
+
+        release.set()
+        _wait_idle(executor)
+        assert executor.poll_once() == 2
+        _wait_idle(executor)
+        executor.stop()
+
+    assert run.call_count == 5
+    assert peak == 2
+
+
+def test_local_executor_resumes_interrupted_jobs_and_heartbeats():
+    """
+    Test 2: Jobs claimed again after an interruption run with resume=True
+    (a first claim, which also sets started_at, doesn't), and running jobs
+    are heartbeated
+    """
+    release = threading.Event()
+    queue = FakeQueue([
+        _job("fresh", started_at="2025-01-01T00:00:00"),
+        _job("requeued", attempts=2, started_at="2025-01-01T00:00:00"),
+    ])
+    executor = LocalExecutor(max_workers=2, queue_depth=0, poll_interval=0, queue=queue)
+
+    with patch('app.executors._run_job', side_effect=lambda *args: release.wait(5)) as run:
+        # submit() claims inline when the background poller isn't running
+        assert executor.submit("fresh", "fresh Main St", "openai")
+        executor.poll_once()
+        assert queue.heartbeats[-1] == ["fresh", "requeued"]
+        release.set()
+        _wait_idle(executor)
+        executor.stop()
+
+    assert sorted(call[0] for call in run.call_args_list) == [
+        ("fresh", "fresh Main St", "openai", False),
+        ("requeued", "requeued Main St", "openai", True),
+    ]
+
+
+@patch('app.job_routes.JobDB')
+@patch('app.job_routes.get_job_executor')
+def test_dispatch_failure_marks_job_failed(mock_get_executor, mock_job_db):
+    """
+    Test 3: A job the executor can't take is failed instead of left pending
+    """
+    from app.job_routes import dispatch_job
+
+    mock_get_executor.return_value = Mock(submit=Mock(return_value=False))
+    mock_get_executor.return_value.name = "modal"
+    mock_job_db.update_job.return_value = {"id": "job-1", "status": "failed"}
+    job = {"id": "job-1", "address": "1 First St", "llm_provider": "openai", "status": "pending"}
+
+    result = dispatch_job(job)
+
+    assert result["status"] == "failed"
+    kwargs = mock_job_db.update_job.call_args[1]
+    assert kwargs["status"] == "failed"
+    assert "modal" in kwargs["error_message"]
+
+
+def test_create_job_executor_rejects_unknown_backend():
+    """
+    Test 4: Unknown JOB_EXECUTOR values fail loudly
+    """
+    assert create_job_executor("local").name == "local"
+    assert create_job_executor("Modal").name == "modal"
+    with pytest.raises(ValueError):
+        create_job_executor("celery")
+
+
+@patch('app.job_queue.JobDB')
+def test_job_queue_calls_lease_functions(mock_job_db):
+    """
+    Test 5: JobQueue maps claim/heartbeat/requeue onto the migration 004 functions
+    """
+    from app.job_queue import JobQueue
+
+    client = mock_job_db._get_client.return_value
+    client.rpc.return_value.execute.return_value = Mock(data=[{"id": "job-1", "attempts": 1}])
+    queue = JobQueue(worker_id="host:1:abc", lease_seconds=30, max_attempts=2)
+
+    assert queue.claim()["id"] == "job-1"
+    client.rpc.assert_called_with("claim_code_research_job", {"worker_id": "host:1:abc", "lease_seconds": 30})
+
+    client.rpc.return_value.execute.return_value = Mock(data=["job-1"])
+    assert queue.heartbeat(["job-1", "job-2"]) == ["job-1"]
+    assert client.rpc.call_args[0][0] == "heartbeat_code_research_jobs"
+    assert queue.heartbeat([]) == []
+
+    client.rpc.return_value.execute.return_value = Mock(data=[])
+    assert queue.claim() is None
+    assert queue.heartbeat_interval == 10
+
+
+@patch('app.job_routes.dispatch_job', side_effect=lambda job, resume=False: job)
+@patch('app.job_routes.JobDB')
+async def test_timed_out_processing_job_can_be_resumed(mock_job_db, mock_dispatch):
+    """
+    Test 6: A processing job whose worker is gone (lease expired, or killed at
+    its timeout before leasing) can be resumed; a live one can't
+    """
+    from datetime import datetime, timedelta, timezone
+    from fastapi import HTTPException
+    from app.job_queue import JobQueue
+    from app.job_routes import resume_job
+
+    now = datetime.now(timezone.utc)
+    ago = lambda seconds: (now - timedelta(seconds=seconds)).isoformat()
+    job = {"id": "job-1", "address": "1 First St", "llm_provider": "openai", "created_at": ago(700)}
+
+    assert JobQueue.is_stale({**job, "status": "processing", "lease_expires_at": ago(5)})
+    assert JobQueue.is_stale({**job, "status": "processing", "started_at": (now - timedelta(seconds=700)).replace(tzinfo=None).isoformat()})
+    assert not JobQueue.is_stale({**job, "status": "processing", "lease_expires_at": ago(-30), "started_at": ago(700)})
+    assert not JobQueue.is_stale({**job, "status": "processing", "started_at": ago(60)})
+    assert not JobQueue.is_stale({**job, "status": "completed", "started_at": ago(700)})
+
+    mock_job_db.get_job.return_value = {**job, "status": "processing", "started_at": ago(60)}
+    with pytest.raises(HTTPException) as error:
+        await resume_job("job-1")
+    assert error.value.status_code == 409
+
+    mock_job_db.get_job.return_value = {**job, "status": "processing", "started_at": ago(700)}
+    mock_job_db.update_job.return_value = {**job, "status": "pending"}
+    response = await resume_job("job-1")
+
+    assert response.status == "pending"
+    assert mock_job_db.update_job.call_args[1]["lease_owner"] is None
+    assert mock_dispatch.call_args[1] == {"resume": True}
+
+
+def test_recover_requeues_and_dispatches_expired_jobs():
+    """
+    Test 7: recover() requeues jobs whose lease expired and hands them to the
+    backend again; jobs out of attempts are failed instead
+    """
+    from datetime import datetime, timedelta, timezone
+    from app.executors import ModalExecutor
+    from app.job_queue import JobQueue
+    from benchmarks.fakes import FakeSupabase
+
+    db = FakeSupabase()
+    expired = (datetime.now(timezone.utc) - timedelta(seconds=5)).isoformat()
+    live = (datetime.now(timezone.utc) + timedelta(seconds=60)).isoformat()
+    db.table("code_research_jobs").insert([
+        {"id": "dead", "address": "1 Main St", "llm_provider": "openai", "status": "processing", "attempts": 1, "lease_expires_at": expired},
+        {"id": "exhausted", "address": "2 Main St", "llm_provider": "openai", "status": "processing", "attempts": 3, "lease_expires_at": expired},
+        {"id": "running", "address": "3 Main St", "llm_provider": "openai", "status": "processing", "attempts": 1, "lease_expires_at": live},
+    ]).execute()
+    executor = ModalExecutor()
+
+    with patch('app.job_queue.JobDB._get_client', return_value=db), \
+         patch.object(executor, 'submit_many', return_value=[]) as submit_many:
+        assert executor.recover(JobQueue(max_attempts=3)) == 1
+        assert executor.recover(JobQueue(max_attempts=3)) == 0
+
+    assert [job["id"] for job in submit_many.call_args[0][0]] == ["dead"]
+    statuses = {job["id"]: job["status"] for job in db.rows("code_research_jobs")}
+    assert statuses == {"dead": "pending", "exhausted": "failed", "running": "processing"}
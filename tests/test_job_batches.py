@@ -0,0 +1,134 @@
+"""
+Batch Job Submission Tests
+
+POST /jobs/batch and GET /jobs/batch/{batch_id} against a mocked JobDB.
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+
+from app import job_routes
+from app.db import JobDB
+
+HEADERS = {"X-API-Key": "test-key"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("API_KEY", "test-key")
+    app = FastAPI()
+    app.include_router(job_routes.router)
+    return TestClient(app)
+
+
+def _job(job_id, address, dedupe_key, status="pending"):
+    return {
+        "id": job_id, "address": address, "llm_provider": "openai",
+        "status": status, "dedupe_key": dedupe_key, "created_at": "2025-01-01T00:00:00Z"
+    }
+
+
+@patch('app.job_routes.get_job_executor')
+@patch('app.job_routes.JobDB')
+def test_batch_creates_distinct_jobs_and_dispatches_once(mock_job_db, mock_get_executor, client):
+    """
+    Test 1: Duplicate addresses share a job, in-flight jobs are attached,
+    and new jobs are created and dispatched in bulk
+    """
+    def create_or_attach_jobs(jobs, llm_provider):
+        return [
+            (_job("existing", address, key, "processing"), False) if address.startswith("9")
+            else (_job(f"new-{i}", address, key), True)
+            for i, (address, key) in enumerate(jobs)
+        ]
+
+    mock_job_db.create_or_attach_jobs.side_effect = create_or_attach_jobs
+    mock_job_db.create_batch.return_value = {"id": "batch-1", "created_at": "2025-01-01T00:00:00Z"}
+    mock_get_executor.return_value.submit_batch.return_value = True
+
+    response = client.post("/jobs/batch", headers=HEADERS, json={"addresses": [
+        "123 Main St, Miami, FL",
+        "123 Main Street, Miami, Florida",
+        "9 Ocean Dr, Miami, FL",
+        "45 Oak Ave, Austin, TX",
+    ]})
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["batch_id"] == "batch-1"
+    assert body["total_addresses"] == 4
+    assert body["total_jobs"] == 3
+    assert body["jobs_created"] == 2
+    assert body["jobs_deduplicated"] == 2
+    assert [item["job_id"] for item in body["jobs"]] == ["new-0", "new-0", "existing", "new-2"]
+
+    # One bulk create, one batch row, one scheduler dispatch of the new jobs only
+    assert len(mock_job_db.create_or_attach_jobs.call_args[0][0]) == 3
+    assert mock_job_db.create_batch.call_args[1]["job_ids"] == ["new-0", "existing", "new-2"]
+    mock_get_executor.return_value.submit_batch.assert_called_once_with(["new-0", "new-2"], "openai")
+    mock_get_executor.return_value.submit_many.assert_not_called()
+
+
+@patch('app.job_routes.get_job_executor')
+def test_dispatch_batch_falls_back_to_per_job_dispatch(mock_get_executor):
+    """
+    Test 1b: Executors without batch support get the jobs individually
+    """
+    executor = mock_get_executor.return_value
+    executor.submit_batch.return_value = False
+    executor.submit_many.return_value = []
+    jobs = [_job("a", "1 A St", "k1"), _job("b", "2 B St", "k2")]
+
+    assert job_routes.dispatch_batch(jobs, "openai") == []
+    executor.submit_many.assert_called_once_with(jobs)
+
+
+def test_batch_rejects_invalid_addresses(client):
+    """
+    Test 2: Empty batches and too-short addresses are rejected
+    """
+    assert client.post("/jobs/batch", headers=HEADERS, json={"addresses": []}).status_code == 422
+    assert client.post("/jobs/batch", headers=HEADERS, json={"addresses": ["123 Main St", " "]}).status_code == 422
+
+
+@patch('app.job_routes.JobDB')
+def test_batch_progress_aggregates_job_statuses(mock_job_db, client):
+    """
+    Test 3: GET /jobs/batch/{id} reports counts per status
+    """
+    mock_job_db.get_batch.return_value = {
+        "id": "batch-1", "llm_provider": "openai", "total_addresses": 5,
+        "total_jobs": 4, "created_at": "2025-01-01T00:00:00Z"
+    }
+    mock_job_db.get_batch_progress.return_value = {"completed": 2, "failed": 1, "processing": 1}
+
+    body = client.get("/jobs/batch/batch-1", headers=HEADERS).json()
+
+    assert body["status"] == "processing"
+    assert body["progress"] == "3/4 jobs finished"
+    assert body["jobs_by_status"]["completed"] == 2
+
+    mock_job_db.get_batch_progress.return_value = {"completed": 4}
+    assert client.get("/jobs/batch/batch-1", headers=HEADERS).json()["status"] == "completed"
+
+    mock_job_db.get_batch.return_value = None
+    assert client.get("/jobs/batch/missing", headers=HEADERS).status_code == 404
+
+
+def test_create_or_attach_jobs_falls_back_on_race():
+    """
+    Test 4: A bulk insert that hits an in-flight dedupe key is retried per row
+    """
+    jobs = [("1 A St", "openai:1 a st"), ("2 B St", "openai:2 b st")]
+    conflict = APIError({"code": "23505", "message": "duplicate key"})
+
+    with patch.object(JobDB, "get_active_jobs_by_dedupe_keys", return_value={}), \
+         patch.object(JobDB, "create_jobs", side_effect=conflict), \
+         patch.object(JobDB, "create_or_attach_job", side_effect=lambda address, provider, key: (_job(key, address, key), True)) as single:
+        results = JobDB.create_or_attach_jobs(jobs, "openai")
+
+    assert single.call_count == 2
+    assert [job["id"] for job, _ in results] == ["openai:1 a st", "openai:2 b st"]
@@ -0,0 +1,150 @@
+"""
+Event Stream Tests: Job progress change feed
+
+Unit tests for the shared JobEventBroker behind GET /jobs/{job_id}/events.
+JobDB is mocked; no Supabase required.
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+
+
+def _job(status="processing", progress="0/13 sections"):
+    return {"id": "job-1", "status": status, "progress": progress}
+
+
+def _result(result_id, section_name, created_at):
+    return {
+        "id": result_id,
+        "job_id": "job-1",
+        "section_name": section_name,
+        "section_data": {"value": section_name},
+        "created_at": created_at
+    }
+
+
+def _drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+@pytest.mark.asyncio
+@patch('app.job_events.JobDB')
+async def test_subscribers_share_one_poll(mock_job_db):
+    """
+    Test 1: Many watchers of a job cost one jobs query and one results query per tick
+    """
+    from app.job_events import JobEventBroker
+
+    mock_job_db.get_job.return_value = _job()
+    mock_job_db.get_job_results.return_value = []
+    broker = JobEventBroker(poll_interval=3600)
+
+    queues = [await broker.subscribe("job-1") for _ in range(50)]
+    assert mock_job_db.get_job.call_count == 1
+    for queue in queues:
+        assert [event for event, _ in _drain(queue)] == ["status"]
+
+    mock_job_db.get_jobs.return_value = [_job(progress="1/13 sections")]
+    mock_job_db.get_results_since.return_value = [_result("r1", "location_information", "2024-01-01T00:00:01")]
+    await broker._poll()
+
+    assert mock_job_db.get_jobs.call_count == 1
+    assert mock_job_db.get_results_since.call_count == 1
+    mock_job_db.get_results_since.assert_called_with({"job-1": None})
+    for queue in queues:
+        events = [event for event, _ in _drain(queue)]
+        assert events == ["section", "status"]
+
+
+@pytest.mark.asyncio
+@patch('app.job_events.JobDB')
+async def test_late_subscriber_gets_replay_and_done(mock_job_db):
+    """
+    Test 2: A subscriber joining a finished job gets its state, sections and a final done event
+    """
+    from app.job_events import JobEventBroker
+
+    mock_job_db.get_job.return_value = _job(status="completed", progress="13/13 sections")
+    mock_job_db.get_job_results.return_value = [_result("r1", "wall_signs", "2024-01-01T00:00:01")]
+    broker = JobEventBroker(poll_interval=3600)
+
+    queue = await broker.subscribe("job-1")
+    events = _drain(queue)
+
+    assert [event for event, _ in events] == ["status", "section", "done"]
+    assert events[1][1]["section_name"] == "wall_signs"
+
+    broker.unsubscribe("job-1", queue)
+    assert broker.watcher_count() == 0
+
+
+@pytest.mark.asyncio
+@patch('app.job_events.JobDB')
+async def test_unknown_job_returns_none(mock_job_db):
+    """
+    Test 3: Subscribing to a missing job returns None (404 at the route)
+    """
+    from app.job_events import JobEventBroker
+
+    mock_job_db.get_job.return_value = None
+
+    assert await JobEventBroker().subscribe("missing") is None
+
+
+def test_format_sse():
+    """
+    Test 4: Events are encoded in the text/event-stream wire format
+    """
+    from app.job_events import format_sse
+
+    assert format_sse("status", {"status": "processing"}) == 'event: status\ndata: {"status": "processing"}\n\n'
+
+
+@pytest.mark.asyncio
+@patch('app.job_events.JobDB')
+async def test_poll_reads_each_job_from_its_own_cursor(mock_job_db):
+    """
+    Test 5: A newly watched job doesn't make the poll re-read other jobs' sections
+    """
+    from app.job_events import JobEventBroker
+
+    broker = JobEventBroker(poll_interval=3600)
+    mock_job_db.get_job.side_effect = lambda job_id: dict(_job(), id=job_id)
+    mock_job_db.get_job_results.side_effect = lambda job_id: [_result("r1", "wall_signs", "2024-01-01T00:00:05")] if job_id == "job-1" else []
+    await broker.subscribe("job-1")
+    await broker.subscribe("job-2")
+
+    mock_job_db.get_jobs.return_value = []
+    mock_job_db.get_results_since.return_value = []
+    await broker._poll()
+
+    mock_job_db.get_results_since.assert_called_once_with({"job-1": "2024-01-01T00:00:05", "job-2": None})
+
+
+def test_results_since_queries_chunk_per_job_cursors():
+    """
+    Test 6: JobDB reads unread jobs with chunked in_() filters and the others
+    from their cursors with chunked or_() filters
+    """
+    from app.db import IN_FILTER_CHUNK, JobDB
+
+    client = MagicMock()
+    query = client.table.return_value.select.return_value
+    query.in_.return_value.execute.return_value.data = [{"id": "a", "created_at": "2024-01-01T00:00:02"}]
+    query.or_.return_value.execute.return_value.data = [{"id": "b", "created_at": "2024-01-01T00:00:01"}]
+    cursors = {f"new-{i}": None for i in range(IN_FILTER_CHUNK + 1)}
+    cursors.update({f"old-{i}": "2024-01-01T00:00:00+00:00" for i in range(IN_FILTER_CHUNK)})
+
+    with patch.object(JobDB, "_get_client", return_value=client):
+        results = JobDB.get_results_since(cursors)
+        jobs = JobDB.get_jobs([f"job-{i}" for i in range(IN_FILTER_CHUNK * 2 + 1)])
+
+    # get_jobs' in_() is chunked the same way
+    assert query.in_.call_count == 2 + 3
+    assert query.or_.call_count == 2
+    assert 'and(job_id.eq.old-0,created_at.gte."2024-01-01T00:00:00+00:00")' in query.or_.call_args_list[0].args[0]
+    assert [result["created_at"] for result in results] == sorted(result["created_at"] for result in results)
+    assert len(jobs) == 3
+
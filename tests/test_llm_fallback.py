@@ -0,0 +1,183 @@
+"""
+Multi-Provider Extraction Tests
+
+Hedging slow calls, falling back on failures and recording the serving
+provider, with fake LLM clients (no network).
+"""
+import asyncio
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.clients import (
+    AsyncMultiProviderLLMClient,
+    MultiProviderLLMClient,
+    get_provider_health,
+    served_provider,
+)
+from app.models import WallSigns
+from app.retry import UpstreamServerError
+
+
+class FakeLLM:
+    def __init__(self, provider, delay=0.0, fail=False):
+        self.provider = provider
+        self.api_key = "test"
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def extract_data(self, content, schema, system_instructions="", cancel=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise UpstreamServerError(f"{self.provider} down", self.provider, 503)
+        return schema()
+
+
+class AsyncFakeLLM(FakeLLM):
+    async def extract_data(self, content, schema, system_instructions=""):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise UpstreamServerError(f"{self.provider} down", self.provider, 503)
+        return schema()
+
+
+@pytest.fixture(autouse=True)
+def fresh_health():
+    with patch("app.clients._provider_health", {}):
+        yield
+
+
+@patch("app.clients.LLM_HEDGE_DEFAULT_DELAY", 0.05)
+def test_slow_primary_is_hedged():
+    """
+    Test 1: A call slower than the hedge delay is raced against the other provider
+    """
+    openai, gemini = FakeLLM("openai", delay=0.5), FakeLLM("gemini")
+    client = MultiProviderLLMClient([openai, gemini])
+
+    start = time.monotonic()
+    assert isinstance(client.extract_data("text", WallSigns), WallSigns)
+
+    assert time.monotonic() - start < 0.4
+    assert served_provider() == "gemini"
+    assert (openai.calls, gemini.calls) == (1, 1)
+
+
+@patch("app.clients.LLM_HEDGE_DEFAULT_DELAY", 5)
+def test_fast_primary_is_not_hedged():
+    """
+    Test 2: No duplicate request when the primary answers in time
+    """
+    openai, gemini = FakeLLM("openai"), FakeLLM("gemini")
+
+    MultiProviderLLMClient([openai, gemini]).extract_data("text", WallSigns)
+
+    assert served_provider() == "openai"
+    assert gemini.calls == 0
+    assert get_provider_health("openai").hedge_delay() == 5
+
+
+@patch("app.clients.LLM_FAILURE_THRESHOLD", 2)
+def test_failing_provider_falls_back_and_is_demoted():
+    """
+    Test 3: A failed call falls back; repeated failures move the provider to
+    the back of the line
+    """
+    openai, gemini = FakeLLM("openai", fail=True), FakeLLM("gemini")
+    client = MultiProviderLLMClient([openai, gemini])
+
+    for _ in range(2):
+        client.extract_data("text", WallSigns)
+        assert served_provider() == "gemini"
+    assert openai.calls == 2
+    assert not get_provider_health("openai").healthy()
+
+    client.extract_data("text", WallSigns)
+    assert openai.calls == 2
+
+    gemini.fail = True
+    with pytest.raises(UpstreamServerError, match="gemini down"):
+        client.extract_data("text", WallSigns)
+
+
+@patch("app.clients.LLM_HEDGE_DEFAULT_DELAY", 0.05)
+async def test_async_hedge_cancels_loser():
+    """
+    Test 4: The async client takes the first answer and cancels the other request
+    """
+    openai, gemini = AsyncFakeLLM("openai", delay=5), AsyncFakeLLM("gemini")
+    client = AsyncMultiProviderLLMClient([openai, gemini])
+
+    start = time.monotonic()
+    await client.extract_data("text", WallSigns)
+
+    assert time.monotonic() - start < 1
+    assert served_provider() == "gemini"
+
+
+def test_agent_records_serving_provider():
+    """
+    Test 5: The agent wraps its LLM client when a fallback is configured and
+    records which provider served each section
+    """
+    from app.agent import CodeCheckAgent
+
+    with patch("app.agent.PerplexityClient") as mock_pplx, \
+         patch("app.agent.LLMClient", side_effect=[FakeLLM("openai", fail=True), FakeLLM("gemini")]), \
+         patch("app.agent.fallback_provider", return_value="gemini"):
+        mock_pplx.return_value.search.return_value = {"content": "rules", "citations": []}
+        agent = CodeCheckAgent(llm_provider="openai", cache=False)
+        agent.run("1 Main St", field_names=["wall_signs"])
+
+    assert isinstance(agent.llm, MultiProviderLLMClient)
+    assert agent.section_providers == {"location_information": "gemini", "wall_signs": "gemini"}
+
+
+def test_fallback_is_opt_in(monkeypatch):
+    """
+    Test 6: A second provider's key alone doesn't enable hedging; 'auto' does
+    """
+    from app.clients import fallback_provider
+
+    monkeypatch.setenv("GEMINI_API_KEY", "gemini-key")
+    assert fallback_provider("openai") is None
+    with patch("app.clients.LLM_FALLBACK_PROVIDER", "auto"):
+        assert fallback_provider("openai") == "gemini"
+
+
+@patch("app.clients.LLM_HEDGE_DEFAULT_DELAY", 0.05)
+def test_sync_hedge_loser_stops_retrying():
+    """
+    Test 7: Once the hedge wins, the slow provider's failing call isn't
+    retried, so it spends no retry budget or rate-limit tokens
+    """
+    from app.clients import LLMClient
+    from app.retry import RetryBudget, RetryPolicy
+
+    budget = RetryBudget(10)
+    slow = LLMClient(
+        "openai",
+        api_key="test",
+        registry=Mock(),
+        rate_limiter=Mock(),
+        retry_policy=RetryPolicy(max_attempts=5, base_delay=0.1, max_delay=0.1),
+        retry_budget=budget
+    )
+    attempts = []
+
+    def fail_slowly(prompt, schema, call):
+        attempts.append(prompt)
+        time.sleep(0.2)
+        raise UpstreamServerError("openai down", "openai", 503)
+
+    with patch.object(slow, "_extract_once", side_effect=fail_slowly):
+        MultiProviderLLMClient([slow, FakeLLM("gemini")]).extract_data("text", WallSigns)
+        assert served_provider() == "gemini"
+        time.sleep(0.5)
+
+    assert len(attempts) == 1
+    assert budget.used == 0
@@ -0,0 +1,180 @@
+"""
+Metrics Tests
+
+Prometheus rendering, request/DB instrumentation and worker snapshots
+(no network).
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.metrics import (
+    MetricsRegistry,
+    get_metrics_registry,
+    record_request_metrics,
+    render_metrics,
+    render_prometheus,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    get_metrics_registry().clear()
+    with patch("app.metrics._pushed", None), patch("app.metrics._folded", None):
+        yield
+    get_metrics_registry().clear()
+
+
+def _series(registry, name):
+    snapshot = registry.snapshot()
+    return {tuple(sorted(labels.items())): value for metric, labels, value in snapshot["counters"] + snapshot["histograms"] if metric == name}
+
+
+def test_render_prometheus_text_format():
+    """
+    Test 1: Counters, cumulative histogram buckets and gauges in exposition format
+    """
+    registry = MetricsRegistry()
+    registry.inc("worker_jobs_total", {"status": "completed"}, 3)
+    registry.observe("worker_job_duration_seconds", 0.2, buckets=(0.1, 1))
+    registry.observe("worker_job_duration_seconds", 5, buckets=(0.1, 1))
+
+    text = render_prometheus(registry.snapshot(), [("jobs", {"status": 'we"ird'}, 2)])
+
+    assert "# TYPE code_research_worker_jobs_total counter" in text
+    assert 'code_research_worker_jobs_total{status="completed"} 3' in text
+    assert 'code_research_worker_job_duration_seconds_bucket{le="0.1"} 0' in text
+    assert 'code_research_worker_job_duration_seconds_bucket{le="1"} 1' in text
+    assert 'code_research_worker_job_duration_seconds_bucket{le="+Inf"} 2' in text
+    assert "code_research_worker_job_duration_seconds_count 2" in text
+    assert 'code_research_jobs{status="we\\"ird"} 2' in text
+
+
+def test_request_and_db_timings_recorded():
+    """
+    Test 2: The middleware labels requests by route template; JobDB calls are timed
+    """
+    app = FastAPI()
+    app.middleware("http")(record_request_metrics)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+
+    requests = _series(get_metrics_registry(), "http_request_duration_seconds")
+    labels = (("method", "GET"), ("route", "/items/{item_id}"), ("status", "200"))
+    assert requests[labels]["count"] == 2
+
+    from app.db import JobDB
+    with patch.object(JobDB, "_get_client") as mock_client:
+        mock_client.return_value.table.return_value.select.return_value.eq.return_value.execute.return_value = Mock(data=[])
+        assert JobDB.get_job("missing") is None
+        mock_client.side_effect = RuntimeError("down")
+        with pytest.raises(RuntimeError):
+            JobDB.get_job("missing")
+
+    assert _series(get_metrics_registry(), "db_query_duration_seconds")[(("operation", "get_job"),)]["count"] == 2
+    assert _series(get_metrics_registry(), "db_errors_total")[(("operation", "get_job"),)] == 1
+
+
+@patch('app.executors.get_job_executor')
+@patch('app.db.JobDB')
+def test_render_metrics_sums_worker_snapshots(mock_job_db, mock_get_executor):
+    """
+    Test 3: /metrics adds pushed worker snapshots to what this process hasn't
+    pushed yet, plus job, queue and cache gauges
+    """
+    from app.metrics import _worker_id, push_worker_metrics
+
+    worker = MetricsRegistry()
+    worker.inc("worker_jobs_total", {"status": "completed"}, 5)
+    worker.inc("cache_requests_total", {"kind": "section", "result": "hit"}, 3)
+    worker.inc("cache_requests_total", {"kind": "section", "result": "miss"}, 1)
+    get_metrics_registry().inc("worker_jobs_total", {"status": "completed"}, 1)
+    assert push_worker_metrics()
+    own_row = mock_job_db.save_worker_metrics.call_args[0][1]
+    get_metrics_registry().inc("worker_jobs_total", {"status": "completed"}, 1)
+    mock_job_db.list_worker_metrics.return_value = [
+        {"worker_id": "modal-1", "snapshot": worker.snapshot(), "updated_at": datetime.now(timezone.utc).isoformat()},
+        {"worker_id": _worker_id(), "snapshot": own_row, "updated_at": datetime.now(timezone.utc).isoformat()},
+    ]
+    mock_job_db.count_jobs_by_status.return_value = {"pending": 4, "completed": 10}
+    mock_get_executor.return_value = Mock(spec=["in_flight"], in_flight=Mock(return_value=1))
+
+    text = render_metrics()
+
+    assert 'code_research_worker_jobs_total{status="completed"} 7' in text
+    assert "code_research_workers_reporting 1" in text
+    assert 'code_research_jobs{status="pending"} 4' in text
+    assert "code_research_queue_depth 4" in text
+    assert "code_research_executor_in_flight 1" in text
+    assert 'code_research_cache_hit_ratio{kind="section"} 0.75' in text
+
+
+@patch('app.agent.CodeCheckAgent')
+@patch('app.db.JobDB')
+def test_worker_pushes_snapshot_after_job(mock_job_db, mock_agent_class):
+    """
+    Test 4: A worker counts the finished job and pushes its snapshot
+    """
+    from app.worker_logic import process_research_job
+
+    mock_agent_class.return_value.run.side_effect = Exception("Research failed!")
+
+    process_research_job("job-1", "123 Main St", "openai", claimed=True)
+
+    worker_id, snapshot = mock_job_db.save_worker_metrics.call_args[0]
+    assert worker_id
+    assert ["worker_jobs_total", {"status": "failed"}, 1.0] in snapshot["counters"]
+
+
+@patch('app.executors.get_job_executor')
+@patch('app.db.JobDB')
+def test_expired_snapshots_fold_without_counters_dropping(mock_job_db, mock_get_executor):
+    """
+    Test 5: Rows past METRICS_WORKER_TTL_SECONDS fold into the aggregate row;
+    a process whose row was folded pushes only what it counted since
+    """
+    from app.metrics import FOLDED_WORKER_ID, _worker_id, push_worker_metrics
+
+    def row(worker_id, completed, age_seconds):
+        snapshot = MetricsRegistry()
+        snapshot.inc("worker_jobs_total", {"status": "completed"}, completed)
+        updated_at = datetime.now(timezone.utc) - timedelta(seconds=age_seconds)
+        return {"worker_id": worker_id, "snapshot": snapshot.snapshot(), "updated_at": updated_at.isoformat()}
+
+    aggregate = row(FOLDED_WORKER_ID, 10, 7200)
+    mock_job_db.list_worker_metrics.return_value = [aggregate, row("modal-1", 5, 7200), row("modal-2", 3, 0)]
+    mock_job_db.count_jobs_by_status.return_value = {}
+    mock_get_executor.return_value = Mock(spec=[])
+
+    assert 'code_research_worker_jobs_total{status="completed"} 18' in render_metrics()
+    worker_ids, _, folded, folded_updated_at = mock_job_db.fold_worker_metrics.call_args[0]
+    assert worker_ids == ["modal-1"]
+    assert folded["counters"] == [["worker_jobs_total", {"status": "completed"}, 15.0]]
+    assert folded_updated_at == aggregate["updated_at"]
+
+    # After the fold: same total from two rows
+    mock_job_db.list_worker_metrics.return_value = [dict(aggregate, snapshot=folded), row("modal-2", 3, 0)]
+    assert 'code_research_worker_jobs_total{status="completed"} 18' in render_metrics()
+
+    # This process pushed 2, went idle and its row was folded; it then counts 1 more
+    get_metrics_registry().inc("worker_jobs_total", {"status": "completed"}, 2)
+    push_worker_metrics()
+    get_metrics_registry().inc("worker_jobs_total", {"status": "completed"}, 1)
+    mock_job_db.update_worker_metrics.return_value = False
+    push_worker_metrics()
+
+    worker_id, snapshot = mock_job_db.save_worker_metrics.call_args[0]
+    assert worker_id == _worker_id()
+    assert [counter for counter in snapshot["counters"] if counter[0] == "worker_jobs_total"] == [
+        ["worker_jobs_total", {"status": "completed"}, 1.0]
+    ]
+
@@ -4,11 +4,21 @@ Phase 3 Tests: Modal Worker Logic
 Tests the worker logic that processes jobs.
 These are unit tests that don't require Modal to be running.
 """
+import time
+
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime
 
 
+@pytest.fixture(autouse=True)
+def leased_jobs():
+    """The worker claims its job before running it; every job is claimable here."""
+    with patch('app.job_queue.JobQueue.claim_jobs', side_effect=lambda job_ids: [{"id": job_id, "attempts": 1} for job_id in job_ids]), \
+         patch('app.job_queue.JobQueue.heartbeat', side_effect=lambda job_ids: list(job_ids)):
+        yield
+
+
 def test_worker_logic_imports():
     """
     Test 1: Verify worker logic module can be imported
@@ -71,8 +81,11 @@ def test_worker_runs_code_check_agent(mock_job_db, mock_agent_class):
     process_research_job("test-job-456", "456 Oak Ave", "gemini")
     
     # Verify agent initialized and run
-    mock_agent_class.assert_called_once_with(llm_provider="gemini")
-    mock_agent.run.assert_called_once_with("456 Oak Ave")
+    from app.clients import get_client_registry
+    mock_agent_class.assert_called_once_with(llm_provider="gemini", clients=get_client_registry())
+    mock_agent.run.assert_called_once()
+    assert mock_agent.run.call_args[0][0] == "456 Oak Ave"
+    assert callable(mock_agent.run.call_args[1]["on_section"])
 
 
 @patch('app.agent.CodeCheckAgent')
@@ -82,7 +95,7 @@ def test_worker_saves_section_results(mock_job_db, mock_agent_class):
     Test 4: Worker saves section results to database
     
     RED phase: Will fail - sections not saved
-    GREEN phase: Each section saved via JobDB.save_section_result()
+    GREEN phase: Each section saved via JobDB.save_section_results()
     """
     from app.worker_logic import process_research_job
     
@@ -104,11 +117,11 @@ def test_worker_saves_section_results(mock_job_db, mock_agent_class):
     result = process_research_job("test-job-789", "789 Elm St", "openai")
     
     # Verify sections saved
-    assert mock_job_db.save_section_result.call_count >= 2
+    calls = mock_job_db.save_section_results.call_args_list
+    section_names = [name for call in calls for name in call[0][1]]
+    assert len(section_names) >= 2
     
     # Check specific section saves
-    calls = mock_job_db.save_section_result.call_args_list
-    section_names = [call[1]['section_name'] for call in calls]
     assert "location_information" in section_names
     assert "wall_signs" in section_names
     
@@ -175,6 +188,7 @@ def test_worker_handles_agent_failure(mock_job_db, mock_agent_class):
     assert len(failed_call) > 0, "Job status never updated to 'failed'"
 
 
+@patch('app.db.DB_WRITE_BATCH_SIZE', 1)
 @patch('app.agent.CodeCheckAgent')
 @patch('app.db.JobDB')
 def test_worker_updates_progress_incrementally(mock_job_db, mock_agent_class):
@@ -215,3 +229,125 @@ def test_worker_updates_progress_incrementally(mock_job_db, mock_agent_class):
     assert any('1/13' in p or '1 ' in p for p in progress_values), "Expected progress 1/13"
     assert any('2/13' in p or '2 ' in p for p in progress_values), "Expected progress 2/13"
     assert any('3/13' in p or '3 ' in p for p in progress_values), "Expected progress 3/13"
+
+
+@patch('app.db.DB_WRITE_BATCH_SIZE', 1)
+@patch('app.agent.CodeCheckAgent')
+@patch('app.db.JobDB')
+def test_worker_persists_sections_as_agent_reports_them(mock_job_db, mock_agent_class):
+    """
+    Test 8: Sections are saved from the agent's on_section callback while it runs,
+    so a failure mid-run keeps the sections already researched
+    """
+    from app.worker_logic import process_research_job
+    
+    def run(address, on_section=None, **kwargs):
+        on_section("location_information", Mock(model_dump=lambda: {"city": "Miami"}))
+        on_section("wall_signs", Mock(model_dump=lambda: {"allowed": True}))
+        # Progress was written before the run finished
+        assert mock_job_db.save_section_results.call_count == 2
+        raise Exception("Perplexity timed out")
+    
+    mock_agent = Mock()
+    mock_agent.run.side_effect = run
+    mock_agent_class.return_value = mock_agent
+    
+    result = process_research_job("test-job-partial", "Partial St", "openai")
+    
+    assert result["status"] == "failed"
+    section_names = [name for call in mock_job_db.save_section_results.call_args_list for name in call[0][1]]
+    assert section_names == ["location_information", "wall_signs"]
+    progress_values = [call[1]['progress'] for call in mock_job_db.update_job.call_args_list if 'progress' in call[1]]
+    assert progress_values == ["1/13 sections", "2/13 sections", "2/13 sections"]
+    assert mock_job_db.update_job.call_args[1]['status'] == "failed"
+
+
+@patch('app.agent.CodeCheckAgent')
+@patch('app.db.JobDB')
+def test_worker_resume_researches_only_missing_sections(mock_job_db, mock_agent_class):
+    """
+    Test 9: Resuming reuses stored location_information and skips saved sections
+    """
+    from app.worker_logic import process_research_job, SECTION_NAMES
+    
+    mock_job_db.get_job_results.return_value = [
+        {"section_name": "location_information", "section_data": {"city": {"value": "Miami"}}},
+        {"section_name": "wall_signs", "section_data": {}},
+    ]
+    mock_agent = Mock()
+    mock_agent.run.return_value = Mock(spec=[])
+    mock_agent_class.return_value = mock_agent
+    
+    result = process_research_job("test-job-resume", "Resume St", "openai", resume=True)
+    
+    kwargs = mock_agent.run.call_args[1]
+    assert kwargs["location_info"].city.value == "Miami"
+    assert kwargs["field_names"] == [name for name in SECTION_NAMES if name not in ("location_information", "wall_signs")]
+    assert result["status"] == "completed"
+    assert result["sections_completed"] == 2
+
+
+@patch('app.db.DB_WRITE_FLUSH_INTERVAL', 0)
+@patch('app.db.DB_WRITE_BATCH_SIZE', 4)
+@patch('app.agent.CodeCheckAgent')
+@patch('app.db.JobDB')
+def test_worker_batches_section_writes(mock_job_db, mock_agent_class):
+    """
+    Test 10: Sections are written in batches and the last batch shares the
+    completion update
+    """
+    from app.worker_logic import process_research_job, SECTION_NAMES
+    
+    def run(address, on_section=None, **kwargs):
+        for name in SECTION_NAMES:
+            on_section(name, {"name": name})
+        return Mock(spec=[])
+    
+    mock_agent = Mock()
+    mock_agent.run.side_effect = run
+    mock_agent_class.return_value = mock_agent
+    
+    result = process_research_job("test-job-batch", "Batch St", "openai")
+    
+    batches = [list(call[0][1]) for call in mock_job_db.save_section_results.call_args_list]
+    assert [len(batch) for batch in batches] == [4, 4, 4, 1]
+    assert [name for batch in batches for name in batch] == SECTION_NAMES
+    
+    # processing + one progress update per batch, the last merged with completion
+    updates = [call[1] for call in mock_job_db.update_job.call_args_list]
+    assert len(updates) == 5
+    assert updates[-1]["status"] == "completed"
+    assert updates[-1]["progress"] == "13/13 sections"
+    assert result["sections_completed"] == 13
+
+
+@patch('app.agent.CodeCheckAgent')
+@patch('app.db.JobDB')
+def test_worker_claims_job_with_lease(mock_job_db, mock_agent_class):
+    """
+    Test: The worker leases its job by id and heartbeats it while running; a
+    job claimed elsewhere is skipped, and a reclaimed one resumes
+    """
+    from app.job_queue import JobQueue
+    from app.worker_logic import process_research_job
+
+    mock_agent_class.return_value.run.return_value = Mock(location_information=None)
+    mock_job_db.get_job_results.return_value = []
+
+    with patch.object(JobQueue, 'claim_jobs', return_value=[]) as claim:
+        result = process_research_job("job-taken", "1 Main St", "openai")
+    assert result["status"] == "skipped"
+    claim.assert_called_once_with(["job-taken"])
+    mock_agent_class.assert_not_called()
+
+    beats = []
+    with patch.object(JobQueue, 'claim_jobs', return_value=[{"id": "job-2", "attempts": 2}]), \
+         patch.object(JobQueue, 'heartbeat_interval', 0.01), \
+         patch.object(JobQueue, 'heartbeat', side_effect=lambda job_ids: beats.append(job_ids) or job_ids):
+        mock_agent_class.return_value.run.side_effect = lambda *args, **kwargs: time.sleep(0.05) or Mock(location_information=None)
+        result = process_research_job("job-2", "2 Main St", "openai")
+
+    assert result["status"] == "completed"
+    assert ["job-2"] in beats
+    # Second claim: the interrupted first attempt's sections are reused
+    mock_job_db.get_job_results.assert_called_with("job-2")
@@ -0,0 +1,156 @@
+"""
+Rate Limiter Tests
+
+Token buckets, the concurrency cap and client integration (no network).
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.clients import PerplexityClient
+from app.rate_limit import (
+    ProviderLimiter,
+    RateLimitSettings,
+    SupabaseTokenBucket,
+    TokenBucket,
+    create_provider_limiter,
+    get_rate_limiter,
+)
+
+
+def test_token_bucket_throttles_to_rate():
+    """
+    Test 1: After the burst, requests are spaced at the refill rate
+    """
+    limiter = ProviderLimiter("test", requests=TokenBucket("test:requests", rate_per_minute=600, capacity=2))
+
+    start = time.monotonic()
+    for _ in range(4):
+        with limiter.limit():
+            pass
+    elapsed = time.monotonic() - start
+
+    # 2 from the burst, 2 more at 10/s
+    assert 0.15 <= elapsed < 1.0
+    assert limiter.stats()["waits"] >= 1
+
+
+def test_concurrency_cap_shared_by_threads():
+    """
+    Test 2: No more than max_concurrency requests are in flight at once
+    """
+    limiter = ProviderLimiter("test", max_concurrency=2)
+    peak = 0
+    lock = threading.Lock()
+
+    def call():
+        nonlocal peak
+        with limiter.limit():
+            with lock:
+                peak = max(peak, limiter.stats()["in_flight"])
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
+    assert limiter.stats()["in_flight"] == 0
+
+
+async def test_async_limit_waits_without_blocking_loop():
+    """
+    Test 3: Async callers share the same budget and cap
+    """
+    limiter = ProviderLimiter(
+        "test",
+        requests=TokenBucket("test:requests", rate_per_minute=1200, capacity=1),
+        max_concurrency=1
+    )
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    async def call():
+        async with limiter.alimit():
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.gather(*(call() for _ in range(4)))
+    task.cancel()
+
+    assert limiter.stats()["in_flight"] == 0
+    # The loop kept running while callers waited for tokens
+    assert ticks > 5
+
+
+def test_token_budget_settles_against_reported_usage():
+    """
+    Test 4: Reserved tokens are corrected by the usage the provider reports
+    """
+    tokens = TokenBucket("test:tokens", rate_per_minute=1, capacity=1000)
+    limiter = ProviderLimiter("test", tokens=tokens, completion_tokens=500)
+
+    with limiter.limit(limiter.estimate("x" * 400)) as reservation:
+        assert tokens.take(0) == 0
+        assert tokens._tokens == pytest.approx(1000 - 601, abs=1)
+        reservation.settle(150)
+
+    assert tokens._tokens == pytest.approx(850, abs=1)
+
+
+def test_settings_build_limiters_and_clients_share_them():
+    """
+    Test 5: Limits come from settings; clients use the process-wide limiter
+    and consult it on every request
+    """
+    settings = RateLimitSettings(perplexity_rpm=30, perplexity_tpm=0, perplexity_max_concurrency=3)
+    limiter = create_provider_limiter("perplexity", settings)
+    assert limiter.requests.rate == 0.5
+    assert limiter.tokens is None
+    assert limiter.max_concurrency == 3
+    assert create_provider_limiter("openai", RateLimitSettings(rate_limit_backend="none")).requests is None
+
+    assert PerplexityClient(api_key="test", session=Mock()).rate_limiter is get_rate_limiter("perplexity")
+
+    response = Mock()
+    response.json.return_value = {"choices": [{"message": {"content": "ok"}}], "usage": {"total_tokens": 42}}
+    session = Mock()
+    session.post.return_value = response
+    injected = ProviderLimiter("perplexity", requests=TokenBucket("p", rate_per_minute=60))
+    client = PerplexityClient(api_key="test", session=session, rate_limiter=injected)
+
+    assert client.search("zoning")["content"] == "ok"
+    assert injected.requests._tokens == pytest.approx(59, abs=0.1)
+
+
+def test_usage_over_reservation_charged_by_both_backends():
+    """
+    Test 6: Usage above the reservation is charged even past an empty
+    bucket, in process and in the shared (Supabase) bucket alike
+    """
+    from benchmarks.fakes import FakeSupabase
+
+    def over_use(bucket):
+        assert bucket.take(80) == 0
+        # Reserved 80, the provider reported 130: charge 50 more than is left
+        bucket.refund(-50)
+        # 30 in debt: 10 more tokens take 40 tokens of refill at 1/s
+        return bucket.take(10)
+
+    with patch("app.db.JobDB._get_client", return_value=FakeSupabase()):
+        waits = [
+            over_use(TokenBucket("openai:tokens", rate_per_minute=60, capacity=100)),
+            over_use(SupabaseTokenBucket("openai:tokens", rate_per_minute=60, capacity=100)),
+        ]
+
+    assert waits == [pytest.approx(40, abs=0.5)] * 2
@@ -0,0 +1,161 @@
+"""
+Retry Policy Tests
+
+Error classification, backoff, Retry-After, the per-job budget and client
+integration (no network).
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from app.clients import PerplexityClient
+from app.rate_limit import ProviderLimiter
+from app.retry import (
+    ExtractionError,
+    RateLimitError,
+    RetryBudget,
+    RetryPolicy,
+    UpstreamClientError,
+    UpstreamServerError,
+    UpstreamTimeoutError,
+    classify_error,
+    parse_retry_after,
+)
+
+
+def _http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def _ok_response(content="ok"):
+    response = Mock()
+    response.json.return_value = {"choices": [{"message": {"content": content}}], "citations": []}
+    return response
+
+
+def test_classify_error():
+    """
+    Test 1: Provider and transport failures map to typed errors
+    """
+    limited = classify_error("perplexity", _http_error(429, {"Retry-After": "7"}), "Error calling Perplexity API")
+    assert isinstance(limited, RateLimitError)
+    assert limited.retryable and limited.retry_after == 7
+    assert str(limited).startswith("Error calling Perplexity API: ")
+
+    assert isinstance(classify_error("perplexity", _http_error(503), "x"), UpstreamServerError)
+    assert isinstance(classify_error("perplexity", requests.ReadTimeout("slow"), "x"), UpstreamTimeoutError)
+    assert not classify_error("perplexity", _http_error(401), "x").retryable
+    assert isinstance(classify_error("perplexity", _http_error(401), "x"), UpstreamClientError)
+    assert isinstance(classify_error("openai", KeyError("choices"), "x"), ExtractionError)
+
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+
+
+@patch("app.retry.time.sleep")
+def test_backoff_and_retry_after(mock_sleep):
+    """
+    Test 2: Retryable errors back off (honouring Retry-After); others raise at once
+    """
+    policy = RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=3.0)
+    errors = [
+        UpstreamServerError("503", "openai", 503),
+        RateLimitError("429", "openai", 429, retry_after=2.5),
+        UpstreamServerError("502", "openai", 502),
+    ]
+
+    def flaky():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert policy.call(flaky) == "ok"
+    delays = [call[0][0] for call in mock_sleep.call_args_list]
+    assert len(delays) == 3
+    assert 0 <= delays[0] <= 1.0
+    assert delays[1] == 2.5
+    assert 0 <= delays[2] <= 3.0
+
+    fn = Mock(side_effect=UpstreamClientError("400", "openai", 400))
+    with pytest.raises(UpstreamClientError):
+        policy.call(fn)
+    assert fn.call_count == 1
+
+    # Retry-After beyond the cap fails instead of stalling the job
+    fn = Mock(side_effect=RateLimitError("429", "openai", 429, retry_after=3600))
+    with pytest.raises(RateLimitError):
+        policy.call(fn)
+    assert fn.call_count == 1
+
+
+@patch("app.retry.time.sleep")
+def test_budget_shared_across_calls(mock_sleep):
+    """
+    Test 3: Calls drawing from one budget stop retrying once it is spent
+    """
+    budget = RetryBudget(3)
+    policy = RetryPolicy(max_attempts=5, base_delay=0)
+    fn = Mock(side_effect=UpstreamTimeoutError("timeout", "perplexity"))
+
+    with pytest.raises(UpstreamTimeoutError):
+        policy.call(fn, budget)
+    assert fn.call_count == 4
+    assert budget.remaining == 0
+
+    fn.reset_mock()
+    with pytest.raises(UpstreamTimeoutError):
+        policy.call(fn, budget)
+    assert fn.call_count == 1
+
+
+async def test_async_retry():
+    """
+    Test 4: acall() retries coroutines the same way
+    """
+    policy = RetryPolicy(max_attempts=3, base_delay=0)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise UpstreamServerError("500", "gemini", 500)
+        return "ok"
+
+    assert await policy.acall(flaky, RetryBudget(5)) == "ok"
+    assert attempts == 3
+
+
+@patch("app.retry.time.sleep")
+def test_perplexity_client_retries_transient_failures(mock_sleep):
+    """
+    Test 5: A 429 is retried inside search(); a 400 raises a typed error
+    """
+    limited = Mock()
+    limited.raise_for_status.side_effect = _http_error(429, {"Retry-After": "1"})
+    session = Mock()
+    session.post.side_effect = [limited, _ok_response("zoning")]
+    budget = RetryBudget(5)
+    client = PerplexityClient(
+        api_key="test",
+        session=session,
+        rate_limiter=ProviderLimiter("perplexity"),
+        retry_policy=RetryPolicy(max_attempts=3),
+        retry_budget=budget
+    )
+
+    assert client.search("zoning")["content"] == "zoning"
+    assert session.post.call_count == 2
+    mock_sleep.assert_called_once_with(1.0)
+    assert budget.used == 1
+
+    bad = Mock()
+    bad.raise_for_status.side_effect = _http_error(400)
+    session.post.side_effect = None
+    session.post.return_value = bad
+    with pytest.raises(UpstreamClientError, match="Error calling Perplexity API"):
+        client.search("zoning")
@@ -0,0 +1,127 @@
+"""
+Schema Registry Tests
+
+Response formats compiled once per section model (no network).
+"""
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from app.clients import LLMClient
+from app.models import LocationInformation, WallSigns
+from app.rate_limit import ProviderLimiter
+from app.retry import ExtractionError, RetryPolicy
+from app.schema_registry import (
+    SchemaRegistry,
+    gemini_schema,
+    get_schema_registry,
+    openai_response_format,
+    section_models,
+    warm_in_background,
+)
+
+
+def _keywords(schema):
+    """Every schema keyword used, excluding property names."""
+    keys = set(schema) - {"properties"}
+    for child in list(schema.get("properties", {}).values()) + ([schema["items"]] if "items" in schema else []):
+        keys |= _keywords(child)
+    return keys
+
+
+def _completion(content, refusal=None):
+    message = SimpleNamespace(content=content, refusal=refusal)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def test_openai_extraction_sends_precompiled_format():
+    """
+    Test 1: extract_data() sends a strict json_schema format, compiled once per model
+    """
+    compiled = get_schema_registry().get(WallSigns)
+    assert compiled.openai["type"] == "json_schema"
+    assert compiled.openai["json_schema"]["name"] == "WallSigns"
+    assert compiled.openai["json_schema"]["strict"] is True
+    assert get_schema_registry().get(WallSigns) is compiled
+
+    schema = compiled.openai["json_schema"]["schema"]
+    assert schema["additionalProperties"] is False
+    assert schema["required"] == list(schema["properties"])
+    for definition in schema["$defs"].values():
+        assert definition["additionalProperties"] is False
+        assert definition["required"] == list(definition["properties"])
+        assert all("default" not in field for field in definition["properties"].values())
+
+    client = LLMClient(
+        provider="openai",
+        api_key="test",
+        rate_limiter=ProviderLimiter("openai"),
+        retry_policy=RetryPolicy(max_attempts=1)
+    )
+    client.client = Mock()
+    client.client.chat.completions.create.return_value = _completion('{"per_site": {"value": "1 per frontage"}}')
+
+    result = client.extract_data("Wall sign rules", WallSigns)
+
+    assert result.per_site.value == "1 per frontage"
+    assert client.client.chat.completions.create.call_args.kwargs["response_format"] is compiled.openai
+
+    client.client.chat.completions.create.return_value = _completion(None, refusal="I can't help with that")
+    with pytest.raises(ExtractionError):
+        client.extract_data("Wall sign rules", WallSigns)
+
+
+def test_gemini_schema_is_proto_ready():
+    """
+    Test 2: Gemini schemas inline nested models, mark Optional fields nullable
+    and drop keywords the Schema proto rejects
+    """
+    schema = gemini_schema(LocationInformation.model_json_schema())
+
+    contact = schema["properties"]["municipal_contact"]
+    assert contact["type_"] == "OBJECT"
+    assert contact["properties"]["email"]["properties"]["value"] == {"type_": "STRING", "nullable": True}
+    assert schema["properties"]["completed_by"] == {"type_": "STRING", "nullable": True}
+    assert _keywords(schema) <= {"type_", "nullable"}
+
+    config = SchemaRegistry().get(LocationInformation).gemini
+    assert config.response_mime_type == "application/json"
+    assert "municipal_contact" in config.response_schema.properties
+
+
+def test_warm_compiles_every_section_model():
+    """
+    Test 3: warm() compiles the 13 form sections and the batch composites; the
+    micro-benchmark shows lookups cost far less CPU than rebuilding
+    """
+    from benchmarks.schemas import run_schema_benchmark
+
+    registry = SchemaRegistry()
+    assert registry.warm() == len(section_models()) == 17
+    assert len(registry) == 17
+
+    result, = run_schema_benchmark(threads=2, calls=1, providers=["openai"])
+    assert result["calls"] == 2 * 17
+    assert result["registry"]["cpu_us_per_call"] < result["per_call"]["cpu_us_per_call"]
+
+
+def test_workers_warm_once_per_process():
+    """
+    Test 4: Every job asks for the warm-up; only the first starts a thread
+    """
+    first = warm_in_background()
+    assert first is not None
+    assert warm_in_background(gemini=True) is first
+    first.join(timeout=30)
+    assert len(get_schema_registry()) >= 17
+
+
+def test_openai_format_matches_sdk_parse():
+    """
+    Test 5: Every section model compiles to what the installed SDK's parse() would send
+    """
+    completions = pytest.importorskip("openai.lib._parsing._completions")
+
+    for model in section_models():
+        assert openai_response_format(model) == completions.type_to_response_format_param(model)
@@ -0,0 +1,64 @@
+"""
+Coalescing Tests: Single-flight request deduplication
+
+Unit tests for in-process coalescing and the DB lock-row job attach path.
+No API keys or network access required.
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_computation():
+    """
+    Test 1: Concurrent callers with the same key attach to one running computation
+    """
+    from app.singleflight import AsyncSingleFlight
+
+    flights = AsyncSingleFlight()
+    calls = 0
+
+    async def research():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"jurisdiction": "Miami"}
+
+    results = await asyncio.gather(*(flights.do("key", research) for _ in range(5)))
+
+    assert calls == 1
+    assert all(result == {"jurisdiction": "Miami"} for result in results)
+    assert flights.in_flight() == 0
+
+    # Once finished, the next call runs fresh
+    await flights.do("key", research)
+    assert calls == 2
+
+
+def test_dedupe_key_uses_normalized_address_and_provider():
+    """
+    Test 2: Near-duplicate addresses share a key; providers don't
+    """
+    from app.singleflight import research_dedupe_key
+
+    assert research_dedupe_key("123 Main Street, Miami FL", "openai") == \
+        research_dedupe_key("123 MAIN ST., Miami, FL", "OpenAI")
+    assert research_dedupe_key("123 Main St, Miami FL", "openai") != \
+        research_dedupe_key("123 Main St, Miami FL", "gemini")
+
+
+def test_create_or_attach_returns_existing_job_on_lock_conflict():
+    """
+    Test 3: A unique violation on the dedupe key attaches to the in-flight job
+    """
+    from postgrest.exceptions import APIError
+    from app.db import JobDB
+
+    existing = {"id": "job-1", "status": "processing"}
+    with patch.object(JobDB, "create_job", side_effect=APIError({"code": "23505", "message": "duplicate"})), \
+         patch.object(JobDB, "get_active_job_by_dedupe_key", return_value=existing):
+        job, created = JobDB.create_or_attach_job("123 Main St", "openai", "openai:123 main st")
+
+    assert job == existing
+    assert created is False
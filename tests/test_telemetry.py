@@ -0,0 +1,202 @@
+"""
+Telemetry Tests
+
+Per-section call accounting, histograms, job metadata and the aggregate
+endpoint (no network).
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.clients import PerplexityClient
+from app.rate_limit import ProviderLimiter
+from app.retry import RetryPolicy
+from app.telemetry import (
+    Histogram,
+    JobTelemetry,
+    aggregate_job_telemetry,
+    get_upstream_stats,
+    section_scope,
+    upstream_call,
+)
+
+
+def _response(content, prompt_tokens=120, completion_tokens=30):
+    response = Mock()
+    response.json.return_value = {
+        "choices": [{"message": {"content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens},
+    }
+    return response
+
+
+def test_histogram_buckets_and_quantiles():
+    """
+    Test 1: Observations land in cumulative buckets; quantiles use bucket bounds
+    """
+    histogram = Histogram((10, 100, 1000))
+    for value in (5, 50, 60, 500, 5000):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["sum"] == 5615
+    assert snapshot["buckets"] == [[10, 1], [100, 3], [1000, 4], ["+Inf", 5]]
+    assert snapshot["p50"] == 100
+    assert snapshot["p99"] == float("inf")
+
+
+@patch("app.retry.time.sleep")
+def test_client_calls_attributed_to_sections(mock_sleep):
+    """
+    Test 2: Latency, tokens, payload sizes and retries are recorded per
+    section and per provider
+    """
+    failing = Mock()
+    failing.raise_for_status.side_effect = Exception("boom")
+    failing.raise_for_status.side_effect.response = Mock(status_code=503, headers={})
+    session = Mock()
+    session.post.side_effect = [failing, _response("wall sign rules"), _response("awning rules", 80, 20)]
+    telemetry = JobTelemetry()
+    client = PerplexityClient(
+        api_key="test",
+        session=session,
+        rate_limiter=ProviderLimiter("perplexity"),
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0),
+        telemetry=telemetry
+    )
+
+    with telemetry.section("wall_signs"):
+        client.search("wall signs?", system_prompt="sys")
+    with section_scope("awnings"):
+        client.search("awnings?", system_prompt="sys")
+
+    summary = telemetry.summary()
+    wall_signs = summary["sections"]["wall_signs"]
+    assert wall_signs["calls"] == 1
+    assert wall_signs["retries"] == 1
+    assert wall_signs["prompt_tokens"] == 120
+    assert wall_signs["request_chars"] == len("sys") + len("wall signs?")
+    assert wall_signs["response_chars"] == len("wall sign rules")
+    assert wall_signs["wall_ms"] >= wall_signs["upstream_ms"]
+    assert summary["sections"]["awnings"]["completion_tokens"] == 20
+    assert summary["providers"]["perplexity.search"]["calls"] == 2
+    assert summary["prompt_tokens"] == 200
+    assert summary["cost_usd"] > 0
+    assert get_upstream_stats()["perplexity.search"]["latency_ms"]["count"] >= 2
+
+
+@patch("app.agent.PerplexityClient")
+@patch("app.agent.LLMClient")
+def test_agent_times_each_section(mock_llm, mock_pplx):
+    """
+    Test 3: run() records wall time for the jurisdiction step and every section
+    """
+    from app.agent import CodeCheckAgent
+    from app.models import LocationInformation, WallSigns
+
+    mock_pplx.return_value.search.return_value = {"content": "", "citations": []}
+    mock_llm.return_value.extract_data.return_value = LocationInformation()
+
+    agent = CodeCheckAgent(cache=False)
+    agent.run("1 Main St", field_names=["wall_signs", "awnings"])
+
+    sections = agent.telemetry.summary()["sections"]
+    assert set(sections) == {"location_information", "wall_signs", "awnings"}
+    assert mock_pplx.call_args.kwargs["telemetry"] is agent.telemetry
+
+
+def test_aggregate_endpoint():
+    """
+    Test 4: GET /jobs/telemetry aggregates stored job telemetry into histograms
+    """
+    from app import job_routes
+
+    stored = [
+        {"wall_ms": 90000, "cost_usd": 0.05, "sections": {"wall_signs": {"wall_ms": 8000, "upstream_ms": 7900, "calls": 2, "retries": 1}}},
+        {"wall_ms": 150000, "cost_usd": 0.07, "sections": {"wall_signs": {"wall_ms": 12000, "upstream_ms": 11000, "calls": 2, "retries": 0}}},
+    ]
+    aggregated = aggregate_job_telemetry(stored)
+    assert aggregated["jobs"] == 2
+    assert aggregated["sections"]["wall_signs"]["wall_ms"]["count"] == 2
+    assert aggregated["sections"]["wall_signs"]["retries"] == 1
+
+    app = FastAPI()
+    app.include_router(job_routes.router)
+    with patch.dict("os.environ", {"API_KEY": "test-key"}), patch("app.job_routes.JobDB") as mock_job_db:
+        mock_job_db.list_job_telemetry.return_value = stored
+        response = TestClient(app).get("/jobs/telemetry?limit=5000", headers={"X-API-Key": "test-key"})
+
+    assert response.status_code == 200
+    assert response.json()["jobs"] == 2
+    mock_job_db.list_job_telemetry.assert_called_once_with(limit=1000)
+
+
+@patch("app.agent.CodeCheckAgent")
+@patch("app.db.JobDB")
+def test_resumed_job_keeps_earlier_attempt_telemetry(mock_job_db, mock_agent_class):
+    """
+    Test 5: A resumed job's metadata adds the new attempt to the first one's
+    telemetry and section providers instead of replacing them
+    """
+    from app.telemetry import UpstreamCall
+    from app.worker_logic import process_research_job
+
+    def record(telemetry, section, prompt_tokens):
+        with telemetry.section(section):
+            call = UpstreamCall("openai", "extract")
+            call.prompt_tokens = prompt_tokens
+            telemetry.add(call)
+
+    first = JobTelemetry()
+    record(first, "wall_signs", 100)
+    mock_job_db.get_job.return_value = {
+        "id": "job-1",
+        "metadata": {"section_providers": {"wall_signs": "gemini"}, "telemetry": first.summary(), "note": "kept"},
+    }
+    mock_job_db.get_job_results.return_value = [{"section_name": "wall_signs", "section_data": {}}]
+
+    agent = mock_agent_class.return_value
+    agent.telemetry = JobTelemetry()
+    agent.section_providers = {"awnings": "openai"}
+    record(agent.telemetry, "awnings", 50)
+    agent.run.return_value = Mock(spec=[])
+
+    process_research_job("job-1", "1 Main St", "openai", resume=True, claimed=True)
+
+    metadata = mock_job_db.update_job.call_args[1]["metadata"]
+    assert metadata["note"] == "kept"
+    assert metadata["section_providers"] == {"wall_signs": "gemini", "awnings": "openai"}
+    assert metadata["telemetry"]["prompt_tokens"] == 150
+    assert metadata["telemetry"]["calls"] == 2
+    assert set(metadata["telemetry"]["sections"]) == {"wall_signs", "awnings"}
+    assert metadata["telemetry"]["providers"]["openai.extract"]["calls"] == 2
+
+
+
+async def test_cancelled_call_is_recorded_as_error():
+    """
+    Test 6: A call cancelled mid-flight (the losing request of a hedge) is
+    recorded as an error, not a success
+    """
+    import asyncio
+
+    telemetry = JobTelemetry()
+
+    async def slow_call():
+        with telemetry.section("awnings"):
+            with upstream_call("gemini", "extract", telemetry) as call:
+                call.attempt()
+                await asyncio.sleep(5)
+
+    task = asyncio.ensure_future(slow_call())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    awnings = telemetry.summary()["sections"]["awnings"]
+    assert awnings["calls"] == 1
+    assert awnings["errors"] == 1